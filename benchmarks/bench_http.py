@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark of the latency of the requests of the Poloniex API with a
+new session per request against the pooled keep-alive session of
+:class:`cointrader.exchanges.poloniex.Poloniex`.
+
+The requests go to the local stand-in server of
+:mod:`benchmarks.standin`, which delays every new connection by
+`HANDSHAKE` seconds to emulate the TCP and TLS handshake with the
+exchange. Run with::
+
+    python -m benchmarks.bench_http
+"""
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+from benchmarks.standin import StandinServer
+from cointrader.config import Config
+from cointrader.exchanges.poloniex import Poloniex, make_session
+
+HANDSHAKE = 0.02
+REQUESTS = 100
+THREADS = 8
+
+
+def single_session(api, path, params):
+    # Previous behaviour: a new session and thus a new connection for
+    # every request.
+    session = make_session(1)
+    try:
+        return session.get("{}/{}".format(api.url, path), params=params)
+    finally:
+        session.close()
+
+
+def make_api(server, pool_size):
+    config = Config()
+    config.api_key, config.api_secret = "key", "secret"
+    config.pool_size = pool_size
+    api = Poloniex(config, 0)
+    api.url = server.url
+    # Measure the connections, not the rate limit of the exchange.
+    api.enableRateLimit = False
+    return api
+
+
+def measure(call, count=REQUESTS, threads=1):
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if threads == 1:
+        latencies = [timed(i) for i in range(count)]
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            latencies = list(pool.map(timed, range(count)))
+    return numpy.array(latencies) * 1000, time.perf_counter() - start
+
+
+def report(name, server, latencies, elapsed, connections):
+    print("{:28} {:8.2f} {:8.2f} {:8.2f} {:8.0f} {:6}".format(
+        name, numpy.mean(latencies), numpy.percentile(latencies, 50), numpy.percentile(latencies, 95),
+        len(latencies) / elapsed, server.connections - connections))
+
+
+def run(server, name, call, threads=1):
+    connections = server.connections
+    latencies, elapsed = measure(call, threads=threads)
+    report(name, server, latencies, elapsed, connections)
+
+
+def main():
+    with StandinServer(handshake=HANDSHAKE) as server:
+        pooled = make_api(server, 10)
+        small = make_api(server, 1)
+        print("{} requests, {:.0f} ms handshake per connection".format(REQUESTS, HANDSHAKE * 1000))
+        print("{:28} {:>8} {:>8} {:>8} {:>8} {:>6}".format("", "mean ms", "p50 ms", "p95 ms", "req/s", "conns"))
+        for name, params in (("ticker", {"command": "returnTicker"}),
+                             ("book", {"command": "returnOrderBook", "currencyPair": "BTC_ETH", "depth": 10})):
+            run(server, "{} new session".format(name), lambda: single_session(pooled, "public", params))
+            run(server, "{} pooled".format(name), lambda: pooled._request("public", params))
+        run(server, "chart new session",
+            lambda: single_session(pooled, "public", {"command": "returnChartData"}))
+        end = datetime.datetime.utcnow()
+        run(server, "chart pooled", lambda: pooled.chart("BTC_ETH", end - datetime.timedelta(days=1), end))
+        print("{} threads".format(THREADS))
+        params = {"command": "returnOrderBook", "currencyPair": "BTC_ETH", "depth": 10}
+        run(server, "book new session", lambda: single_session(pooled, "public", params), THREADS)
+        run(server, "book pooled (pool size 1)", lambda: small._request("public", params), THREADS)
+        run(server, "book pooled (pool size 10)", lambda: pooled._request("public", params), THREADS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark of the indicators of :mod:`cointrader.ta` against
+stockstats on a chart with 10000 candles.
+
+Run with::
+
+    python -m benchmarks.bench_ta
+"""
+import timeit
+
+import pandas
+import stockstats
+
+from cointrader import ta
+from tests.helpers import make_data
+
+CANDLES = 10000
+REPEAT = 20
+
+
+def run_stockstats(frame):
+    stock = stockstats.StockDataFrame.retype(frame.copy())
+    for column in ("close_10_sma", "close_13_ema", "close_26_ema", "macdh", "rsi_9", "wr_9", "adx"):
+        stock.get(column)
+
+
+def run_ta(arrays):
+    high, low, close = arrays
+    ta.sma(close, 10)
+    ta.ema(close, 13)
+    ta.ema(close, 26)
+    ta.macdh(close)
+    ta.rsi(close, 9)
+    ta.wr(high, low, close, 9)
+    ta.adx(high, low, close)
+
+
+def main():
+    frame = pandas.DataFrame(make_data(CANDLES))
+    arrays = tuple(frame[column].to_numpy() for column in ("high", "low", "close"))
+    slow = min(timeit.repeat(lambda: run_stockstats(frame), number=1, repeat=REPEAT))
+    fast = min(timeit.repeat(lambda: run_ta(arrays), number=1, repeat=REPEAT))
+    print("{} candles".format(CANDLES))
+    print("stockstats: {:8.2f} ms".format(slow * 1000))
+    print("ta:         {:8.2f} ms".format(fast * 1000))
+    print("speedup:    {:8.1f}x".format(slow / fast))
+
+
+if __name__ == "__main__":
+    main()
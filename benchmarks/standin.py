@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Local stand-ins for the HTTP API and the push API of Poloniex.
+
+The HTTP server answers the public commands returnTicker, returnOrderBook
+and returnChartData and the trading command returnCompleteBalances with
+generated data. It speaks HTTP/1.1 with keep-alive and gzip, counts the
+opened connections and can delay every new connection to emulate the
+TCP and TLS handshake with the real exchange.
+
+The push server speaks WebSocket and replays recorded messages of the
+push API to every client once it subscribed, see
+:mod:`cointrader.push`.
+"""
+import gzip
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cointrader import websocket
+
+from tests.test_booktape import make_book
+from tests.helpers import make_data
+
+MARKETS = 100
+
+
+def make_ticker(markets=MARKETS):
+    ticker = {"USDT_BTC": {"id": 121, "last": "4000.0", "lowestAsk": "4001.0", "highestBid": "3999.0",
+                           "percentChange": "0.01", "baseVolume": "1000000.0", "quoteVolume": "250.0"}}
+    for i in range(markets):
+        ticker["BTC_C{:03d}".format(i)] = {"id": 1000 + i, "last": "0.07", "lowestAsk": "0.0701",
+                                           "highestBid": "0.0699", "percentChange": "0.02",
+                                           "baseVolume": "{:.1f}".format(10 + i),
+                                           "quoteVolume": "{:.1f}".format(150 + i)}
+    return ticker
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, so without this the
+    # delayed ACK of the client stalls every response on a kept-alive
+    # connection.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.count_connection()
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        self._send(self.server.answer(query))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        self._send(self.server.answer({key: values[0] for key, values in parse_qs(body).items()}))
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Stand-in server on a free local port. Use :meth:`start` and
+    :meth:`stop` or the server as context manager."""
+
+    daemon_threads = True
+
+    def __init__(self, handshake=0.0, markets=MARKETS, candles=300):
+        """
+        :handshake: Seconds every new connection is delayed.
+        :markets: Number of markets of the ticker.
+        :candles: Number of candles of the chart.
+        """
+        ThreadingHTTPServer.__init__(self, ("127.0.0.1", 0), Handler)
+        self.handshake = handshake
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._ticker = make_ticker(markets)
+        self._book = make_book(1, 0.07)
+        self._chart = make_data(candles)
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self.server_address)
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+        if self.handshake:
+            time.sleep(self.handshake)
+
+    def answer(self, params):
+        command = params.get("command")
+        if command == "returnTicker":
+            return self._ticker
+        if command == "returnOrderBook":
+            return self._book
+        if command == "returnChartData":
+            return self._chart
+        if command == "returnCompleteBalances":
+            return {"BTC": {"available": "1.0", "onOrders": "0.0", "btcValue": "1.0"}}
+        return {"error": "Invalid command."}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def make_push_messages(pair_id, candles, seq=1):
+    """Returns the messages of the push API for a market whose trades
+    follow the given candles: one ticker message and four trades (open,
+    high, low and close) per candle, each trade in its own message."""
+    messages = []
+    for candle in candles:
+        date = candle["date"]
+        messages.append(json.dumps([1002, None, [pair_id, str(candle["close"]), str(candle["close"] * 1.001),
+                                                 str(candle["close"] * 0.999), "0.01", "10.0", "150.0", 0]]))
+        volume = candle["volume"] / candle["close"] / 4
+        for offset, column in enumerate(("open", "high", "low", "close")):
+            messages.append(json.dumps([pair_id, seq, [["t", str(seq), 1, str(candle[column]), str(volume),
+                                                        date + 60 * offset]]]))
+            seq += 1
+    return messages
+
+
+class PushHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        connection = websocket.accept(self.request)
+        if connection.recv() is None:
+            return
+        for message in self.server.messages:
+            connection.send(message)
+            if self.server.interval:
+                time.sleep(self.server.interval)
+        if self.server.close_after:
+            connection.close()
+        else:
+            while connection.recv() is not None:
+                pass
+
+
+class PushStandinServer(socketserver.ThreadingTCPServer):
+    """Stand-in of the push API on a free local port. Use :meth:`start`
+    and :meth:`stop` or the server as context manager."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, messages, interval=0.0, close=True):
+        """
+        :messages: Raw messages or path of a file with one message per
+            line as recorded by :class:`cointrader.push.PushClient`.
+        :interval: Seconds between two messages.
+        :close: Close the connection after the replay.
+        """
+        socketserver.ThreadingTCPServer.__init__(self, ("127.0.0.1", 0), PushHandler)
+        if isinstance(messages, str):
+            with open(messages) as recorded:
+                messages = [line.rstrip("\n") for line in recorded if line.strip()]
+        self.messages = list(messages)
+        self.interval = interval
+        self.close_after = close
+        self._thread = None
+
+    @property
+    def url(self):
+        return "ws://{}:{}".format(*self.server_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
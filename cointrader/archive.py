@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Binary candle archive.
+
+Long chart histories are stored in a compact fixed-width binary file
+which is opened with :class:`numpy.memmap`. The file starts with a
+header of 64 bytes followed by one column after the other::
+
+    header   magic, version, period, count, capacity, market
+    date     int64[capacity]
+    open     float64[capacity]
+    high     float64[capacity]
+    low      float64[capacity]
+    close    float64[capacity]
+    volume   float64[capacity]
+
+Only the first `count` values of each column are valid. The remaining
+capacity is used to append new candles without rewriting the file. All
+values are stored little-endian.
+
+As the columns are contiguous in the file a chart can be built on the
+mapped file without copying any data. Several processes opening the
+same archive share the pages of the file in the OS cache.
+"""
+import os
+import tempfile
+
+import numpy
+
+from cointrader.chart import COLUMNS, Chart, chart2arrays, search_index_by_date
+
+MAGIC = b"CTCANDLE"
+VERSION = 1
+
+HEADER = numpy.dtype([("magic", "S8"),
+                      ("version", "<u4"),
+                      ("period", "<u4"),
+                      ("count", "<i8"),
+                      ("capacity", "<i8"),
+                      ("market", "S32")])
+
+DTYPES = {column: numpy.dtype("<i8" if column == "date" else "<f8") for column in COLUMNS}
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def _offset(column, capacity):
+    return HEADER.itemsize + COLUMNS.index(column) * capacity * 8
+
+
+def _as_arrays(data):
+    if isinstance(data, dict):
+        return data
+    return chart2arrays(data)
+
+
+def write_archive(path, data, market="", period=0, capacity=None):
+    """Will write the given chart data into a new archive. The archive
+    is written to a temporary file which then replaces `path`, so
+    processes which still have the old archive mapped keep reading the
+    old file.
+
+    :path: Path of the archive file.
+    :data: List of datapoints as dictionary or dictionary of arrays.
+    :market: Currency pair like BTC_DASH.
+    :period: Period of the candles in seconds.
+    :capacity: Number of candles the file can hold. Defaults to the
+        number of candles in `data`.
+    """
+    arrays = _as_arrays(data)
+    count = len(arrays["date"])
+    capacity = max(count, capacity or 0)
+    header = numpy.zeros(1, dtype=HEADER)
+    header[0] = (MAGIC, VERSION, period, count, capacity, market.encode())
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as archive:
+            archive.write(header.tobytes())
+            for column in COLUMNS:
+                values = numpy.zeros(capacity, dtype=DTYPES[column])
+                values[:count] = arrays[column]
+                archive.write(values.tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def append_archive(path, data, market=None, period=None):
+    """Will append the given chart data to an existing archive. Only
+    candles newer than the last candle in the archive are appended. If
+    the capacity of the archive is exceeded the archive is rewritten
+    with doubled capacity.
+
+    :path: Path of the archive file.
+    :data: List of datapoints as dictionary or dictionary of arrays.
+    :market: Currency pair of the data. If given it must match the
+        market of the archive.
+    :period: Period of the data in seconds. If given it must match the
+        period of the archive.
+    :returns: Number of appended candles.
+    """
+    archive = Archive(path)
+    if market is not None and archive.market != market:
+        raise ArchiveError("{} holds {} and not {}".format(path, archive.market, market))
+    if period is not None and archive.period != period:
+        raise ArchiveError("{} holds a period of {} and not {}".format(path, archive.period, period))
+    arrays = _as_arrays(data)
+    last = archive.arrays["date"][-1] if len(archive) else None
+    first = 0 if last is None else int(numpy.searchsorted(arrays["date"], last, side="right"))
+    new = {column: arrays[column][first:] for column in COLUMNS}
+    added = len(new["date"])
+    if not added:
+        return 0
+
+    count = len(archive)
+    if count + added > archive.capacity:
+        merged = {column: numpy.concatenate((archive.arrays[column], new[column])) for column in COLUMNS}
+        market, period, capacity = archive.market, archive.period, max(archive.capacity * 2, count + added)
+        del archive
+        write_archive(path, merged, market, period, capacity)
+        return added
+
+    capacity = archive.capacity
+    del archive
+    mapped = numpy.memmap(path, dtype=numpy.uint8, mode="r+")
+    for column in COLUMNS:
+        start = _offset(column, capacity) + count * 8
+        mapped[start:start + added * 8] = numpy.ascontiguousarray(new[column], dtype=DTYPES[column]).view(numpy.uint8)
+    header = mapped[:HEADER.itemsize].view(HEADER)
+    header["count"] = count + added
+    mapped.flush()
+    return added
+
+
+class Archive(object):
+
+    """Read-only access to a candle archive. The columns of the archive
+    are available as arrays on the mapped file in `arrays`."""
+
+    def __init__(self, path):
+        """
+        :path: Path of the archive file.
+        """
+        if os.path.getsize(path) < HEADER.itemsize:
+            raise ArchiveError("{} is not a candle archive".format(path))
+        self.path = path
+        self._mapped = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+        header = self._mapped[:HEADER.itemsize].view(HEADER)[0]
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ArchiveError("{} is not a candle archive".format(path))
+        self.market = header["market"].decode()
+        self.period = int(header["period"])
+        self.capacity = int(header["capacity"])
+        count = int(header["count"])
+        self.arrays = {}
+        for column in COLUMNS:
+            start = _offset(column, self.capacity)
+            self.arrays[column] = self._mapped[start:start + count * 8].view(DTYPES[column])
+
+    def __len__(self):
+        return len(self.arrays["date"])
+
+    def chart(self, start=None, end=None, offset=0):
+        """Returns a chart on the archive. If `start` or `end` is given
+        the chart is limited to the candles between them. `offset`
+        datapoints before the start are included to let indicators
+        settle. The returned chart works on the mapped file and does not
+        copy any data."""
+        first, last = 0, len(self)
+        if start is not None:
+            first = max(search_index_by_date(self.arrays["date"], start) - offset, 0)
+        if end is not None:
+            last = search_index_by_date(self.arrays["date"], end) + 1
+        arrays = {column: self.arrays[column][first:last] for column in COLUMNS}
+        return Chart.from_arrays(arrays, start, end)
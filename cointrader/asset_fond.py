@@ -1,6 +1,6 @@
 import sys
 
-from click._unicodefun import click
+import click
 import cointrader.config
 from cointrader.exchange import Poloniex
 
@@ -42,9 +42,12 @@ class asset_fond():
             amount_to_sell = self.amount_btc
         return amount_to_sell
 
-    def add_row(self, btc, amount_btc, order_type, first_sell=False, renew=False, backtest=False):
+    def add_row(self, btc, amount_btc, order_type, first_sell=False, renew=False, backtest=False, available=None):
+        # `available` is the BTC of the fond before the first buy if the
+        # buy did not spend all of it.
         if not self.rows:
-            self.rows.append(self._row_dict(btc, self.get_amount_btc(0.0, backtest=backtest), "INIT", first_sell))
+            init_btc = btc if available is None else available
+            self.rows.append(self._row_dict(init_btc, self.get_amount_btc(0.0, backtest=backtest), "INIT", first_sell))
             self.rows.append(self._row_dict(btc, amount_btc, "BUY", first_sell))
             self.order_type = "TOTAL"
             self.btc = 0.0
@@ -55,9 +58,11 @@ class asset_fond():
         self.calculate()
 
         if renew:
+            # BTC which the first buy did not spend are kept.
+            rest = self.rows[0]["btc"] - self.rows[1]["btc"] if len(self.rows) > 1 else 0.0
             self.rows = []
             self.amount_btc = 0.0
-            self.btc = btc
+            self.btc = btc + rest
             self.sell_percent = 0.0
 
     def _row_dict(self, btc, amount_btc, order_type, first_sell):
@@ -106,7 +111,7 @@ class asset_fond():
     def get_amount_btc(self, amount_btc: float, backtest=False):
         if not backtest:
             try:
-                amount_btc = self.exchange._api.balance()[self.currency_pair.split("_")[1]]['quantity']
+                amount_btc = self.exchange.get_balance(self.currency_pair.split("_")[1])['quantity']
             except:
                 amount_btc = 0.0
 
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Backtests on precomputed signals.
+
+The signals of a strategy for a whole chart are calculated once with
+:meth:`cointrader.strategy.Strategy.backtest_signals`. The backtest is
+then a single pass over the datapoints with a BUY or SELL signal. The
+trading rules are a simplified version of the backtest of
+:class:`cointrader.bot.Cointrader`: A BUY signal buys coins for all BTC,
+a SELL signal or a signal with the over_sell or max_up flag sells all
+coins. The stop rules of :meth:`cointrader.bot.Cointrader.check_stop`
+are checked after every sell.
+"""
+import collections
+import datetime
+
+import numpy
+
+from cointrader.exchange import MAKER_FEE, TAKER_FEE
+from cointrader.indicators import BUY, SELL
+
+STOP_LOSS = -3.0
+# The bot is stopped if its profit in percent falls below this value.
+STOP_DROP = .5
+# The bot is stopped if a sell changes its profit by more than this
+# many percent.
+
+Result = collections.namedtuple("Result", ["btc", "amount", "value", "profit", "trades", "stopped"])
+# Result of a backtest. `btc` and `amount` are the BTC and the coins at
+# the end of the backtest, `value` is the value of both in BTC at the
+# last close and `profit` the profit in percent of the start BTC.
+# `stopped` is the date the backtest was stopped by the stop rules or
+# None.
+
+Trade = collections.namedtuple("Trade", ["date", "order_type", "rate", "amount", "btc"])
+
+
+def stopped(profit, profit_before, stop_loss=STOP_LOSS, stop_drop=STOP_DROP):
+    """Returns True if the bot must be stopped with the given profit and
+    the profit before the last sell (both in percent)."""
+    return profit < stop_loss or (abs(abs(profit_before) - abs(profit)) > stop_drop and profit_before != 0)
+
+
+def run(chart, signals, btc=1.0, spread=0.0, start=0, stop_loss=None, stop_drop=None):
+    """Will run a backtest of the given signals on the chart.
+
+    :chart: Chart instance
+    :signals: :class:`cointrader.indicators.Signals` of the chart.
+    :btc: BTC at the start of the backtest.
+    :spread: Spread of the market in percent of the price. Either one
+        value or an array with the spread at every datapoint.
+    :start: Index of the first datapoint to trade on.
+    :stop_loss: Stop the backtest if the profit falls below this value.
+        No stop if None.
+    :stop_drop: Stop the backtest if a sell changes the profit by more
+        than this value. No stop if None.
+    :returns: :class:`Result`
+    """
+    closes = chart.column("close")
+    dates = chart.column("date")
+    spreads = numpy.asarray(spread, dtype=numpy.float64)
+    # The spreads of a chart may be longer than a view on the chart.
+    spreads = numpy.broadcast_to(spreads[:len(closes)] if spreads.ndim else spreads, closes.shape)
+    value = signals.value
+    sell = (value == SELL) | signals.over_sell | signals.max_up
+    candidates = numpy.flatnonzero((value == BUY) | sell)
+    candidates = candidates[candidates >= start]
+
+    start_btc = btc
+    amount = 0.0
+    trades = []
+    profits = [0.0]
+    stop = None
+    for index in candidates.tolist():
+        rate = float(closes[index])
+        date = datetime.datetime.utcfromtimestamp(int(dates[index]))
+        if value[index] == BUY and btc > 0 and not amount:
+            amount = btc * (1 - spreads[index] * .01 - MAKER_FEE) / rate
+            trades.append(Trade(date, "BUY", rate, amount, btc))
+            btc = 0.0
+        elif value[index] != BUY and sell[index] and amount > 0:
+            btc = amount * rate * (1 - spreads[index] * .01 - TAKER_FEE)
+            trades.append(Trade(date, "SELL", rate, amount, btc))
+            amount = 0.0
+            profits.append((btc - start_btc) / btc * 100 if btc else 0.0)
+            if stopped(profits[-1], profits[-2] if len(profits) > 2 else 0.0,
+                       -numpy.inf if stop_loss is None else stop_loss,
+                       numpy.inf if stop_drop is None else stop_drop):
+                stop = date
+                break
+
+    total = btc + amount * float(closes[-1]) if len(closes) else btc
+    return Result(btc, amount, total, (total - start_btc) / start_btc * 100, trades, stop)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Cached balances of the account.
+
+The balances are a signed request to the trading API, which costs a
+nonce and counts against the trading budget. They only change by the
+orders of the bot (or by orders outside of the bot), so
+:class:`BalanceCache` requests them once and then applies the trades of
+the own orders as deltas, less the fees of the exchange. As fills of
+orders which rest on the book and orders outside of the bot are not
+seen, the balances are requested again once they are older than their
+TTL, after an order which was not filled completely and on an explicit
+refresh.
+"""
+import collections
+import threading
+import time
+
+BALANCE_TTL = 60
+# Default seconds the balances are used.
+
+Delta = collections.namedtuple("Delta", ["date", "market", "amount", "btc"])
+# Change of the balances by a trade. `amount` is the change of the coins
+# of the market and `btc` the change of the BTC.
+
+
+class BalanceCache(object):
+    """Balances of an account in the format of
+    :meth:`cointrader.exchanges.poloniex.Poloniex.balance`."""
+
+    def __init__(self, ttl=BALANCE_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.requests = 0
+        self.deltas = []
+        self._clock = clock
+        self._balances = None
+        self._time = None
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        return self._balances is None or self._clock() - self._time >= self.ttl
+
+    def get(self, api):
+        """Will return the balances. They are requested from the API if
+        the balances are stale.
+
+        :api: :class:`cointrader.exchanges.poloniex.Api` instance.
+        """
+        with self._lock:
+            if self._stale():
+                self._update(api)
+            return self._balances
+
+    def refresh(self, api):
+        """Will request the balances from the API."""
+        with self._lock:
+            self._update(api)
+            return self._balances
+
+    def invalidate(self):
+        """Will drop the balances. The next access requests them."""
+        with self._lock:
+            self._balances = None
+
+    def apply(self, market, result, fee=0.0, amount=None):
+        """Will apply the trades of an order to the balances and record
+        them as :class:`Delta`. The fee is taken from the coins of buy
+        orders and from the BTC of sell orders.
+
+        :market: Currency pair of the order like BTC_DASH.
+        :result: Result of the order as returned by the API.
+        :fee: Fee of the trades as fraction.
+        :amount: Amount of coins of the order. If the trades fill less
+            the rest of the order rests on the book and the balances are
+            requested again on the next access.
+        """
+        base, currency = market.split("_")
+        filled = 0.0
+        with self._lock:
+            for trade in result.get("resultingTrades", []):
+                coins = float(trade["amount"])
+                btc = float(trade["total"])
+                filled += coins
+                if trade["type"] == "sell":
+                    coins = -coins
+                    btc = btc * (1 - fee)
+                else:
+                    coins = coins * (1 - fee)
+                    btc = -btc
+                self.deltas.append(Delta(trade["date"], market, coins, btc))
+                if self._balances is not None:
+                    self._add(currency, coins, float(trade["rate"]))
+                    self._add(base, btc, 1.0)
+            if amount is not None and filled < amount * (1 - 1e-9):
+                self._balances = None
+
+    def _add(self, currency, quantity, rate):
+        balance = self._balances.setdefault(currency, {"quantity": 0.0, "btc_value": 0.0})
+        balance["quantity"] += quantity
+        balance["btc_value"] += quantity * rate
+
+    def _update(self, api):
+        self._balances = api.balance()
+        self._time = self._clock()
+        self.requests += 1
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Recorded order books.
+
+:class:`BookRecorder` stores snapshots of the order book of a market as
+returned by :meth:`cointrader.exchanges.poloniex.Poloniex.book` in a
+compact binary file. The file starts with a header of 64 bytes followed
+by one fixed-width record per snapshot::
+
+    header   magic, version, depth, market
+    record   time, seq, frozen, asks, bids, asks[depth][2], bids[depth][2]
+
+`time` is the UNIX timestamp of the snapshot, `asks` and `bids` the
+number of valid levels. Every level is a pair of price and amount. The
+records are written in chronological order, so :class:`BookReplayer` can
+find the snapshot for a given time with a binary search on the mapped
+file.
+"""
+import datetime
+import os
+import time
+
+import numpy
+
+MAGIC = b"CTORDERS"
+VERSION = 1
+
+HEADER = numpy.dtype([("magic", "S8"),
+                      ("version", "<u4"),
+                      ("depth", "<u4"),
+                      ("market", "S48")])
+
+
+class BookTapeError(ValueError):
+    pass
+
+
+def record_dtype(depth):
+    """Returns the dtype of the records of a file with the given
+    depth."""
+    return numpy.dtype([("time", "<f8"),
+                        ("seq", "<i8"),
+                        ("frozen", "<i2"),
+                        ("asks", "<i2"),
+                        ("bids", "<i2"),
+                        ("ask_levels", "<f8", (depth, 2)),
+                        ("bid_levels", "<f8", (depth, 2))])
+
+
+def _levels(levels, depth):
+    values = numpy.zeros((depth, 2))
+    levels = [(float(price), float(amount)) for price, amount in levels[:depth]]
+    if levels:
+        values[:len(levels)] = levels
+    return values, len(levels)
+
+
+def _timestamp(date):
+    if isinstance(date, datetime.datetime):
+        return (date - datetime.datetime(1970, 1, 1)).total_seconds()
+    return float(date)
+
+
+def _read_header(path):
+    header = numpy.fromfile(path, dtype=HEADER, count=1)
+    if len(header) != 1 or header[0]["magic"] != MAGIC:
+        raise BookTapeError("{} is not a order book file".format(path))
+    if header[0]["version"] != VERSION:
+        raise BookTapeError("Unsupported version {} of {}".format(header[0]["version"], path))
+    return header[0]
+
+
+class BookRecorder(object):
+    """Will append snapshots of the order book of a market to a file. A
+    new file is created if it does not exist."""
+
+    def __init__(self, path, market, depth=10):
+        """
+        :path: Path of the file.
+        :market: Currency pair like BTC_DASH.
+        :depth: Number of levels per side which are stored.
+        """
+        if os.path.exists(path) and os.path.getsize(path):
+            header = _read_header(path)
+            if header["market"].decode() != market:
+                raise BookTapeError("{} holds the order books of {}".format(path, header["market"].decode()))
+            depth = int(header["depth"])
+        else:
+            header = numpy.zeros(1, dtype=HEADER)
+            header[0] = (MAGIC, VERSION, depth, market.encode())
+            with open(path, "wb") as tape:
+                tape.write(header.tobytes())
+        self.path = path
+        self.market = market
+        self.depth = depth
+        self._dtype = record_dtype(depth)
+
+    def record(self, book, date=None):
+        """Will append the given order book.
+
+        :book: Order book as returned by the API.
+        :date: Datetime or UNIX timestamp of the snapshot. Defaults to
+            now.
+        """
+        record = numpy.zeros(1, dtype=self._dtype)
+        asks, ask_count = _levels(book["asks"], self.depth)
+        bids, bid_count = _levels(book["bids"], self.depth)
+        record[0] = (time.time() if date is None else _timestamp(date), book.get("seq", 0),
+                     int(book.get("isFrozen", 0)), ask_count, bid_count, asks, bids)
+        with open(self.path, "ab") as tape:
+            tape.write(record.tobytes())
+
+    def run(self, api, interval=10, count=None):
+        """Will request the order book of the market from the API every
+        `interval` seconds and record it.
+
+        :api: :class:`cointrader.exchanges.poloniex.Api` instance.
+        :interval: Seconds between two snapshots.
+        :count: Number of snapshots. Runs forever if None.
+        """
+        recorded = 0
+        while count is None or recorded < count:
+            self.record(api.book(self.market))
+            recorded += 1
+            if count is None or recorded < count:
+                time.sleep(interval)
+
+
+class BookReplayer(object):
+    """Will serve the recorded order books of a file by time. The file
+    is mapped and not loaded into memory."""
+
+    def __init__(self, path):
+        header = _read_header(path)
+        self.path = path
+        self.market = header["market"].decode()
+        self.depth = int(header["depth"])
+        dtype = record_dtype(self.depth)
+        count = (os.path.getsize(path) - HEADER.itemsize) // dtype.itemsize
+        if count:
+            self._records = numpy.memmap(path, dtype=dtype, mode="r", offset=HEADER.itemsize, shape=(count,))
+        else:
+            self._records = numpy.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def times(self):
+        """Returns the array of the timestamps of the snapshots."""
+        return self._records["time"]
+
+    def _book(self, index):
+        record = self._records[index]
+        return {"asks": record["ask_levels"][:record["asks"]].tolist(),
+                "bids": record["bid_levels"][:record["bids"]].tolist(),
+                "isFrozen": int(record["frozen"]),
+                "seq": int(record["seq"])}
+
+    def book(self, date):
+        """Will return the last order book recorded at or before the given
+        time in the format of the API. Returns None if there is no such
+        order book.
+
+        :date: Datetime or UNIX timestamp.
+        """
+        index = int(numpy.searchsorted(self.times, _timestamp(date), side="right")) - 1
+        if index < 0:
+            return None
+        return self._book(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield float(self._records[index]["time"]), self._book(index)
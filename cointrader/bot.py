@@ -2,13 +2,18 @@
 import sys
 import os
 import datetime
-import time
 import logging
 import sqlalchemy as sa
 import click
 import pandas as pd
 from cointrader import Base, engine, db
 from cointrader.asset_fond import asset_fond
+from cointrader.chart import COLUMNS
+from cointrader.clock import RealClock, SimulatedClock
+from cointrader.scheduler import CandleScheduler
+from cointrader.backtest import stopped
+from cointrader.exchange import MAKER_FEE, TAKER_FEE
+from cointrader.ledger import Ledger
 from cointrader.indicators import (
     WAIT, BUY, SELL, QUIT, Signal, signal_map
 )
@@ -22,8 +27,6 @@ from cointrader.helpers import (
 # to reattach the bot
 log = logging.getLogger(__name__)
 
-MAKER_FEE = .0025
-TAKER_FEE = MAKER_FEE
 
 def replay_tradelog(trades, market, _market):
     btc = 0
@@ -108,8 +111,6 @@ def create_bot(market, strategy, resolution, start, end, verbose, percent, autom
     bot = Cointrader(market=market, strategy=strategy, resolution=resolution, start=start, end=end, automatic=automatic,
                      percent=percent, btc=btc)
     bot.verbose = verbose
-    bot.spread = market._exchange.get_spread(bot._market._name)
-    bot.spread_tick = market._exchange.get_spread_tick(bot._market._name)
     if bot.verbose:
         print("Создаю нового бота {}".format(bot.market))
     log.info("Создаю нового бота {}".format(bot.market))
@@ -127,13 +128,21 @@ def create_bot(market, strategy, resolution, start, end, verbose, percent, autom
     chart = market.get_chart(resolution, start, end)
     rate = chart.get_first_point()["close"]
     date = datetime.datetime.utcfromtimestamp(chart.get_first_point()["date"])
+    bot.spread = market.get_spread()
+    bot.spread_tick = market.get_spread_tick()
+
+    if market._backtrade:
+        # Bots for backtests keep their trades in memory and are only
+        # saved in the database on request.
+        bot.ledger = Ledger(market._name)
+        bot._record(date, "INIT", 0, 0, rate, bot.fond.get_amount_btc(0.0, backtest=True), bot.fond.btc)
+        return bot
 
     trade = Trade(date, "INIT", 0, 0, market._name, rate, bot.fond.get_amount_btc(0.0), 0, bot.fond.btc, 0)
     active = Active(date, market._name)
 
     bot.trades.append(trade)
-    if not market._backtrade:
-        bot.activity.append(active)
+    bot.activity.append(active)
 
     # # Добавляем список активных торгов
     # bot.active_trade_signal = []
@@ -203,7 +212,8 @@ class Trade(Base):
     btc = sa.Column(sa.Float, nullable=False)
     btc_taxed = sa.Column(sa.Float, nullable=False)
 
-    def __init__(self, date, order_type, order_id, trade_id, market, rate, amount, amount_taxed, btc, btc_taxed):
+    def __init__(self, date, order_type, order_id, trade_id, market, rate, amount, amount_taxed, btc, btc_taxed,
+                 quiet=False):
         """Initialize a new trade log entry.
 
         :bot_id: ID of the bot which initiated the trade
@@ -217,6 +227,7 @@ class Trade(Base):
         :amount_taxed: How many coins bought (including fee) order
         :_btc_deleted: How many payed on buy
         :btc_taxed: How many BTC get (including fee) from sell
+        :quiet: Do not print and log the trade.
 
         """
         if not isinstance(date, datetime.datetime):
@@ -234,15 +245,21 @@ class Trade(Base):
         self.btc_taxed = btc_taxed
         self.minimal_count = 0
         self.bot_id = sa.Column(sa.Integer, sa.ForeignKey('bots.id'))
-        if self.order_type == "BUY":
-            print("\n{}: BUY {} @ {} paid -> {} BTC".format(self.date, self.amount, self.rate, self.btc))
-            log.info("{}: BUY {} @ {} paid -> {} BTC".format(self.date, self.amount, self.rate, self.btc))
-        elif self.order_type == "SELL":
-            print("\n{}: SELL {} @ {} earned -> {} BTC".format(self.date, self.amount, self.rate, self.btc))
-            log.info("{}: SELL {} @ {} earned -> {} BTC".format(self.date, self.amount, self.rate, self.btc))
-        elif self.order_type == "INIT":
-            print("\n{}: INIT {} BTC {} COINS".format(self.date, self.btc, self.amount))
-            log.info("{}: INIT {} BTC {} COINS".format(self.date, self.btc, self.amount))
+        if not quiet:
+            log_trade(self)
+
+
+def log_trade(trade):
+    """Will print and log the given trade."""
+    if trade.order_type == "BUY":
+        print("\n{}: BUY {} @ {} paid -> {} BTC".format(trade.date, trade.amount, trade.rate, trade.btc))
+        log.info("{}: BUY {} @ {} paid -> {} BTC".format(trade.date, trade.amount, trade.rate, trade.btc))
+    elif trade.order_type == "SELL":
+        print("\n{}: SELL {} @ {} earned -> {} BTC".format(trade.date, trade.amount, trade.rate, trade.btc))
+        log.info("{}: SELL {} @ {} earned -> {} BTC".format(trade.date, trade.amount, trade.rate, trade.btc))
+    elif trade.order_type == "INIT":
+        print("\n{}: INIT {} BTC {} COINS".format(trade.date, trade.btc, trade.amount))
+        log.info("{}: INIT {} BTC {} COINS".format(trade.date, trade.btc, trade.amount))
 
 
 class Active(Base):
@@ -289,6 +306,9 @@ class Cointrader(Base):
     automatic = sa.Column(sa.Boolean, nullable=False)
     trades = sa.orm.relationship("Trade")
     activity = sa.orm.relationship("Active")
+    ledger = None
+    # In-memory :class:`cointrader.ledger.Ledger` of a bot for backtests.
+    # Bots with a ledger are not saved in the database.
 
     def __init__(self, market, strategy, resolution="30m", start=None, end=None, automatic=False, percent=100, btc=0):
 
@@ -319,19 +339,47 @@ class Cointrader(Base):
         :return:
         """
 
-        if float(stat['profit_cointrader']) < float(-3) \
-            or (abs(abs(float(stat['profit_cointrader_before'])) - abs(float(stat['profit_cointrader']))) > .5
-                and 0 != float(stat['profit_cointrader_before'])):
+        if stopped(float(stat['profit_cointrader']), float(stat['profit_cointrader_before'])):
             self.detouch = True
             self.detouch_description = "Условие: выигрыш менее -3% или текущая продажа уменьшила выгрыш более 0.5% за раз"
 
+    @property
+    def tradelog(self):
+        """Returns the trades of the bot. These are the trades of the
+        ledger for bots in backtests."""
+        return self.trades if self.ledger is None else self.ledger
+
+    def _record(self, date, order_type, order_id, trade_id, rate, amount, btc):
+        """Will record a simulated trade in the ledger of the bot or in
+        the database if the bot has no ledger."""
+        if self.ledger is None:
+            self.trades.append(Trade(date, order_type, order_id, trade_id, self._market._name, rate,
+                                     btc_taxed=0, btc=btc, amount_taxed=0, amount=amount))
+            db.commit()
+        else:
+            self.ledger.append(date, order_type, rate, amount, btc)
+            log_trade(self.ledger[-1])
+
+    def persist(self):
+        """Will save the bot and the trades of its ledger in the
+        database. Later trades of the bot are saved in the database
+        too."""
+        if self.ledger is not None:
+            for entry in self.ledger:
+                self.trades.append(Trade(entry.date, entry.order_type, entry.order_id, entry.trade_id, entry.market,
+                                         entry.rate, entry.amount, entry.amount_taxed, entry.btc, entry.btc_taxed,
+                                         quiet=True))
+            self.ledger = None
+        db.add(self)
+        db.commit()
+
     def get_last_sell(self):
-        for t in self.trades[::-1]:
+        for t in self.tradelog[::-1]:
             if t.order_type == "SELL":
                 return t
 
     def get_last_buy(self):
-        for t in self.trades[::-1]:
+        for t in self.tradelog[::-1]:
             if t.order_type == "BUY":
                 return t
 
@@ -343,7 +391,25 @@ class Cointrader(Base):
 
         return amount
 
-    def _buy(self):
+    def _record_order(self, order_type, result):
+        """Will record every trade of the result of an order.
+
+        :returns: Tuple of the coins and the BTC of all trades of the
+            order.
+        """
+        total_amount, total_btc = 0.0, 0.0
+        for t in result.get("resultingTrades", []):
+            date = t["date"]
+            if not isinstance(date, datetime.datetime):
+                date = datetime.datetime.strptime(str(date)[:19], "%Y-%m-%d %H:%M:%S")
+            amount = float(t["amount"])
+            btc = float(t["total"])
+            total_amount += amount
+            total_btc += btc
+            self._record(date, order_type, result["orderNumber"], t["tradeID"], float(t["rate"]), amount, btc)
+        return total_amount, total_btc
+
+    def _buy(self, backtest=False):
         result = self._market.buy(self.fond.btc)
         # {u'orderNumber': u'101983568396',
         #  u'resultingTrades': [{u'tradeID': u'10337029',
@@ -353,7 +419,6 @@ class Cointrader(Base):
         #                        u'total': u'0.00018445', u'type': u'buy'}]}
         order_id = result["orderNumber"]
         order_type = "BUY"
-        total_amount = 0
 
         if result and self.verbose:
             for trade in result['resultingTrades']:
@@ -362,39 +427,32 @@ class Cointrader(Base):
                                                                     trade['total']
                                                                     ))
 
-        for t in result["resultingTrades"]:
-            trade_id = t["tradeID"]
-            date = t["date"]
-            amount = float(t["amount"])
-            total_amount += float(amount)
-            rate = float(t["rate"])
-            btc = float(t["total"])
-            trade = Trade(date, order_type, order_id, trade_id, self._market._name, rate, btc_taxed=0,
-                          btc=self.fond.btc, amount_taxed=0, amount=total_amount)
-            self.trades.append(trade)
+        total_amount, total_btc = self._record_order(order_type, result)
+        if not total_amount:
+            log.info("Order {} was not filled".format(order_id))
+            return False
 
-        self.fond.add_row(btc=self.fond.btc, amount_btc=total_amount, order_type=order_type)
+        # The BTC which were not spent (partial fill) stay in the fond.
+        self.fond.add_row(btc=total_btc, amount_btc=total_amount, order_type=order_type, backtest=backtest,
+                          available=self.fond.btc)
 
-        # Finally set the internal state of the bot. BTC will be 0 after
-        # buying but we now have some _amount_deleted of coins.
+        # Finally set the internal state of the bot. We now have some
+        # _amount_deleted of coins.
         self.fond.amount_btc = total_amount
-        self.fond.btc = 0.0
         self.state = 1
         db.commit()
+        return True
 
-    def _sell(self, amount_btc=0, first_sell=False, renew=False):
+    def _sell(self, amount_btc=0, first_sell=False, renew=False, backtest=False):
         # # Торгуем указанным количеством в парамтере *--coins*
         # if self.coins:
         #     _amount_deleted = self.test_min_value_btc(self.coins)
         # else:
         #     _amount_deleted = self.test_min_value_btc(self._amount_deleted)
 
-        global btc
         if amount_btc == 0:
-            amount_btc = self.fond.get_amount_btc(self.fond.amount_btc)
+            amount_btc = self.fond.get_amount_btc(self.fond.amount_btc, backtest=backtest)
             renew = True
-        else:
-            amount_btc = amount_btc
 
         result = self._market.sell(amount=amount_btc, price=None, )
         # {u'orderNumber': u'101984509454',
@@ -406,7 +464,6 @@ class Cointrader(Base):
         #                        u'type': u'sell'}]}
         order_id = result["orderNumber"]
         order_type = "SELL"
-        total_btc = 0.0
 
         if result and self.verbose:
             for trade in result['resultingTrades']:
@@ -415,24 +472,22 @@ class Cointrader(Base):
                                                                     trade['total']
                                                                     ))
 
-        for t in result["resultingTrades"]:
-            trade_id = t["tradeID"]
-            date = t["date"]
-            amount = float(t["amount"])
-            rate = float(t["rate"])
-            btc = float(t["total"])
-            total_btc += float(btc)
-            trade = Trade(date, order_type, order_id, trade_id, self._market._name, rate,
-                          btc_taxed=0, btc=total_btc, amount_taxed=0, amount=amount)
-            self.trades.append(trade)
+        total_amount, total_btc = self._record_order(order_type, result)
+        if not total_amount:
+            log.info("Order {} was not filled".format(order_id))
+            return False
 
-        self.fond.add_row(btc=total_btc, amount_btc=btc, order_type=order_type, first_sell=first_sell,
-                          renew=renew)
+        # The coins which were not sold (partial fill) stay in the fond,
+        # so the position is only closed if everything was sold.
+        renew = renew and total_amount >= amount_btc * (1 - 1e-9)
+        self.fond.add_row(btc=total_btc, amount_btc=total_amount, order_type=order_type, first_sell=first_sell,
+                          renew=renew, backtest=backtest)
 
         # Finally set the internal state of the bot. Amount will be 0 after
         # selling but we now have some BTC.
         self.state = 0.0
         db.commit()
+        return True
 
     def get_stop_limit(cls):
         try:
@@ -469,7 +524,7 @@ class Cointrader(Base):
         end_date = datetime.datetime.utcfromtimestamp(last["date"])
 
         # Set start value
-        for trade in self.trades:
+        for trade in self.tradelog:
             if trade.order_type == "INIT":
                 trader_start_btc = trade.btc
                 trader_start_amount = trade.amount
@@ -481,7 +536,7 @@ class Cointrader(Base):
         trader_start_value = trader_start_btc + trader_start_amount * market_start_rate
         market_start_value = trader_start_value
         result_step = []
-        for trade in self.trades:
+        for trade in self.tradelog:
             if trade.order_type == "BUY":
                 trader_end_amount += trade.amount
                 trader_end_btc -= trade.btc
@@ -527,7 +582,9 @@ class Cointrader(Base):
             "profit_cointrader_before": result_step[-2]['profit_cointrader'] if len(result_step) > 1 else 0.0,
         }
 
-        if delete_trades:
+        if delete_trades and self.ledger is not None:
+            self.ledger.clear()
+        elif delete_trades:
             for trade in self.trades:
                 try:
                     db.delete(trade)
@@ -560,7 +617,7 @@ class Cointrader(Base):
         # Set number of seconds to wait until the bot again call for a
         # trading signal. This defaults to the resolution of the bot
         # which is provided on initialisation.
-        if automatic and not backtest:
+        if automatic or backtest:
             interval = self._market._exchange.resolution2seconds(self._resolution)
         else:
             interval = 0
@@ -596,8 +653,7 @@ class Cointrader(Base):
                     else:
                         part = 0.13
                     total_amount = self.fond.get_amount_btc(self.fond.amount_btc, backtest=backtest) * part
-                    closing = chart.values()
-                    _value = closing[-1][1]
+                    _value = chart.close
                     total_amount = self.fond.get_allow_sell(amount_to_sell=total_amount, rate=_value)
                     if total_amount == self.fond.get_amount_btc(self.fond.amount_btc, backtest=backtest):
                         renew = True
@@ -607,29 +663,27 @@ class Cointrader(Base):
                     result = 'Sell'
                     # Выводим статистику
                     click.echo(render_bot_statistic(self, self.stat()))
+        elif self._market._books is not None:
+            result = self._handle_book_signal(signal, first_sell)
         else:
             if (signal.value == BUY and self.fond.btc > 0) or (
                 signal.value == SELL and self.fond.amount_btc > 0) or (
                 first_sell and self.fond.amount_btc > 0):
                 # Get current chart
-                closing = chart.values()
-                _value = closing[-1][1]
-                _date = datetime.datetime.utcfromtimestamp(closing[-1][0])
+                _value = chart.close
+                _date = datetime.datetime.utcfromtimestamp(chart.date)
 
                 if signal.buy and not first_sell and not self.fond.rows:
                     order_type = "BUY"
-                    spread = self._market._exchange.get_spread(self.market) * .01
+                    spread = self._market.get_spread() * .01
                     market_tax = self.fond.btc * (spread + MAKER_FEE)
                     total_amount = (self.fond.btc - market_tax) / _value
-                    trade = Trade(_date, order_type, '11111111', '111111111', self._market._name, _value, btc_taxed=0,
-                                  btc=self.fond.btc, amount_taxed=0, amount=total_amount)
+                    self._record(_date, order_type, '11111111', '111111111', _value, total_amount, self.fond.btc)
 
                     self.fond.add_row(btc=self.fond.btc, amount_btc=total_amount, order_type=order_type,
                                       first_sell=first_sell, backtest=backtest)
 
                     self.state = 1
-                    db.commit()
-                    self.trades.append(trade)
                     result = 'Buy'
 
                     # Выводим статистику
@@ -638,18 +692,15 @@ class Cointrader(Base):
                 elif signal.sell and not first_sell:
                     order_type = "SELL"
                     total_amount = self.fond.get_amount_btc(self.fond.amount_btc, backtest=backtest)
-                    spread = self._market._exchange.get_spread(self.market) * .01
+                    spread = self._market.get_spread() * .01
                     total_btc = total_amount * _value - (total_amount * _value * (spread + TAKER_FEE))
-                    trade = Trade(_date, order_type, '22222222', '222222222', self._market._name, _value,
-                                  btc_taxed=0, btc=total_btc, amount_taxed=0, amount=total_amount)
+                    self._record(_date, order_type, '22222222', '222222222', _value, total_amount, total_btc)
 
                     # Finally set the internal state of the bot. Amount will be 0 after
                     # selling but we now have some BTC.
                     self.state = 0
                     self.fond.add_row(btc=total_btc, amount_btc=total_amount, order_type=order_type,
                                       first_sell=first_sell, renew=True, backtest=backtest)
-                    db.commit()
-                    self.trades.append(trade)
                     result = 'Sell'
 
                     # Выводим статистику
@@ -665,19 +716,15 @@ class Cointrader(Base):
                         renew = False
 
                     total_amount = self.fond.get_amount_btc(self.fond.amount_btc, backtest=backtest) * part
-                    spread = self._market._exchange.get_spread(self.market) * .01
+                    spread = self._market.get_spread() * .01
                     total_btc = total_amount * _value - (total_amount * _value * (spread + TAKER_FEE))
-
-                    trade = Trade(_date, order_type, '22222222', '222222222', self._market._name, _value,
-                                  btc_taxed=0, btc=total_btc, amount_taxed=0, amount=total_amount)
+                    self._record(_date, order_type, '22222222', '222222222', _value, total_amount, total_btc)
 
                     # Finally set the internal state of the bot. Amount will be 0 after
                     # selling but we now have some BTC.
                     self.state = 0
                     self.fond.add_row(btc=total_btc, amount_btc=total_amount, order_type="SELL", first_sell=first_sell,
                                       renew=renew)
-                    db.commit()
-                    self.trades.append(trade)
                     result = 'Sell'
 
                     # Выводим статистику
@@ -685,13 +732,42 @@ class Cointrader(Base):
 
         return result
 
-    def start(self, backtest=False, automatic=False, show_report=False, memory_only=False):
+    def _handle_book_signal(self, signal, first_sell=False):
+        """Will handle the signal of a backtest on a market with
+        recorded order books. The orders go through
+        :meth:`cointrader.exchange.Market.buy` and
+        :meth:`cointrader.exchange.Market.sell` like in live trading and
+        are filled on the order book recorded at the close."""
+        result = 'No action'
+        if signal.buy and not first_sell and not self.fond.rows and self.fond.btc > 0:
+            if self._buy(backtest=True):
+                result = 'Buy'
+        elif signal.sell and not first_sell and self.fond.amount_btc > 0:
+            if self._sell(renew=True, backtest=True):
+                result = 'Sell'
+        elif first_sell and self.fond.amount_btc > 0:
+            if 30 < self.fond.sell_percent < 90:
+                part = 0.34
+                renew = True
+            else:
+                part = 0.13
+                renew = False
+            if self._sell(self.fond.amount_btc * part, first_sell, renew=renew, backtest=True):
+                result = 'Sell'
+        if result != 'No action':
+            # Выводим статистику
+            click.echo(render_bot_statistic(self, self.stat()))
+        return result
+
+    def start(self, backtest=False, automatic=False, show_report=False, memory_only=False, clock=None):
         """Start the bot and begin trading with given _amount_deleted of BTC.
 
         The bot will trigger a analysis of the chart every N seconds.
         The default number of seconds is set on initialisation using the
         `resolution` option. You can overwrite this setting
-        by using the `interval` option.
+        by using the `interval` option. Automatic bots on a live market
+        are triggered shortly after the close of every candle, see
+        :class:`cointrader.scheduler.CandleScheduler`.
 
         By setting the `backtest` option the trade will be simulated on
         real chart data. This is useful for testing to see how good
@@ -699,26 +775,33 @@ class Cointrader(Base):
 
         :_btc_deleted: Amount of BTC to start trading with
         :backtest: Simulate trading on historic chart data on the given market.
+        :clock: :class:`cointrader.clock.Clock` which controls the
+            timing of the bot. Defaults to a simulated clock at maximum
+            speed for backtests and to the real clock otherwise.
         :returns: None
         """
 
+        if clock is None:
+            clock = SimulatedClock() if backtest else RealClock()
         interval = self._get_interval(automatic, backtest)
-        chart_last = None
+        scheduler = None
         count = 0
         while 1:
 
-            if chart_last == None and not backtest and automatic:
+            if scheduler is None and not backtest and automatic:
                 print("Синхронизируемся по времени свечи.")
-                while 1:
-                    if chart_last == None:
-                        chart_last = self._market.get_chart(self._resolution, None, None).data[-1]['date']
-                    if chart_last != self._market.get_chart(self._resolution, None, None).data[-1]['date']:
-                        print("Синхронизация завершена.")
-                        break
-                    time.sleep(1)
+                scheduler = CandleScheduler(self._market, self._resolution, clock)
+                scheduler.wait()
+                print("Синхронизация завершена.")
+
+            if not backtest:
+                # Requests the balances of the account again once they are
+                # stale, so fills outside of the bot are seen.
+                self._market._exchange.get_balance()
 
             if backtest:
                 chart = self._market.get_chart(self._resolution, self._start, self._end)
+                clock.sleep_until(chart.date)
 
                 if count == 0:
                     old_stdout = sys.stdout
@@ -755,8 +838,7 @@ class Cointrader(Base):
 
             signal = self._strategy.signal(chart, self.verbose, self.get_stop_limit(), backtest,
                                            self._market._backtest_tick)
-            closing = chart.values()
-            _value = closing[-1][1]
+            _value = chart.close
 
             # if signal.value == QUIT and (0 < len(self.trades) <= 1):
             #     print("\nПараметры покупки не удовлетворительны. Отключаю бота.")
@@ -801,7 +883,7 @@ class Cointrader(Base):
                     if click.confirm('Sell {}?'.format(self.fond.amount_btc)):
                         signal = Signal(SELL, datetime.datetime.utcnow())
                 elif c == 'l':
-                    click.echo(render_bot_tradelog(self.trades))
+                    click.echo(render_bot_tradelog(self.tradelog))
                 elif c == 'p':
                     click.echo(render_bot_statistic(self, self.stat()))
                 elif c == 'd':
@@ -841,10 +923,8 @@ class Cointrader(Base):
 
                 if not self._market.continue_backtest():
                     if show_report:
-                        data = chart.data
-                        df = pd.io.json.json_normalize(data)
+                        df = pd.DataFrame({column: chart.column(column) for column in COLUMNS})
                         df['date'] = pd.to_datetime(df.date, unit='s')
-                        df = df[['close', 'date', 'high', 'low', 'open', 'volume', 'weightedAverage']]
 
                         from stockstats import StockDataFrame
                         from bokeh.plotting import figure, show, output_notebook, output_file
@@ -935,8 +1015,10 @@ class Cointrader(Base):
                 else:
                     print("\n Бот отключен")
                     break
+            elif scheduler is not None:
+                scheduler.wait()
             else:
-                time.sleep(interval)
+                clock.sleep(interval)
             count += 1
             print()
 
@@ -1008,7 +1090,7 @@ class Cointrader(Base):
 
     def first_sell(self, price):
         first_sell_in_it = False
-        spread = self._market._exchange.get_spread(self.market)
+        spread = self._market.get_spread()
         for item in self.fond.rows:
             if item["order_type"] == "SELL" and item["first_sell"] == True:
                 first_sell_in_it = True
@@ -1,20 +1,62 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import io
-import pandas
+import collections
 import datetime
-import stockstats
+import numpy
 
+from cointrader import streaming, ta
 
-def chart2csv(chart):
-    out = []
-    header = "date,_amount_deleted,close,high,low,open,volume"
-    out.append(header)
-    for cs in chart:
-        out.append("{},{},{},{},{},{},{}".format(cs["date"],
-                                                 "", cs["close"], cs["high"],
-                                                 cs["low"], cs["open"], cs["volume"]))
-    return u"\n".join(out)
+COLUMNS = ("date", "open", "high", "low", "close", "volume")
+# Columns of a chart which are kept as arrays. The date is stored as
+# int64 UNIX timestamp, all other columns as float64.
+
+
+INDICATORS = {
+    "macdh": (ta.macdh, ("close",)),
+    "sma": (ta.sma, ("close",)),
+    "ema": (ta.ema, ("close",)),
+    "rsi": (ta.rsi, ("close",)),
+    "wr": (ta.wr, ("high", "low", "close")),
+    "adx": (ta.adx, ("high", "low", "close")),
+    "maxima": (ta.window_maxima, ("close",)),
+    "spread": (ta.hl_spread, ("high", "low")),
+}
+# Functions and columns used to calculate the indicators of a chart.
+
+STREAMING = {
+    "macdh": streaming.MACD,
+    "sma": streaming.SMA,
+    "ema": streaming.EMA,
+    "rsi": streaming.RSI,
+    "wr": streaming.WR,
+    "adx": streaming.ADX,
+}
+# Streaming indicators used to extend the cached indicators of a chart
+# when a candle is appended.
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "extended", "size"])
+
+
+def _grow(array, length, capacity):
+    grown = numpy.zeros(capacity, dtype=array.dtype)
+    grown[:length] = array[:length]
+    return grown
+
+
+def chart2arrays(chart):
+    """Will convert the list of datapoints as returned by the API into
+    a dictionary of contiguous NumPy arrays. One array per column in
+    `COLUMNS`.
+
+    :chart: List of datapoints as dictionary.
+    :returns: Dictionary with the column name as key and the array as value.
+    """
+    count = len(chart)
+    arrays = {}
+    for column in COLUMNS:
+        dtype = numpy.int64 if column == "date" else numpy.float64
+        arrays[column] = numpy.fromiter((cs[column] for cs in chart), dtype=dtype, count=count)
+    return arrays
 
 
 def search_chartdata_by_date(data, dt, le=True):
@@ -28,6 +70,76 @@ def search_chartdata_by_date(data, dt, le=True):
     return chart_item
 
 
+def search_index_by_date(dates, dt):
+    """Will return the index of the last datapoint in the sorted array
+    of `dates` which is not after the given datetime. If all datapoints
+    are after the datetime the index of the first datapoint is
+    returned."""
+    ts = (dt - datetime.datetime(1970, 1, 1)).total_seconds()
+    index = int(numpy.searchsorted(dates, ts, side="right")) - 1
+    return max(index, 0)
+
+
+class IndicatorCache(object):
+    """Cache of the indicators calculated on a chart. The indicators are
+    keyed by their name and parameters. For every indicator the number
+    of datapoints it was calculated for is kept, so charts on the first
+    datapoints of the chart get a slice of the cached values.
+
+    If a candle is appended to the chart the cached indicators are
+    extended by one value using the indicators of
+    :mod:`cointrader.streaming` instead of being calculated again. The
+    streaming indicators are seeded on the first append. Live markets
+    keep their chart and append the closed candles of the push API or
+    of the :class:`cointrader.scheduler.CandleScheduler`. Backtests load
+    their chart once and calculate the indicators on the whole chart."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.extended = 0
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, length):
+        """Returns the first `length` values of the cached indicator or
+        None if the indicator is not cached for that many datapoints."""
+        entry = self._entries.get(key)
+        if entry is None or entry["length"] < length:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["buffer"][:length]
+
+    def put(self, key, values):
+        """Will cache the values of the indicator for all datapoints of
+        the chart and return them."""
+        self._entries[key] = {"buffer": values, "length": len(values), "state": None}
+        return values
+
+    def extend(self, chart, candle):
+        """Will extend all cached indicators of `chart` by the value
+        for the given new candle."""
+        for (name, params), entry in list(self._entries.items()):
+            if entry["length"] != len(chart) or name not in STREAMING:
+                del self._entries[(name, params)]
+                continue
+            if entry["state"] is None:
+                entry["state"] = STREAMING[name](*params).seed(chart)
+            value = entry["state"].append(candle)
+            length = entry["length"]
+            if len(entry["buffer"]) == length:
+                entry["buffer"] = _grow(entry["buffer"], length, max(2 * length, 16))
+            entry["buffer"][length] = value
+            entry["length"] = length + 1
+            self.extended += 1
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.extended, len(self._entries))
+
+
 class Chart(object):
     """The chart provides a unified interface to the chart data. It also
     gives access so some common indicators like macd, sma and ema.
@@ -47,6 +159,11 @@ class Chart(object):
             u'weightedAverage': 0.07157933,
         }
 
+    Internally the chart keeps the columns listed in `COLUMNS` as
+    contiguous NumPy arrays. Use :meth:`from_arrays` to build a chart
+    directly from arrays without going through the list of
+    dictionaries.
+
     The `start` and `end` datetimes define the relevant timeframe of
     the chart for later profit calculations. This date range is
     needed as the chart itself cointains more more datapoints than
@@ -68,53 +185,212 @@ class Chart(object):
         self._data = data
         self._start = start
         self._end = end
-        self._stock = stockstats.StockDataFrame.retype(pandas.read_csv(io.StringIO(chart2csv(data))))
+        self._arrays = chart2arrays(data)
+        self._cache = IndicatorCache()
+        self._buffers = None
+        self._capacity = 0
+        self._root = None
+
+    @classmethod
+    def from_arrays(cls, arrays, start, end):
+        """Will build a chart instance from a dictionary of arrays. The
+        arrays are used as they are and not copied.
+
+        :arrays: Dictionary with one array per column in `COLUMNS`.
+        :start: Datetime object.
+        :end: Datetime object.
+        :returns: Chart instance.
+        """
+        chart = cls.__new__(cls)
+        chart._data = None
+        chart._start = start
+        chart._end = end
+        chart._arrays = arrays
+        chart._cache = IndicatorCache()
+        chart._buffers = None
+        chart._capacity = 0
+        chart._root = None
+        return chart
+
+    def view(self, stop, start=None, end=None):
+        """Will return a chart on the first datapoints of this chart up
+        to `stop` (exclusive, negative values count from the end like
+        in slices). The returned chart shares the arrays with this chart
+        and nothing is copied. As all indicators only depend on past
+        datapoints the indicators of the view are taken from the
+        indicators of this chart and are calculated only once.
+
+        :stop: Index of the end of the view.
+        :start: Datetime object. Defaults to the start of this chart.
+        :end: Datetime object. Defaults to the end of this chart.
+        :returns: Chart instance.
+        """
+        arrays = {column: self._arrays[column][:stop] for column in COLUMNS}
+        chart = Chart.from_arrays(arrays,
+                                  self._start if start is None else start,
+                                  self._end if end is None else end)
+        chart._root = self if self._root is None else self._root
+        return chart
+
+    def __len__(self):
+        return len(self._arrays["date"])
+
+    def append(self, candle):
+        """Will append the given candle to the chart. The cached
+        indicators of the chart are extended by one value. Charts which
+        are a view on another chart can not be extended.
+
+        :candle: Dictionary with at least the columns in `COLUMNS`.
+        """
+        if self._root is not None:
+            raise ValueError("Can not append to a view of a chart")
+        self._cache.extend(self, candle)
+        length = len(self)
+        if length >= self._capacity:
+            # The arrays are copied on the first append as they might be
+            # shared or read-only.
+            self._capacity = max(2 * length, 16)
+            self._buffers = {column: _grow(self._arrays[column], length, self._capacity) for column in COLUMNS}
+        for column in COLUMNS:
+            self._buffers[column][length] = candle[column]
+        self._arrays = {column: self._buffers[column][:length + 1] for column in COLUMNS}
+        self._data = None
 
     @property
     def data(self):
+        if self._data is None:
+            self._data = [self._point(i) for i in range(len(self))]
         return self._data
 
     @property
     def date(self):
-        return self._data[-1]["date"]
+        return int(self._arrays["date"][-1])
 
     @property
     def close(self):
-        return self._data[-1]["close"]
+        return float(self._arrays["close"][-1])
+
+    def column(self, which="close"):
+        """Returns the array of the given column of the chart."""
+        return self._arrays[which]
+
+    def _point(self, index):
+        point = {}
+        for column in COLUMNS:
+            value = self._arrays[column][index]
+            point[column] = int(value) if column == "date" else float(value)
+        return point
 
     def get_first_point(self):
-        return search_chartdata_by_date(self.data, self._start)
+        return self._point(search_index_by_date(self._arrays["date"], self._start))
 
     def get_last_point(self):
-        return search_chartdata_by_date(self.data, self._end)
+        return self._point(search_index_by_date(self._arrays["date"], self._end))
 
     def values(self, which="close"):
-        return [(v["date"], v[which]) for v in self._data]
+        """Returns a array with two columns. The first column is the
+        date of the datapoint the second one the value of the
+        requested column.
+
+        The array is a new float64 copy of both columns on every call.
+        Use :meth:`column` to get the arrays of the chart without a
+        copy."""
+        return numpy.column_stack((self._arrays["date"], self._arrays[which]))
 
     ################
     #  Indicators  #
     ################
 
+    def _indicator(self, name, *params):
+        """Returns the values of the given indicator calculated with the
+        functions of :mod:`cointrader.ta`. The values are cached on the
+        root chart by the name of the indicator and its parameters. For
+        views the cached values of the root chart are sliced."""
+        root = self if self._root is None else self._root
+        key = (name, params)
+        values = root._cache.get(key, len(self))
+        if values is None:
+            function, columns = INDICATORS[name]
+            values = function(*[root._arrays[column] for column in columns] + list(params))
+            values = root._cache.put(key, values)[:len(self)]
+        return values
+
+    def cache_info(self):
+        """Returns the hits, misses and number of extended values of the
+        indicator cache of the chart and the number of cached
+        indicators."""
+        root = self if self._root is None else self._root
+        return root._cache.info()
+
     def macdh(self):
-        self._stock.get("macd")
-        return self._stock["macdh"].tolist()
+        return self._indicator("macdh")
 
     def sma(self, window=10):
-        sma = self._stock.get("close_{}_sma".format(window))
-        return sma.tolist()
+        return self._indicator("sma", window)
 
     def ema(self, window=10):
-        ema = self._stock.get("close_{}_ema".format(window))
-        return ema.tolist()
+        return self._indicator("ema", window)
 
     def rsi(self):
-        self._stock.get('rsi_9')
-        return self._stock['rsi_9'].tolist()
+        return self._indicator("rsi", 9)
 
     def wr(self):
-        self._stock.get('wr_9')
-        return self._stock['wr_9'].tolist()
+        return self._indicator("wr", 9)
 
     def dmi(self):
-        self._stock.get('adx')
-        return self._stock['adx'].tolist()
+        return self._indicator("adx")
+
+    def maxima(self, start=0):
+        """Returns the number of local maxima and the largest maximum of
+        the closes from `start` up to every datapoint as rows of a two
+        column array. See :func:`cointrader.ta.window_maxima`."""
+        return self._indicator("maxima", start)
+
+    def spread(self, window=20):
+        """Returns the spread in percent estimated from the high and low
+        of the candles. See :func:`cointrader.ta.hl_spread`."""
+        return self._indicator("spread", window)
+
+
+class BacktestCursor(object):
+    """The backtest cursor gives read-only access to a chart which is
+    loaded once for a backtest. The position of the backtest is given
+    by `tick` which is the number of datapoints visible at the current
+    step of the backtest. Advancing the cursor does only move the tick,
+    the charts for the current step are views on the loaded chart."""
+
+    def __init__(self, tick=1):
+        self.tick = tick
+        self._chart = None
+
+    def __len__(self):
+        if self._chart is None:
+            return 0
+        return len(self._chart)
+
+    @property
+    def loaded(self):
+        return self._chart is not None
+
+    def load(self, chart):
+        """Will load the given chart into the cursor. The arrays of the
+        chart are made read-only. The tick is not changed."""
+        for column in COLUMNS:
+            chart.column(column).flags.writeable = False
+        self._chart = chart
+
+    def advance(self):
+        """Moves the cursor to the next datapoint. Returns False if
+        the end of the loaded chart was reached."""
+        self.tick += 1
+        return self.loaded and len(self) >= self.tick
+
+    def chart(self, stop=None, start=None, end=None):
+        """Returns a view on the loaded chart with all datapoints up to
+        the current tick or the given `stop`."""
+        return self._chart.view(self.tick if stop is None else stop, start, end)
+
+    def last(self, which="close"):
+        """Returns the value of the given column of the last visible
+        datapoint."""
+        return self._chart.column(which)[min(self.tick, len(self)) - 1]
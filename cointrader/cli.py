@@ -15,6 +15,10 @@ from cointrader.config import Config, get_path_to_config
 from cointrader.exchange import Poloniex, Market
 from cointrader.exchanges.poloniex import ApiError
 from cointrader.bot import init_db, get_bot, create_bot, Active
+from cointrader.booktape import BookRecorder, BookReplayer, BookTapeError
+from cointrader.clock import SimulatedClock
+from cointrader.push import PushClient
+from cointrader.spread import SPREAD_MODELS, spread_model
 from cointrader.helpers import render_bot_statistic, render_bot_tradelog
 
 # Создание лога
@@ -123,9 +127,12 @@ def balance(ctx):
 @click.option("--coins", help="Set initial amount of coint the bot will use for trading.", type=float)
 @click.option("--verbose", help="Вывод на экран логируемых сообщений.", is_flag=False)
 @click.option("--percent", help="Процент торговли от всей суммы.", is_flag=False)
+@click.option("--speed", help="Replay backtests at N times real time. Defaults to maximum speed.", default=None,
+              type=float)
+@click.option("--push", help="Take the candles and the spread of live bots from the push API.", is_flag=True)
 @pass_context
 def start(ctx, market, resolution, start, end, automatic, backtest, papertrade, strategy, btc, coins, verbose, percent,
-          lastndays, other_time=False):
+          lastndays, speed, push, other_time=False):
     """Start a new bot on the given market and the given _amount_deleted of BTC
     :param ctx:
     :param market:
@@ -141,6 +148,8 @@ def start(ctx, market, resolution, start, end, automatic, backtest, papertrade,
     :param verbose:
     :param percent:
     :param lastndays:
+    :param speed:
+    :param push:
     """
     # Check start and end date
     try:
@@ -227,7 +236,7 @@ def start(ctx, market, resolution, start, end, automatic, backtest, papertrade,
                     db.delete(trade)
             except:
                 pass
-        bot.start(backtest=True, automatic=True)
+        bot.start(backtest=True, automatic=True, clock=SimulatedClock(speed=speed))
         delete_bot(bot)
         best_testing_market.append({"market": current_market._name, "profit": bot.profit})
 
@@ -240,6 +249,10 @@ def start(ctx, market, resolution, start, end, automatic, backtest, papertrade,
     if best_testing_market[-1]["profit"] > 0:
         print("Текущий заработок на паре {} составляет {}".format(best_testing_market[-1]["profit"],
                                                                   best_testing_market[-1]["market"]))
+        if push:
+            period = ctx.exchange.resolution2seconds(resolution)
+            client = PushClient.from_ticker(ctx.exchange.ticker(), [bot._market._name], periods=(period,)).start()
+            bot._market.load_stream(client)
         bot.start(backtest=False, automatic=automatic)
     else:
         print("На данной паре заработок отсутсвует.")
@@ -272,7 +285,7 @@ def start(ctx, market, resolution, start, end, automatic, backtest, papertrade,
         # bot.start(False, automatic)
 
     if backtest:
-        click.echo(render_bot_tradelog(bot.trades))
+        click.echo(render_bot_tradelog(bot.tradelog))
         click.echo(render_bot_statistic(bot, bot.stat(True)))
         # try:
         #     for active in bot.activity:
@@ -288,6 +301,10 @@ def start(ctx, market, resolution, start, end, automatic, backtest, papertrade,
 
 
 def delete_bot(bot):
+    if bot.ledger is not None:
+        # Bots of backtests are not saved in the database.
+        bot.ledger.clear()
+        return
     try:
         for active in bot.activity:
             db.delete(active)
@@ -340,10 +357,134 @@ def exchange(ctx, dollar):
     click.echo("{}$ ~ {}BTC".format(dollar, btc))
 
 
+SWEEP_RANGES = {"fast": range(5, 21, 2), "slow": range(20, 41, 3), "buy_rsi": (55, 63, 70), "min_adx": (15, 20, 25)}
+# Parameter values of the sweep and the walk-forward optimization.
+
+
+@click.command()
+@click.argument("market")
+@click.option("--resolution", help="Resolution of the chart which is used for trend analysis", default="30m")
+@click.option("--lastndays", help="Use the history of the last N days", default=30, type=int)
+@click.option("--limit", help="Number of the best combinations which are shown", default=20, type=int)
+@click.option("--processes", help="Number of processes. Defaults to the number of CPUs.", default=None, type=int)
+@click.option("--spread-model", "spread_model_name", help="Model of the spread in the backtests.", default="fixed",
+              type=click.Choice(SPREAD_MODELS.keys()))
+@pass_context
+def sweep(ctx, market, resolution, lastndays, limit, processes, spread_model_name):
+    """Will backtest the Followtrend strategy with every combination of
+    parameters on the history of the market and rank them by profit."""
+    from cointrader.sweep import grid, table
+    from cointrader.sweep import sweep as run_sweep
+    end, start = set_start_end(None, lastndays, None)
+    market = set_market(True, ctx, end, market, start)
+    chart = market.get_chart(resolution, start, end)
+    combinations = grid(**SWEEP_RANGES)
+    spread = spread_model(spread_model_name, ctx.exchange.get_spread(market._name)).series(chart)
+    scores = run_sweep(chart, combinations, spread=spread, processes=processes)
+    click.echo(table(scores, limit))
+
+
+@click.command()
+@click.argument("market")
+@click.option("--resolution", help="Resolution of the chart which is used for trend analysis", default="30m")
+@click.option("--lastndays", help="Use the history of the last N days", default=30, type=int)
+@click.option("--train", help="Number of datapoints to optimize the parameters on", default=480, type=int)
+@click.option("--test", help="Number of datapoints to score the parameters on", default=96, type=int)
+@click.option("--processes", help="Number of processes. Defaults to the number of CPUs.", default=None, type=int)
+@click.option("--spread-model", "spread_model_name", help="Model of the spread in the backtests.", default="fixed",
+              type=click.Choice(SPREAD_MODELS.keys()))
+@pass_context
+def walkforward(ctx, market, resolution, lastndays, train, test, processes, spread_model_name):
+    """Will optimize the parameters of the Followtrend strategy on
+    rolling windows of the history of the market and score them on the
+    following window."""
+    from cointrader.sweep import grid
+    from cointrader.walkforward import profit, table, walk_forward
+    end, start = set_start_end(None, lastndays, None)
+    market = set_market(True, ctx, end, market, start)
+    chart = market.get_chart(resolution, start, end)
+    combinations = grid(**SWEEP_RANGES)
+    spread = spread_model(spread_model_name, ctx.exchange.get_spread(market._name)).series(chart)
+    try:
+        results = walk_forward(chart, combinations, train, test, spread=spread, processes=processes)
+    except ValueError as ex:
+        click.echo(ex)
+        sys.exit(1)
+    if not results:
+        click.echo("The history of {} datapoints is too short for the folds".format(len(chart)))
+        sys.exit(1)
+    click.echo(table(chart, results))
+    click.echo("Out-of-sample profit: {:.2f}%".format(profit(results)))
+
+
+@click.command()
+@click.argument("market")
+@click.argument("path")
+@click.option("--interval", help="Seconds between two order books", default=10, type=float)
+@click.option("--count", help="Number of order books. Records until interrupted on default.", default=None, type=int)
+@click.option("--depth", help="Number of levels per side of a new file", default=10, type=int)
+@pass_context
+def record(ctx, market, path, interval, count, depth):
+    """Will record the order books of the market into the file PATH for
+    backtests with the replay command."""
+    if not ctx.exchange.is_valid_market(market):
+        click.echo("Market {} is not available".format(market))
+        sys.exit(1)
+    try:
+        recorder = BookRecorder(path, market, depth)
+    except BookTapeError as ex:
+        click.echo(ex)
+        sys.exit(1)
+    try:
+        recorder.run(ctx.exchange._api, interval, count)
+    except KeyboardInterrupt:
+        pass
+    click.echo("{} order books in {}".format(len(BookReplayer(path)), path))
+
+
+@click.command()
+@click.argument("path")
+@click.option("--resolution", help="Resolution of the chart which is used for trend analysis", default="5m")
+@click.option("--strategy", help="Stratgegy used for trading.", default="trend", type=click.Choice(STRATEGIES.keys()))
+@click.option("--btc", help="Set initial amountof BTC the bot will use for trading.", default=1.0, type=float)
+@click.option("--spread-model", "spread_model_name", help="Model of the spread in the backtests.", default="fixed",
+              type=click.Choice(SPREAD_MODELS.keys()))
+@pass_context
+def replay(ctx, path, resolution, strategy, btc, spread_model_name):
+    """Will backtest the strategy on the time of the order books recorded
+    in the file PATH. The orders of the backtest are filled on the
+    recorded order books like the orders of live trading."""
+    try:
+        replayer = BookReplayer(path)
+    except BookTapeError as ex:
+        click.echo(ex)
+        sys.exit(1)
+    if not len(replayer):
+        click.echo("{} holds no order books".format(path))
+        sys.exit(1)
+    if not ctx.exchange.is_valid_resolution(resolution):
+        click.echo("Resolution {} is not supported.".format(resolution))
+        sys.exit(1)
+    start = datetime.datetime.utcfromtimestamp(float(replayer.times[0]))
+    end = datetime.datetime.utcfromtimestamp(float(replayer.times[-1]))
+    market = Market(ctx.exchange, replayer.market, backTrade=True)
+    market.load_books(replayer)
+    market.spread_model = spread_model(spread_model_name, ctx.exchange.get_spread(market._name))
+    bot = create_bot(market, STRATEGIES[strategy](), resolution, start, end, False, 100, True, btc)
+    bot.start(backtest=True, automatic=True, clock=SimulatedClock())
+    click.echo(render_bot_tradelog(bot.tradelog))
+    click.echo(render_bot_statistic(bot, bot.stat()))
+    delete_bot(bot)
+
+
 main.add_command(explore)
 main.add_command(balance)
 main.add_command(exchange)
 main.add_command(start)
+main.add_command(sweep)
+main.add_command(walkforward)
+main.add_command(record)
+main.add_command(replay)
 
 # Запуск сценария
 if __name__ == "__main__":
@@ -1,18 +1,24 @@
 # -*- coding: utf-8 -*-
 # Импорт библиотек
+import contextlib
 import logging
 import os.path
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import click
 import pandas as pd
+import sqlalchemy as sa
 from datetime import datetime, timedelta
 from terminaltables import AsciiTable
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from cointrader import db, STRATEGIES
+from cointrader import Base, db, STRATEGIES
 from cointrader.config import Config, get_path_to_config
 from cointrader.exchange import Poloniex, Market
+from cointrader.indicators import MIN_POINTS
+from cointrader.store import CandleStore
+from cointrader.tickers import TickerCache
 from cointrader.bot import init_db, get_bot, create_bot, Active, Bots_list
 
 # Создание лога
@@ -47,7 +53,8 @@ def main(ctx):
     :param ctx:
     """
     init_db()
-    config = Config(open(get_path_to_config(), "r"))
+    with open(get_path_to_config(), "r") as configfile:
+        config = Config(configfile)
     ctx.exchange = Poloniex(config, ctx.nonce)
 
 
@@ -63,9 +70,12 @@ def main(ctx):
 @click.option("--searchpoint", help="", is_flag=False)
 @click.option("--btc", help="trading value of BTC", default=0.0, type=float)
 @click.option("--update_profit", help="Start circle updates profit list for bots", is_flag=False)
+@click.option("--processes", help="Number of processes used to backtest the markets. Defaults to the number of CPUs.",
+              default=None, type=int)
 # @click.option("--best_pass_nth", help="", default="0")
 @pass_context
-def start(ctx, market, resolution, automatic, strategy, verbose, percent, best, searchpoint, btc, update_profit):
+def start(ctx, market, resolution, automatic, strategy, verbose, percent, best, searchpoint, btc, update_profit,
+          processes):
     """Start a new bot on the given market and the given amount of BTC"""
 
     # Build the market on which the bot will operate
@@ -89,7 +99,7 @@ def start(ctx, market, resolution, automatic, strategy, verbose, percent, best,
     start, end = set_start_end()
 
     best_pair, best_testing_market = find_best_pair(automatic, ctx, end, market, percent, resolution, start, strategy,
-                                                    verbose, searchpoint, btc, update_profit)
+                                                    verbose, searchpoint, btc, update_profit, processes)
 
     trade_to_minus = False
     # if int(best_pass_nth) == 0:
@@ -129,7 +139,7 @@ def start(ctx, market, resolution, automatic, strategy, verbose, percent, best,
             if trade_to_minus:
                 best_pair, best_testing_market = find_best_pair(automatic, ctx, end, market, percent, resolution, start,
                                                                 strategy,
-                                                                verbose, searchpoint, btc=btc)
+                                                                verbose, searchpoint, btc=btc, processes=processes)
             for item in best_testing_market:
                 item["market"]._backtrade = False
                 if not is_active(item["market"]):
@@ -143,6 +153,10 @@ def start(ctx, market, resolution, automatic, strategy, verbose, percent, best,
 
 
 def delete_bot(bot):
+    if bot.ledger is not None:
+        # Bots of backtests are not saved in the database.
+        bot.ledger.clear()
+        return
     try:
         for active in bot.activity:
             db.delete(active)
@@ -163,8 +177,113 @@ def is_active(market):
         return True
 
 
+_worker = {}
+# State of a worker process of the market evaluation.
+
+TREND_RESOLUTION = "2h"
+# Resolution of the trend check of the bots in the backtests.
+
+
+def _init_worker(config_path, store_url, ticker):
+    """Will set up a worker process of the market evaluation. Every
+    worker uses its own in-memory database and an exchange which makes
+    no private request. The ticker is taken from the parent process. A
+    candle store on disk is opened read-only, the parent process has
+    already requested the candles into it."""
+    engine = sa.create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db.close()
+    db.bind = engine
+    with open(config_path, "r") as configfile:
+        config = Config(configfile)
+    config.store_url = store_url
+    ctx = Context()
+    ctx.exchange = Poloniex(config, ctx.nonce, private=False)
+    store = ctx.exchange._store
+    if not store.in_memory:
+        ctx.exchange._store = CandleStore(ctx.exchange._api, store_url, read_only=True)
+    ctx.exchange.tickers = TickerCache(ttl=float("inf"))
+    ctx.exchange.tickers.load(ticker)
+    _worker["ctx"] = ctx
+
+
+def warm_store(exchange, names, resolution, start, end):
+    """Will request the candles which the backtests of the given markets
+    need into the candle store of the exchange. Markets whose candles
+    can not be requested are logged and left out.
+
+    :returns: List of the names of the markets with candles.
+    """
+    period = exchange.resolution2seconds(resolution)
+    offset = max(period, exchange.resolution2seconds(TREND_RESOLUTION)) * MIN_POINTS
+    warmed = []
+    for name in names:
+        try:
+            exchange._store.update(name, start - timedelta(seconds=offset), end, period)
+        except Exception as ex:
+            log.error("Candles of {} failed: {}".format(name, ex))
+        else:
+            warmed.append(name)
+    return warmed
+
+
+def evaluate_market(name, strategy, resolution, start, end, percent, btc):
+    """Will backtest the strategy on the given market in a worker
+    process.
+
+    :returns: Dictionary with the market name, the profit, the trend and
+        the spread of the market. The profit is None if the market was
+        skipped because of its spread.
+    """
+    market = set_market(_worker["ctx"], name, backtrade=True)
+    bot = create_bot(market, strategy, resolution, start, end, False, percent, automatic=True, btc=btc)
+    result = {"market": name, "profit": None, "trend": None, "spread": bot.spread}
+    if bot.spread <= 0.5:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            bot.start(backtest=True, automatic=True)
+        result.update(profit=bot.profit, trend=bot.trend)
+    delete_bot(bot)
+    return result
+
+
+def evaluate_markets(exchange, names, strategy, resolution, start, end, percent, btc, processes=None,
+                     config_path=None):
+    """Will backtest the strategy on the given markets in a pool of
+    worker processes. The results of :func:`evaluate_market` are yielded
+    as soon as the backtests finish. Backtests which fail are logged and
+    skipped. Pending backtests are cancelled when the generator is
+    closed, running backtests are not waited for.
+
+    The candles are requested by this process into the candle store of
+    the exchange before, so only this process uses the rate limit of
+    the public API and the workers read the shared store. A candle
+    store in memory can not be shared, then a single worker requests
+    the candles itself.
+
+    :exchange: Exchange of this process.
+    :config_path: Path of the configuration of the workers. Defaults to
+        the configuration of the user.
+    """
+    if exchange._store.in_memory:
+        processes = 1
+    else:
+        names = warm_store(exchange, names, resolution, start, end)
+    initargs = (config_path or get_path_to_config(), exchange._store.url, exchange.ticker())
+    pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=initargs)
+    futures = {pool.submit(evaluate_market, name, strategy, resolution, start, end, percent, btc): name
+               for name in names}
+    try:
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as ex:
+                log.error("Backtest of {} failed: {}".format(futures[future], ex))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 def find_best_pair(automatic, ctx, end, market, percent, resolution, start, strategy, verbose, searchpoint, btc,
-                   update_profit=False):
+                   update_profit=False, processes=None):
     to_do = True
     while to_do:
 
@@ -188,30 +307,21 @@ def find_best_pair(automatic, ctx, end, market, percent, resolution, start, stra
         delete_bot(bot)
         best_testing_market = []
         test_markets.append(set_market(ctx, market._name, backtrade=True))
+        test_markets = {current_market._name: current_market for current_market in test_markets}
         index = 0
-        for current_market in test_markets:
-            if index > 7 and not update_profit:
-                break
-            bot = create_bot(current_market, strategy, resolution, start, end, verbose, percent, automatic=True,
-                             btc=btc)
-            for trade in bot.trades:
-                try:
-                    if trade != bot.trades[0]:
-                        db.delete(trade)
-                except:
-                    pass
-            if bot.spread > 0.5:
-                print(
-                    "Валюта {} имеет порог покупки {:.2f}%, будет пропущена.".format(bot._market.currency, bot.spread))
+        for result in evaluate_markets(ctx.exchange, list(test_markets), strategy, resolution, start, end, percent, btc, processes):
+            current_market = test_markets[result["market"]]
+            if result["profit"] is None:
+                print("Валюта {} имеет порог покупки {:.2f}%, будет пропущена.".format(
+                    current_market.currency, result["spread"]))
                 continue
-
-            bot.start(backtest=True, automatic=True)
-            delete_bot(bot)
-            if bot.profit > 1 and bot.trend != 'Рынок ВВЕРХ':
-                best_testing_market.append({"market": bot._market, "profit": bot.profit})
-                if not is_active(bot._market) and not update_profit:
+            if result["profit"] > 1 and result["trend"] != 'Рынок ВВЕРХ':
+                best_testing_market.append({"market": current_market, "profit": result["profit"]})
+                if not is_active(current_market) and not update_profit:
                     break
                 index += 1
+                if index > 7 and not update_profit:
+                    break
         from operator import itemgetter
         best_testing_market = sorted(best_testing_market, key=itemgetter('profit'), reverse=True)
         best_pair = best_markets_print(best_testing_market)
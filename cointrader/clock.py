@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Clocks which control the timing of the trading loop of a bot.
+
+The bot never calls :func:`time.sleep` directly but waits on a clock.
+Live bots use the :class:`RealClock`. Backtests and replays use a
+:class:`SimulatedClock` which jumps straight to the time of the next
+event, so the same code path runs either at maximum speed or at a given
+multiple of real time.
+"""
+import datetime
+import time
+
+
+class Clock(object):
+    """Baseclass for all clocks. All times are UNIX timestamps."""
+
+    def time(self):
+        """Will return the current time of the clock."""
+        raise NotImplementedError
+
+    def sleep(self, seconds):
+        """Will wait for the given number of seconds of the clock."""
+        raise NotImplementedError
+
+    def now(self):
+        """Will return the current time of the clock as datetime
+        in UTC."""
+        return datetime.datetime.utcfromtimestamp(self.time())
+
+    def sleep_until(self, timestamp):
+        """Will wait until the given time. Returns immediately if the
+        time has already passed."""
+        seconds = timestamp - self.time()
+        if seconds > 0:
+            self.sleep(seconds)
+
+
+class RealClock(Clock):
+    """Clock of the system."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class SimulatedClock(Clock):
+    """Clock which is moved forward by the waits of the bot. On default
+    a wait does not take any real time. With a `speed` every wait takes
+    the waited time divided by the speed in real time, e.g. a speed of
+    60 replays one hour in one minute."""
+
+    def __init__(self, start=None, speed=None, sleep=time.sleep):
+        """
+        :start: Start time of the clock. If None the clock starts at
+            the time of the first wait for a time.
+        :speed: Multiple of real time. None for maximum speed.
+        :sleep: Function to wait in real time.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("The speed must be positive")
+        self._time = start
+        self.speed = speed
+        self._sleep = sleep
+
+    def time(self):
+        if self._time is None:
+            raise ValueError("The simulated clock is not started yet")
+        return self._time
+
+    def sleep(self, seconds):
+        if self.speed is not None:
+            self._sleep(seconds / float(self.speed))
+        if self._time is not None:
+            self._time += seconds
+
+    def sleep_until(self, timestamp):
+        if self._time is None:
+            self._time = timestamp
+        else:
+            Clock.sleep_until(self, timestamp)
@@ -10,6 +10,7 @@ else:
     import ConfigParser as configparser
 
 DEFAULT_CONFIG = ".cointrader.ini"
+DEFAULT_STORE = "candles.db"
 
 
 def get_path_to_config():
@@ -20,6 +21,15 @@ def get_path_to_config():
         # set default config file .cointrader.ini
         return os.getcwd() + '\\.cointrader.ini'
 
+
+def get_store_url():
+    """Returns the url of the local candle store in the data directory
+    of the user."""
+    env = os.getenv("HOME")
+    directory = os.path.join(env, ".cointrader") if env else os.getcwd()
+    return "sqlite:///" + os.path.join(directory, DEFAULT_STORE)
+
+
 class Config(object):
 
     def __init__(self, configfile=None):
@@ -28,12 +38,20 @@ class Config(object):
         self.market = "poloniex"
         self.api_key = None
         self.api_secret = None
+        self.pool_size = 10
+        self.ticker_ttl = 10
+        self.balance_ttl = 60
+        self.store_url = get_store_url()
 
         if configfile:
             config = configparser.ConfigParser()
             config.read_file(configfile)
             self.api_key = config.get('DEFAULT', "api_key")
             self.api_secret = config.get('DEFAULT', "api_secret")
+            self.pool_size = config.getint('DEFAULT', "pool_size", fallback=self.pool_size)
+            self.ticker_ttl = config.getfloat('DEFAULT', "ticker_ttl", fallback=self.ticker_ttl)
+            self.balance_ttl = config.getfloat('DEFAULT', "balance_ttl", fallback=self.balance_ttl)
+            self.store_url = config.get('DEFAULT', "store_url", fallback=self.store_url)
 
     @property
     def api(self):
@@ -3,15 +3,28 @@
 import datetime
 import collections
 import time
-from cointrader.exchanges.poloniex import Poloniex as PoloniexApi
-from cointrader.chart import Chart
+import numpy
+from cointrader.exchanges.poloniex import Poloniex as PoloniexApi, totimestamp
+from cointrader.balances import BalanceCache
+from cointrader.booktape import BookTapeError
+from cointrader.chart import COLUMNS, Chart, BacktestCursor, chart2arrays
+from cointrader.fills import book_levels, fill
 from cointrader.indicators import MIN_POINTS
+from cointrader.orderbook import SNAPSHOT_DEPTH, OrderBook
+from cointrader.resample import Resampler
+from cointrader.spread import FixedSpread
+from cointrader.store import CandleStore
+from cointrader.tickers import TICKERS
 
 
 def get_market_name(market):
     return market[0]
 
 
+MAKER_FEE = .0025
+TAKER_FEE = MAKER_FEE
+
+
 def add_fee(btc, fee=0.025):
     return btc - (btc / 100 * fee)
 
@@ -47,9 +60,27 @@ class Market(object):
         self._exchange = exchange
         self._name = name
         self._dry_run = dry_run
-        self._chart_data = None
-        self._backtest_tick = 1
+        self._cursor = BacktestCursor()
+        self._archive = None
+        self._books = None
+        self._stream = None
+        self._live_charts = {}
+        self.order_book = None
+        self._base_resolution = None
+        self._resamplers = {}
         self._backtrade = backTrade
+        self.spread_model = None
+        # :class:`cointrader.spread.SpreadModel` of markets for
+        # backtests. Defaults to the spread of the exchange captured on
+        # the first call of :meth:`get_spread`.
+
+    @property
+    def _backtest_tick(self):
+        return self._cursor.tick
+
+    @_backtest_tick.setter
+    def _backtest_tick(self, tick):
+        self._cursor.tick = tick
 
     @property
     def currency(self):
@@ -60,6 +91,36 @@ class Market(object):
     def url(self):
         return "{}{}".format(self._exchange.url, self._name)
 
+    def get_spread(self):
+        """Will return the spread of the market in percent. Markets for
+        backtests take the spread from their spread model at the current
+        tick of the backtest and make no request."""
+        if not self._backtrade:
+            top = self._top()
+            if top is not None:
+                return round(((top.ask - top.bid) / 2) / (top.last * 0.01), 2)
+            return self._exchange.get_spread(self._name)
+        if self.spread_model is None:
+            self.spread_model = FixedSpread(self._exchange.get_spread(self._name))
+        return self.spread_model.spread(self._cursor.chart() if self._cursor.loaded else None)
+
+    def get_spread_tick(self):
+        """Will return the difference between the lowest ask and the
+        highest bid. For backtests it is derived from the spread at the
+        last close."""
+        if not self._backtrade:
+            if self.order_book is not None and self.order_book.synced:
+                spread = self.order_book.spread()
+                if spread is not None:
+                    return spread
+            top = self._top()
+            if top is not None:
+                return top.ask - top.bid
+            return self._exchange.get_spread_tick(self._name)
+        if not self._cursor.loaded:
+            return 0.0
+        return 2 * self.get_spread() * .01 * float(self._cursor.last("close"))
+
     def _get_chart_data(self, resolution, start, end):
         """Will return the data for the chart."""
         # To ensure that the data cointains enough data to calculate SMA
@@ -69,7 +130,168 @@ class Market(object):
         # chart to be present.
         period = self._exchange.resolution2seconds(resolution)
         internal_start = start - datetime.timedelta(seconds=period * MIN_POINTS)
-        return self._exchange._api.chart(self._name, internal_start, end, period)
+        return self._exchange._store.chart(self._name, internal_start, end, period)
+
+    def _get_base_arrays(self, period, start, end):
+        """Will return the arrays of the base resolution between start
+        and end from the archive or the candle store."""
+        if self._archive is not None and self._archive.period == period:
+            chart = self._archive.chart(start, end)
+            return {column: chart.column(column) for column in COLUMNS}
+        return chart2arrays(self._exchange._store.chart(self._name, start, end, period))
+
+    def _get_resampled_chart(self, base, period, start, end):
+        """Will build the chart with the given period from the candles of
+        the base period instead of requesting it from the exchange. The
+        resampler is kept and only fed with the new base candles on
+        later calls."""
+        internal_start = totimestamp(start) - period * MIN_POINTS
+        internal_start = datetime.datetime.utcfromtimestamp(internal_start - internal_start % period)
+        arrays = self._get_base_arrays(base, internal_start, end)
+
+        resampler, seeded = self._resamplers.get(period, (None, None))
+        if resampler is None or resampler.last_date is None or internal_start < seeded:
+            resampler = Resampler(period).seed(arrays)
+            self._resamplers[period] = (resampler, internal_start)
+        else:
+            dates = arrays["date"]
+            for index in range(int(numpy.searchsorted(dates, resampler.last_date)), len(dates)):
+                resampler.update({column: arrays[column][index] for column in COLUMNS})
+        return resampler.chart(start, end, offset=MIN_POINTS)
+
+    def _get_chart(self, resolution, start, end):
+        """Will return the chart from the loaded archive if its period
+        matches the resolution. Resolutions which are a multiple of the
+        base resolution of the market (the resolution of the first
+        requested chart) are resampled from the base candles. Otherwise
+        the chart data is requested."""
+        period = self._exchange.resolution2seconds(resolution)
+        if self._base_resolution is None:
+            self._base_resolution = resolution
+        base = self._exchange.resolution2seconds(self._base_resolution)
+        if period > base and period % base == 0:
+            return self._get_resampled_chart(base, period, start, end)
+        if self._archive is not None and self._archive.period == period:
+            return self._archive.chart(start, end, offset=MIN_POINTS)
+        return Chart(self._get_chart_data(resolution, start, end), start, end)
+
+    def load_archive(self, archive):
+        """Will use the given :class:`cointrader.archive.Archive` as
+        source of the chart data for backtests on this market."""
+        self._archive = archive
+
+    def load_books(self, replayer):
+        """Will use the order books of the given
+        :class:`cointrader.booktape.BookReplayer` to find the price of
+        the orders of backtests on this market. The order books must be
+        recorded on this market."""
+        if replayer.market != self._name:
+            raise BookTapeError("{} holds the order books of {} and not of {}".format(replayer.path, replayer.market,
+                                                                                      self._name))
+        self._books = replayer
+
+    def load_stream(self, client):
+        """Will use the given :class:`cointrader.push.PushClient` for the
+        top of the order book and the candles of this live market. The
+        candles are only requested once to get the history, later
+        candles are appended from the trades of the push API."""
+        self._stream = client
+        self._live_charts = {}
+        self.load_order_book(OrderBook(self._name, snapshot=self._snapshot))
+        client.listeners.append(self.order_book.on_update)
+
+    def load_order_book(self, order_book):
+        """Will use the given :class:`cointrader.orderbook.OrderBook`
+        for the order book of this live market while it is in sync.
+        The caller feeds it with updates."""
+        self.order_book = order_book
+
+    def _snapshot(self):
+        return self._exchange._api.book(self._name, depth=SNAPSHOT_DEPTH)
+
+    def _top(self):
+        if self._stream is None:
+            return None
+        return self._stream.top(self._name)
+
+    def _get_stream_chart(self, resolution, start, end):
+        """Will return the chart of the live market with the closed
+        candles of the push API appended. The history is requested if
+        there is no chart yet or if the candles of the push API do not
+        follow the chart."""
+        period = self._exchange.resolution2seconds(resolution)
+        chart = self._live_charts.get(period)
+        candles = self._stream.candles(self._name, period, chart.date if chart is not None else None)
+        if candles is None:
+            return self._get_chart(resolution, start, end)
+        if chart is None or (candles and candles[0]["date"] != chart.date + period):
+            # The history ends with the last closed candle. The candle
+            # which is still open is appended once it is closed.
+            closed = datetime.datetime.utcfromtimestamp(totimestamp(end) // period * period - period)
+            chart = self._get_chart(resolution, start, closed)
+            self._live_charts[period] = chart
+            candles = self._stream.candles(self._name, period, chart.date)
+        for candle in candles:
+            if candle["date"] != chart.date + period:
+                break
+            chart.append(candle)
+        return chart.view(len(chart), start, end)
+
+    def _get_scheduled_chart(self, resolution, start, end):
+        """Will return the chart of the live market with the closed
+        candles appended which were handed to :meth:`append_candles`.
+        The history is requested if there is no chart yet or if the
+        chart does not end with the last closed candle."""
+        period = self._exchange.resolution2seconds(resolution)
+        closed = totimestamp(end) // period * period - period
+        chart = self._live_charts.get(period)
+        if chart is None or chart.date != closed:
+            chart = self._get_chart(resolution, start, datetime.datetime.utcfromtimestamp(closed))
+            self._live_charts[period] = chart
+        return chart.view(len(chart), start, end)
+
+    def append_candles(self, resolution, candles):
+        """Will append the given closed candles to the chart of the live
+        market, so the next chart needs no request and its indicators
+        are extended instead of calculated again. Candles which do not
+        follow the chart are left out.
+
+        :resolution: Resolution of the candles.
+        :candles: List of candles in the format of the API.
+        """
+        period = self._exchange.resolution2seconds(resolution)
+        chart = self._live_charts.get(period)
+        if chart is None:
+            return
+        for candle in candles:
+            if candle["date"] == chart.date + period:
+                chart.append(candle)
+
+    def book(self):
+        """Will return the order book of the market. In backtests with
+        loaded order books the order book recorded before the close of
+        the current candle is returned, which is None if there is no
+        such order book. Live markets with a local order book in sync
+        return its top without a request."""
+        if self._backtrade and self._books is not None:
+            date = int(self._cursor.last("date"))
+            if self._base_resolution is not None:
+                date += self._exchange.resolution2seconds(self._base_resolution)
+            return self._books.book(date)
+        if not self._backtrade and self.order_book is not None and self.order_book.synced:
+            return self.order_book.book()
+        return self._exchange._api.book(self._name)
+
+    def _best_price(self, side):
+        """Will return the price of the given side ("asks" or "bids")
+        of the order book for market orders. Backtests without order
+        books use the last close."""
+        if not self._backtrade:
+            return float(self.book()[side][-1][0])
+        orderbook = self.book() if self._books is not None else None
+        if not orderbook or not orderbook[side]:
+            return float(self._cursor.last("close"))
+        return float(orderbook[side][-1][0])
 
     def get_chart(self, resolution="30m", start=None, end=None, last_numbers=None, new_only=False):
         """Will return a chart of the market.
@@ -86,22 +308,30 @@ class Market(object):
         :end: End of the chart data (Default Now)
         :returns: Chart instance.
         """
+        # Charts of live markets up to now are kept and extended.
+        live = end is None and not self._backtrade
         if end is None:
             end = datetime.datetime.utcnow()
         if start is None:
             start = datetime.datetime.utcnow()
 
-        if self._chart_data is None and self._backtrade or new_only:
-            self._chart_data = self._get_chart_data(resolution, start, end)
+        if not self._cursor.loaded and self._backtrade or new_only:
+            if self._stream is not None and not self._backtrade:
+                self._cursor.load(self._get_stream_chart(resolution, start, end))
+            else:
+                self._cursor.load(self._get_chart(resolution, start, end))
             self._backtest_tick += MIN_POINTS if self._backtest_tick == 1 else 0
-            return Chart(self._chart_data[0:-1 if new_only else self._backtest_tick], start, end)
+            return self._cursor.chart(-1 if new_only else None, start, end)
         elif self._backtrade and not last_numbers:
-            return Chart(self._chart_data[0:self._backtest_tick], start, end)
+            return self._cursor.chart(None, start, end)
         elif self._backtrade and last_numbers:
-            return Chart(self._chart_data[0:last_numbers], start, end)
+            return self._cursor.chart(last_numbers, start, end)
+        elif self._stream is not None:
+            return self._get_stream_chart(resolution, start, end)
+        elif live:
+            return self._get_scheduled_chart(resolution, start, end)
         else:
-            data = self._get_chart_data(resolution, start, end)
-            return Chart(data, start, end)
+            return self._get_chart(resolution, start, end)
 
 
     def buy(self, btc, price=None, option=None):
@@ -118,9 +348,12 @@ class Market(object):
         :returns: Dict witch details on the order.
         """
         if self._backtrade:
-            price = float(self._chart_data[0:self._backtest_tick][-1]['close'])
-            date = datetime.datetime.utcfromtimestamp(self._chart_data[0:self._backtest_tick][-1]['date'])
-            btc = add_fee(btc)
+            date = datetime.datetime.utcfromtimestamp(int(self._cursor.last("date")))
+            orderbook = self.book() if self._books is not None else None
+            if orderbook and orderbook["asks"]:
+                return self._simulate(orderbook, "BUY", date, btc=btc, price=price, option=option)
+            price = self._best_price("asks") if price is None else price
+            btc = add_fee(btc, TAKER_FEE * 100)
             amount = btc / price
             return {u'orderNumber': u'{}'.format(int(time.time() * 1000)),
                     u'resultingTrades': [
@@ -131,32 +364,27 @@ class Market(object):
                          u'total': u'{}'.format(btc),
                          u'type': u'buy'}]}
 
-        if price is None:
-            # Get best price on market.
-            orderbook = self._exchange._api.book(self._name)
-            asks = orderbook["asks"]   # Asks in the meaning of "I wand X for Y"
-            best_offer = asks[-1]
-            price = float(best_offer[0])
-        amount = btc / price
         if self._dry_run:
-            amount = add_fee(amount)
             date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            return {u'orderNumber': u'{}'.format(int(time.time() * 1000)),
-                    u'resultingTrades': [
-                        {u'tradeID': u'{}'.format(int(time.time() * 1000)),
-                         u'rate': u'{}'.format(price),
-                         u'amount': u'{}'.format(amount),
-                         u'date': u'{}'.format(date),
-                         u'total': u'{}'.format(btc),
-                         u'type': u'buy'}]}
-        else:
-            return self._exchange._api.buy(self._name, amount, price, option)
+            return self._simulate(self.book(), "BUY", date, btc=btc, price=price, option=option)
+        if price is None:
+            # Get best price on market. Asks in the meaning of "I wand X
+            # for Y"
+            price = self._best_price("asks")
+        amount = btc / price
+        # The trades of the order take liquidity from the book.
+        result = self._exchange._api.buy(self._name, amount, price, option)
+        self._exchange.balances.apply(self._name, result, TAKER_FEE, amount)
+        return result
 
     def sell(self, amount, price=None, option=None):
         if self._backtrade:
-            price = float(self._chart_data[0:self._backtest_tick][-1]['close'])
-            date = datetime.datetime.utcfromtimestamp(self._chart_data[0:self._backtest_tick][-1]['date'])
-            btc = add_fee(amount * price)
+            date = datetime.datetime.utcfromtimestamp(int(self._cursor.last("date")))
+            orderbook = self.book() if self._books is not None else None
+            if orderbook and orderbook["bids"]:
+                return self._simulate(orderbook, "SELL", date, amount=amount, price=price, option=option)
+            price = self._best_price("bids") if price is None else price
+            btc = add_fee(amount * price, TAKER_FEE * 100)
             return {u'orderNumber': u'{}'.format(int(time.time() * 1000)),
                     u'resultingTrades': [
                         {u'tradeID': u'{}'.format(int(time.time() * 1000)),
@@ -166,32 +394,58 @@ class Market(object):
                          u'total': u'{}'.format(btc),
                          u'type': u'sell'}]}
 
-        if price is None:
-            # Get best price on market.
-            orderbook = self._exchange._api.book(self._name)
-            bids = orderbook["bids"]  # Bids in the meaning of "I give you X for Y"
-            best_offer = bids[-1]
-            price = float(best_offer[0])
-            btc = amount * price
         if self._dry_run:
-            btc = add_fee(btc)
             date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            return {u'orderNumber': u'{}'.format(int(time.time() * 1000)),
-                    u'resultingTrades': [
-                        {u'tradeID': u'{}'.format(int(time.time() * 1000)),
-                         u'rate': u'{}'.format(price),
-                         u'amount': u'{}'.format(amount),
-                         u'date': u'{}'.format(date),
-                         u'total': u'{}'.format(btc),
-                         u'type': u'sell'}]}
-        else:
-            return self._exchange._api.sell(self._name, amount, price, option)
+            return self._simulate(self.book(), "SELL", date, amount=amount, price=price, option=option)
+        if price is None:
+            # Get best price on market. Bids in the meaning of "I give
+            # you X for Y"
+            price = self._best_price("bids")
+        # The trades of the order take liquidity from the book.
+        result = self._exchange._api.sell(self._name, amount, price, option)
+        self._exchange.balances.apply(self._name, result, TAKER_FEE, amount)
+        return result
+
+    def _simulate(self, orderbook, order_type, date, amount=None, btc=None, price=None, option=None):
+        """Will simulate the order on the order book and return the
+        result in the format of the API. Every filled level of the book
+        is one trade of the result. The taker fee of the exchange is
+        taken from the coins of buy orders and from the BTC of sell
+        orders, like in the backtests on the chart."""
+        side = "asks" if order_type == "BUY" else "bids"
+        prices, amounts = book_levels(orderbook, side)
+        result = fill(prices, amounts, order_type, amount=amount, btc=btc, limit=price, option=option)
+        order_id = int(time.time() * 1000)
+        trades = []
+        for number, (rate, filled) in enumerate(result.levels):
+            total = rate * filled
+            if order_type == "BUY":
+                filled = add_fee(filled, TAKER_FEE * 100)
+            else:
+                total = add_fee(total, TAKER_FEE * 100)
+            trades.append({u'tradeID': u'{}'.format(order_id + number),
+                           u'rate': u'{}'.format(rate),
+                           u'amount': u'{}'.format(filled),
+                           u'date': u'{}'.format(date),
+                           u'total': u'{}'.format(total),
+                           u'type': u'{}'.format(order_type.lower())})
+        return {u'orderNumber': u'{}'.format(order_id), u'resultingTrades': trades}
+
+    def new_candles(self, resolution, since):
+        """Will request the candles of the given resolution which start
+        at or after the UNIX timestamp `since`. Only the candles of one
+        period are requested, so this is much cheaper than requesting a
+        chart.
+
+        :returns: List of candles in the format of the API.
+        """
+        period = self._exchange.resolution2seconds(resolution)
+        data = self._exchange._api.chart(self._name, datetime.datetime.utcfromtimestamp(since),
+                                         datetime.datetime.utcfromtimestamp(since + period), period)
+        return [d for d in data if d["date"] >= since]
 
     def continue_backtest(self):
-        self._backtest_tick += 1
-        if self._chart_data and len(self._chart_data) >= self._backtest_tick:
-            return True
-        return False
+        return self._cursor.advance()
 
 
 # class BacktestMarket(Market):
@@ -262,13 +516,25 @@ class Exchange(object):
                    "4h": 14400,
                    "24h": 86400}
 
-    def __init__(self, config, api=None):
-        """TODO: to be defined1. """
+    def __init__(self, config, api=None, private=True):
+        """
+        :config: :class:`cointrader.config.Config` instance.
+        :api: :class:`cointrader.exchanges.poloniex.Api` instance.
+        :private: Request the balances of the account. Exchanges which
+            are only used for backtests do not need them.
+        """
         self._api = api
+        self._store = CandleStore(api, config.store_url) if config is not None else CandleStore(api)
+        self.tickers = TICKERS
+        if config is not None:
+            self.tickers.ttl = config.ticker_ttl
+        self.balances = BalanceCache(config.balance_ttl) if config is not None else BalanceCache()
         self.coins = collections.OrderedDict()
+        if not private:
+            return
 
         # Setup coins
-        balance = self._api.balance()
+        balance = self.get_balance()
         for currency in sorted(balance):
             if balance[currency]["btc_value"] > 0:
                 self.coins[currency] = Coin(currency,
@@ -283,14 +549,31 @@ class Exchange(object):
     def total_btc_value(self):
         return sum([self.coins[c].value for c in self.coins])
 
+    def ticker(self, currency=None, refresh=False):
+        """Will return the ticker of all markets or of the given market
+        from the ticker snapshot shared by all exchanges, see
+        :class:`cointrader.tickers.TickerCache`.
+
+        :currency: Optionally a currency pair like BTC_DASH.
+        :refresh: Request a new snapshot even if the snapshot is not
+            stale.
+        """
+        if refresh:
+            ticker = self.tickers.refresh(self._api)
+        else:
+            ticker = self.tickers.get(self._api)
+        if currency:
+            return ticker[currency]
+        return ticker
+
     @property
     def total_euro_value(self, limit=10):
-        ticker = self._api.ticker()
+        ticker = self.ticker()
         return float(ticker["USDT_BTC"]["last"]) * self.total_btc_value
 
     @property
     def markets(self):
-        ticker = self._api.ticker()
+        ticker = self.ticker()
         tmp = {}
         for currency in ticker:
             if currency.startswith("BTC_"):
@@ -325,7 +608,28 @@ class Exchange(object):
                       key=lambda x: (float(x[1]["volume"]), float(x[1]["change"])), reverse=True)[0:limit]
 
     def is_valid_market(self, market):
-        return market in self.markets
+        return market.startswith("BTC_") and market in self.ticker()
+
+    def get_balance(self, currency=None, refresh=False):
+        """Will return the balances of all currencies or of the given
+        currency. The balances are cached, updated by the orders of the
+        markets of the exchange and requested again once they are stale,
+        see :class:`cointrader.balances.BalanceCache`.
+
+        :currency: Optionally a currency like BTC.
+        :refresh: Request the balances from the exchange.
+        """
+        if refresh:
+            balance = self.balances.refresh(self._api)
+        else:
+            balance = self.balances.get(self._api)
+        if currency is None:
+            return balance
+        return balance[currency]
+
+    def server_time(self):
+        """Will return the time of the exchange as UNIX timestamp."""
+        return self._api.server_time()
 
     def is_valid_resolution(self, resolution):
         return resolution in self.resolutions
@@ -340,30 +644,24 @@ class Exchange(object):
 
 class Poloniex(Exchange):
 
-    def __init__(self, config, nonce):
+    def __init__(self, config, nonce, private=True):
         api = PoloniexApi(config, nonce)
-        Exchange.__init__(self, config, api)
+        Exchange.__init__(self, config, api, private)
 
     @property
     def url(self):
         return "https://poloniex.com/exchange#"
 
     def btc2dollar(self, amount):
-        ticker = self._api.ticker("USDT_BTC")
+        ticker = self.ticker("USDT_BTC")
         rate = float(ticker["last"])
         return round(amount * rate, 2)
 
     def dollar2btc(self, amount):
-        ticker = self._api.ticker("USDT_BTC")
+        ticker = self.ticker("USDT_BTC")
         rate = float(ticker["last"])
         return round(amount / rate, 8)
 
-    def get_balance(self, currency=None):
-        if currency is None:
-            return self._api.balance()
-        else:
-            return self._api.balance()[currency]
-
     def get_spread(self, currency):
         """
         Get spread percent
@@ -371,7 +669,7 @@ class Poloniex(Exchange):
         :return spread percent:
         """
         # list = self._api.book(currency=currency)
-        ticker = self._api.ticker(currency=currency)
+        ticker = self.ticker(currency)
         last_rate = float(ticker["last"])
         last_bid = float(ticker['highestBid'])
         last_ask = float(ticker['lowestAsk'])
@@ -7,10 +7,13 @@ import time
 import hmac
 import hashlib
 from functools import wraps
+from email.utils import parsedate_to_datetime
 
 import requests
 import datetime
 
+from cointrader.ratelimit import LIMITER
+
 if (sys.version_info > (3, 0)):
     # Python 3 code in this block
     from urllib.parse import urlencode
@@ -18,6 +21,9 @@ else:
     # Python 2 code in this block
     from urllib import urlencode
 
+POOL_SIZE = 10
+# Default number of pooled connections per host.
+
 
 def retry(ExceptionToCheck, tries=10, delay=1, backoff=2, logger=None):
     """Retry calling the decorated function using an exponential backoff.
@@ -72,11 +78,27 @@ def retry(ExceptionToCheck, tries=10, delay=1, backoff=2, logger=None):
 class Api(object):
     """Docstring for Api. """
 
+    url = "https://poloniex.com"
+
     def __init__(self, config):
         api = config.api
         self.enableRateLimit = True
         self.key = api[0]
         self.secret = api[1].encode()
+        self.session = make_session(config.pool_size)
+        self.limiter = LIMITER
+
+    def _request(self, path, params, headers=None, action="get"):
+        """Will send the request on the pooled session of the API. If
+        the rate limit is enabled the request waits until the budget of
+        public or trading requests allows it."""
+        if self.enableRateLimit:
+            self.limiter.acquire("public" if path == "public" else "trading")
+        link = "{}/{}".format(self.url, path)
+        if action == "get":
+            return self.session.get(link, params=params)
+        elif action == "post":
+            return self.session.post(link, data=params, headers=headers)
 
     def _check_response(self, json):
         raise NotImplementedError()
@@ -90,12 +112,15 @@ class Api(object):
     def chart(self, currency, start, end, period=1800):
         raise NotImplementedError()
 
-    def book(self, currency):
+    def book(self, currency, depth=10):
         raise NotImplementedError()
 
     def balance(self):
         raise NotImplementedError()
 
+    def server_time(self):
+        raise NotImplementedError()
+
     def buy(self, market, amount, price, option=None):
         """Places a limit buy order in a given market. Required POST
         parameters are "currencyPair", "rate", and "_amount_deleted". If
@@ -199,7 +224,7 @@ class Poloniex(Api):
         """
         params = {"command": "returnTicker"}
         # r = requests.get("https://poloniex.com/public", params=params)
-        r = reconnect("https://poloniex.com/public", params=params, headers=None, action="get")
+        r = self._request("public", params)
         result = json.loads(r.content.decode())
         self._check_response(result)
         if currency:
@@ -221,7 +246,7 @@ class Poloniex(Api):
         """
         params = {"command": "return24hVolume"}
         # r = requests.get("https://poloniex.com/public", params=params)
-        r = reconnect("https://poloniex.com/public", params=params, headers=None, action="get")
+        r = self._request("public", params)
         result = json.loads(r.content.decode())
         self._check_response(result)
         if currency:
@@ -233,12 +258,13 @@ class Poloniex(Api):
         return result
 
     @retry(Exception, tries=4)
-    def book(self, currency):
+    def book(self, currency, depth=10):
         """
         Returns the order book for a given market, as well as a sequence
         number for use with the Push API and an indicator specifying
         whether the market is frozen. You may set currencyPair to "all"
-        to get the order books of all markets. Sample output::
+        to get the order books of all markets. `depth` is the number of
+        levels per side. Sample output::
 
             {"asks":[[0.00007600,1164],[0.00007620,1300], ... ],
              "bids":[[0.00006901,200],[0.00006900,408], ... ],
@@ -246,7 +272,7 @@ class Poloniex(Api):
         """
         params = {"command": "returnOrderBook",
                   "currencyPair": currency,
-                  "depth": 10}
+                  "depth": depth}
 
         # r = requests.get("https://poloniex.com/public", params=params)
         result = self.retry_book(params)
@@ -255,7 +281,7 @@ class Poloniex(Api):
 
     @retry(Exception, tries=4)
     def retry_book(self, params):
-        r = reconnect("https://poloniex.com/public", params=params, headers=None, action="get")
+        r = self._request("public", params)
         result = json.loads(r.content.decode())
         return result
 
@@ -296,11 +322,24 @@ class Poloniex(Api):
                   "period": period}
 
         # r = requests.get("https://poloniex.com/public", params=params)
-        r = reconnect("https://poloniex.com/public", params=params, headers=None, action="get")
+        r = self._request("public", params)
         result = json.loads(r.content.decode())
         self._check_response(result)
         return result
 
+    @retry(Exception, tries=4)
+    def server_time(self):
+        """
+        Returns the time of the exchange as UNIX timestamp. The time is
+        taken from the Date header of the response of a small public
+        request, so its resolution is one second.
+        """
+        params = {"command": "returnOrderBook",
+                  "currencyPair": "USDT_BTC",
+                  "depth": 1}
+        r = self._request("public", params)
+        return totimestamp(parsedate_to_datetime(r.headers["Date"]).replace(tzinfo=None))
+
     @retry(Exception, tries=4)
     def balance(self):
         """
@@ -314,7 +353,7 @@ class Poloniex(Api):
                   "nonce": self.nonce}
         headers = self.prepaire_headers(params)
         # r = requests.post("https://poloniex.com/tradingApi", data=params, headers=headers)
-        r = reconnect("https://poloniex.com/tradingApi", params=params, headers=headers, action="post")
+        r = self._request("tradingApi", params, headers, action="post")
         tmp = json.loads(r.content.decode())
         self._check_response(tmp)
         for currency in tmp:
@@ -348,7 +387,7 @@ class Poloniex(Api):
 
         headers = self.prepaire_headers(params)
         # r = requests.post("https://poloniex.com/tradingApi", data=params, headers=headers)
-        r = reconnect("https://poloniex.com/tradingApi", params=params, headers=headers, action="post")
+        r = self._request("tradingApi", params, headers, action="post")
         result = json.loads(r.content.decode())
         self._check_response(result)
         return result
@@ -373,29 +412,35 @@ class Poloniex(Api):
 
         headers = self.prepaire_headers(params)
         # r = requests.post("https://poloniex.com/tradingApi", data=params, headers=headers)
-        r = reconnect("https://poloniex.com/tradingApi", params=params, headers=headers, action="post")
+        r = self._request("tradingApi", params, headers, action="post")
         result = json.loads(r.content.decode())
         self._check_response(result)
         return result
 
 
-def reconnect(link, params, headers=None, action="get"):
-    import requests
+def make_session(pool_size=POOL_SIZE):
+    """Will return a session which keeps up to `pool_size` connections
+    per host alive and reuses them for later requests. Responses are
+    requested gzip compressed. Failed connections and server errors are
+    retried.
+
+    :pool_size: Number of connections per host.
+    :returns: :class:`requests.Session`
+    """
     from urllib3.util.retry import Retry
     from requests.adapters import HTTPAdapter
 
     session = requests.Session()
+    session.headers["Accept-Encoding"] = "gzip, deflate"
 
     retries = Retry(total=5,
                     backoff_factor=0.1,
                     status_forcelist=[500, 502, 503, 504])
 
-    session.mount('https://', HTTPAdapter(max_retries=retries))
-
-    if action == "get":
-        return session.get(link, params=params)
-    elif action == "post":
-        return session.post(link, data=params, headers=headers)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 def totimestamp(dt):
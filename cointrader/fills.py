@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Simulated fills of orders on an order book.
+
+An order is filled level by level from the best price of the order book
+on until the order is complete, the limit price is reached or the book
+is exhausted. The options of the API are supported:
+
+    ===================  ============================================
+    option               unfilled part of the order
+    ===================  ============================================
+    None                 rests on the book (cancelled for market orders)
+    fillOrKill           the whole order is cancelled
+    immediateOrCancel    cancelled
+    postOnly             the whole order is cancelled if any part would
+                         fill, otherwise the order rests on the book
+    ===================  ============================================
+"""
+import collections
+
+import numpy
+
+OPTIONS = (None, "fillOrKill", "immediateOrCancel", "postOnly")
+
+Fill = collections.namedtuple("Fill", ["amount", "btc", "price", "resting", "cancelled", "levels"])
+# Result of a simulated order. `amount` is the number of filled coins,
+# `btc` the BTC paid or earned for them (without fees) and `price` the
+# volume-weighted price of the fill (NaN if nothing was filled).
+# `resting` and `cancelled` are the coins which rest on the book or were
+# cancelled. `levels` is an array with the price and amount per filled
+# level.
+
+_EMPTY = numpy.zeros((0, 2))
+
+
+def book_levels(book, side):
+    """Will return the prices and amounts of one side ("asks" or "bids")
+    of an order book as returned by the API, best price first.
+
+    :returns: Tuple of two float64 arrays.
+    """
+    levels = numpy.array(book[side], dtype=numpy.float64).reshape(-1, 2)
+    return levels[:, 0], levels[:, 1]
+
+
+def fill(prices, amounts, order_type, amount=None, btc=None, limit=None, option=None):
+    """Will simulate an order on one side of an order book. Either the
+    `amount` of coins or the `btc` to spend (or earn) is given.
+
+    :prices: Prices of the levels, best price first. Asks for BUY and
+        bids for SELL orders.
+    :amounts: Amounts of coins of the levels.
+    :order_type: "BUY" or "SELL".
+    :amount: Number of coins to buy or sell.
+    :btc: BTC to spend or earn instead of an amount of coins.
+    :limit: Limit price of the order. None for a market order.
+    :option: One of `OPTIONS`.
+    :returns: :class:`Fill`
+    """
+    if option not in OPTIONS:
+        raise ValueError("Unknown option {}".format(option))
+    if (amount is None) == (btc is None):
+        raise ValueError("Either the amount or the BTC of the order must be given")
+    prices = numpy.asarray(prices, dtype=numpy.float64)
+    amounts = numpy.asarray(amounts, dtype=numpy.float64)
+
+    # Number of levels which cross the limit price. The levels are
+    # sorted, so these are the first levels.
+    count = len(prices)
+    if limit is not None:
+        crossing = prices <= limit if order_type == "BUY" else prices >= limit
+        count = int(numpy.argmin(crossing)) if not crossing.all() else len(prices)
+
+    if btc is not None:
+        sizes = prices[:count] * amounts[:count]
+        target = btc
+    else:
+        sizes = amounts[:count]
+        target = amount
+    totals = numpy.cumsum(sizes)
+
+    if option == "postOnly" and count:
+        return Fill(0.0, 0.0, numpy.nan, 0.0, float(_order_amount(amount, btc, limit, prices)), _EMPTY)
+
+    full = int(numpy.searchsorted(totals, target))
+    filled = amounts[:min(full, count)].copy()
+    if full < count:
+        rest = target - (totals[full - 1] if full else 0.0)
+        filled = numpy.append(filled, rest / prices[full] if btc is not None else rest)
+    levels = numpy.column_stack((prices[:len(filled)], filled))
+    filled_amount = float(filled.sum())
+    filled_btc = float((levels[:, 0] * levels[:, 1]).sum())
+    complete = full < count or bool(numpy.isclose(totals[-1], target)) if count else False
+
+    unfilled = 0.0 if complete else _unfilled(amount, btc, filled_amount, filled_btc, limit, prices)
+    if option == "fillOrKill" and not complete:
+        return Fill(0.0, 0.0, numpy.nan, 0.0, filled_amount + unfilled, _EMPTY)
+    resting = unfilled if option in (None, "postOnly") and limit is not None else 0.0
+    cancelled = unfilled - resting
+    price = filled_btc / filled_amount if filled_amount else numpy.nan
+    return Fill(filled_amount, filled_btc, price, resting, cancelled, levels)
+
+
+def _order_amount(amount, btc, limit, prices):
+    """Number of coins of an order given by its BTC."""
+    if amount is not None:
+        return amount
+    price = limit if limit is not None else (prices[0] if len(prices) else numpy.nan)
+    return btc / price
+
+
+def _unfilled(amount, btc, filled_amount, filled_btc, limit, prices):
+    if amount is not None:
+        return amount - filled_amount
+    price = limit if limit is not None else (prices[len(prices) - 1] if len(prices) else numpy.nan)
+    return (btc - filled_btc) / price
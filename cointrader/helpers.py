@@ -36,21 +36,21 @@ def render_user_options(options):
 def render_bot_title(bot, market, chart):
 
     out = ["\n"]
-    data = chart._data
+    closes = chart.column("close")
 
-    if len(data) > 1:
-        last = data[-2]
+    if len(closes) > 1:
+        last = closes[-2]
     else:
-        last = data[-1]
-    current = data[-1]
+        last = closes[-1]
+    current = chart.close
 
     values = {}
-    values["date"] = datetime.datetime.utcfromtimestamp(current["date"])
-    if current["close"] > last["close"]:
-        values["rate"] = colored(current["close"], "green")
+    values["date"] = datetime.datetime.utcfromtimestamp(chart.date)
+    if current > last:
+        values["rate"] = colored(current, "green")
     else:
-        values["rate"] = colored(current["close"], "red")
-    change_percent = (current["close"] - last["close"]) / current["close"] * 100
+        values["rate"] = colored(current, "red")
+    change_percent = (current - last) / current * 100
 
     values["change_percent"] = round(change_percent, 4)
     values["url"] = market.url
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 import logging
 import datetime
+import numpy
 
 log = logging.getLogger(__name__)
 
@@ -43,6 +44,33 @@ class Signal(object):
         return self.value == SELL
 
 
+class Signals(object):
+    """Signals of a strategy for every datapoint of a chart. The values
+    and flags of the signals are kept in arrays with one item per
+    datapoint. Indexing returns the :class:`Signal` of a datapoint."""
+
+    def __init__(self, value, date, over_sell=None, max_up=None):
+        """
+        :value: Array of signal values (BUY, SELL, WAIT or QUIT).
+        :date: Array of UNIX timestamps of the datapoints.
+        :over_sell: Optional boolean array of the over_sell flags.
+        :max_up: Optional boolean array of the max_up flags.
+        """
+        self.value = numpy.asarray(value, dtype=numpy.int8)
+        self.date = date
+        self.over_sell = numpy.zeros(len(self.value), dtype=bool) if over_sell is None else over_sell
+        self.max_up = numpy.zeros(len(self.value), dtype=bool) if max_up is None else max_up
+
+    def __len__(self):
+        return len(self.value)
+
+    def __getitem__(self, index):
+        return Signal(int(self.value[index]),
+                      datetime.datetime.utcfromtimestamp(int(self.date[index])),
+                      over_sell=bool(self.over_sell[index]),
+                      max_up=bool(self.max_up[index]))
+
+
 def sma(chart, window=12):
     """Simple moving averange indicator. Will emit a BUY signal as long
     as the closing price is above the SMA value. It will emit a SELL
@@ -54,9 +82,8 @@ def sma(chart, window=12):
 
     """
     sma = chart.sma(window)[-1]
-    closing = chart.values()
-    value = closing[-1][1]
-    date = datetime.datetime.utcfromtimestamp(closing[-1][0])
+    value = chart.close
+    date = datetime.datetime.utcfromtimestamp(chart.date)
 
     signal = WAIT
     if value > sma:
@@ -78,9 +105,8 @@ def ema(chart, window=12):
     """
 
     ema = chart.ema(window)[-1]
-    closing = chart.values()
-    value = closing[-1][1]
-    date = datetime.datetime.utcfromtimestamp(closing[-1][0])
+    value = chart.close
+    date = datetime.datetime.utcfromtimestamp(chart.date)
 
     signal = WAIT
     if value > ema:
@@ -106,9 +132,8 @@ def double_cross(current_strategy, chart, fast=13, slow=26):
     """
 
 
-    closing = chart.values()
-    date = datetime.datetime.utcfromtimestamp(closing[-1][0])
-    value = closing[-1][1]
+    date = datetime.datetime.utcfromtimestamp(chart.date)
+    value = chart.close
     ema_1 = chart.ema(fast)[-1]
     ema_2 = chart.ema(slow)[-1]
 
@@ -158,8 +183,7 @@ def macdh(chart):
     """
 
     macdh = chart.macdh()[::-1][0:2]
-    closing = chart.values()
-    date = datetime.datetime.utcfromtimestamp(closing[-1][0])
+    date = datetime.datetime.utcfromtimestamp(chart.date)
     if macdh[0] < 0 and macdh[1] > 0:
         signal = SELL
     elif macdh[0] > 0 and macdh[1] < 0:
@@ -180,8 +204,7 @@ def macdh_momententum(chart):
     """
 
     macdh = chart.macdh()
-    closing = chart.values()
-    date = datetime.datetime.utcfromtimestamp(closing[-1][0])
+    date = datetime.datetime.utcfromtimestamp(chart.date)
 
     pos_macdh_local_max = is_max_value(macdh) and macdh[-1] > 0
     # pos_macdh_local_min = is_min_value(macdh) and macdh[-1] > 0
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""In-memory trade log for backtests.
+
+Live bots save every trade as :class:`cointrader.bot.Trade` in the
+database. Backtests record their trades in a :class:`Ledger` instead. The
+ledger keeps the trades in a NumPy record array and never touches the
+database, so simulated trades do not cost a commit and backtests in
+several threads or processes do not share the database session. The
+trades of a ledger are only saved in the database on request, see
+:meth:`cointrader.bot.Cointrader.persist`.
+"""
+import collections
+import datetime
+
+import numpy
+
+ORDER_TYPES = ("INIT", "BUY", "SELL")
+# Order types of the trades. The ledger stores the index of the type.
+
+ORDER_IDS = {"INIT": (0, 0), "BUY": (11111111, 111111111), "SELL": (22222222, 222222222)}
+# Order and trade ids of the simulated orders.
+
+DTYPE = numpy.dtype([("date", numpy.int64), ("order_type", numpy.int8), ("rate", numpy.float64),
+                     ("amount", numpy.float64), ("btc", numpy.float64)])
+# Record of a trade. The date is a UNIX timestamp.
+
+Entry = collections.namedtuple("Entry", ["date", "order_type", "order_id", "trade_id", "market", "rate",
+                                         "amount", "amount_taxed", "btc", "btc_taxed"])
+# Trade of a ledger with the attributes of :class:`cointrader.bot.Trade`.
+
+
+def _timestamp(date):
+    return int((date - datetime.datetime(1970, 1, 1)).total_seconds())
+
+
+class Ledger(object):
+    """Trade log of a backtest on the given market. The ledger is a
+    sequence of :class:`Entry` like the trades of a bot."""
+
+    def __init__(self, market, capacity=64):
+        self.market = market
+        self._records = numpy.zeros(capacity, dtype=DTYPE)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self._entry(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(i) for i in range(self._length)[index]]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ledger index out of range")
+        return self._entry(index)
+
+    def _entry(self, index):
+        record = self._records[index]
+        order_type = ORDER_TYPES[record["order_type"]]
+        order_id, trade_id = ORDER_IDS[order_type]
+        return Entry(datetime.datetime.utcfromtimestamp(int(record["date"])), order_type, order_id, trade_id,
+                     self.market, float(record["rate"]), float(record["amount"]), 0.0, float(record["btc"]), 0.0)
+
+    def append(self, date, order_type, rate, amount, btc):
+        """Will record a trade.
+
+        :date: Datetime of the trade.
+        :order_type: Type of the trade. One of `ORDER_TYPES`.
+        :rate: Rate of the trade.
+        :amount: Amount of coins bought or sold.
+        :btc: BTC paid or earned.
+        """
+        if self._length == len(self._records):
+            records = numpy.zeros(max(2 * self._length, 16), dtype=DTYPE)
+            records[:self._length] = self._records
+            self._records = records
+        self._records[self._length] = (_timestamp(date), ORDER_TYPES.index(order_type), rate, amount, btc)
+        self._length += 1
+
+    def column(self, which):
+        """Returns the array of the given column of the recorded
+        trades."""
+        return self._records[which][:self._length]
+
+    def clear(self):
+        """Will remove all trades."""
+        self._length = 0
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Local order book of a market.
+
+:class:`OrderBook` keeps the full order book of a market in memory and
+applies the incremental updates of the push API in the order of their
+sequence numbers::
+
+    ["i", {"currencyPair": ..., "orderBook": [asks, bids]}]
+    ["o", 1 (bid) or 0 (ask), rate, amount]
+
+An amount of zero removes the level. A missing sequence number is a
+gap: the updates which follow it are kept back, the book is loaded again
+from a snapshot in the format of
+:meth:`cointrader.exchanges.poloniex.Poloniex.book` and the updates
+after the snapshot are applied again. If the snapshot fails or does not
+close the gap, the next snapshot is only requested after a backoff.
+
+The book does not care where the updates come from. It can be added to
+the listeners of a :class:`cointrader.push.PushClient`, fed with
+recorded messages or with updates of a simulation by calling
+:meth:`OrderBook.update`.
+"""
+import bisect
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+ASK = 0
+BID = 1
+
+MAX_PENDING = 1000
+# Updates which are kept back at most while the book waits for a
+# snapshot. The book is dropped after that.
+
+SNAPSHOT_DELAY = 1
+MAX_SNAPSHOT_DELAY = 60
+# Seconds to wait before the first and before later snapshots if a
+# snapshot did not bring the book in sync.
+
+SNAPSHOT_DEPTH = 100
+# Levels per side of the snapshots of live markets.
+
+
+class _Side(object):
+    """Levels of one side of the order book. The prices are kept sorted
+    with the best price first."""
+
+    def __init__(self, descending):
+        self._sign = -1 if descending else 1
+        self._keys = []
+        self.levels = {}
+
+    def clear(self):
+        self._keys = []
+        self.levels = {}
+
+    def set(self, price, amount):
+        key = self._sign * price
+        if amount > 0:
+            if price not in self.levels:
+                bisect.insort(self._keys, key)
+            self.levels[price] = amount
+        elif price in self.levels:
+            del self.levels[price]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def best(self):
+        if not self._keys:
+            return None
+        return self._sign * self._keys[0]
+
+    def top(self, depth=None):
+        keys = self._keys if depth is None else self._keys[:depth]
+        return [(self._sign * key, self.levels[self._sign * key]) for key in keys]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class OrderBook(object):
+    """Order book of a market which is maintained from incremental
+    updates."""
+
+    def __init__(self, market, snapshot=None, clock=time.monotonic):
+        """
+        :market: Name of the market like BTC_ETH.
+        :snapshot: Function returning the order book of the market in
+            the format of the API. It is called on gaps. Without a
+            snapshot the book stays out of sync after a gap until an
+            "i" update arrives.
+        :clock: Function returning the seconds for the backoff of the
+            snapshots.
+        """
+        self.market = market
+        self.seq = None
+        self.frozen = False
+        self.resyncs = 0
+        self._snapshot = snapshot
+        self._clock = clock
+        self._requesting = False
+        self._retry = None
+        self._delay = SNAPSHOT_DELAY
+        self._asks = _Side(descending=False)
+        self._bids = _Side(descending=True)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @property
+    def synced(self):
+        """True if the book has a state and no updates are missing."""
+        return self.seq is not None and not self._pending
+
+    def load(self, book):
+        """Will replace the levels with the given order book in the
+        format of the API and apply the kept back updates which follow
+        it."""
+        with self._lock:
+            self._load(book["asks"], book["bids"], int(book["seq"]))
+            self.frozen = str(book.get("isFrozen", "0")) != "0"
+            self._drain()
+
+    def update(self, seq, updates):
+        """Will apply the updates of a message of the push API with the
+        given sequence number. Messages which are already contained in
+        the book are ignored.
+
+        :returns: True if the book is in sync after the update.
+        """
+        with self._lock:
+            for update in updates:
+                if update[0] == "i":
+                    asks, bids = update[1]["orderBook"]
+                    self._load(asks.items(), bids.items(), seq)
+                    self._drain()
+                    self._reset_backoff()
+                    return self.synced
+            if self.seq is not None and seq <= self.seq:
+                return self.synced
+            if self.seq is not None and seq == self.seq + 1 and not self._pending:
+                self._apply(seq, updates)
+                return True
+            self._pending[seq] = updates
+            self._drain()
+            if len(self._pending) > MAX_PENDING:
+                log.warning("Order book of {} is missing updates before {}".format(
+                    self.market, min(self._pending)))
+                self._pending = {}
+                self.seq = None
+            self._reset_backoff()
+            if self.synced or not self._may_request():
+                return self.synced
+            self._requesting = True
+        return self._resync()
+
+    def _may_request(self):
+        # Only one snapshot is requested at a time and not before the
+        # backoff of the last one is over.
+        return (self._snapshot is not None and not self._requesting and
+                (self._retry is None or self._clock() >= self._retry))
+
+    def _reset_backoff(self):
+        # Starts the backoff again once the book is in sync.
+        if self.synced:
+            self._retry = None
+            self._delay = SNAPSHOT_DELAY
+
+    def _resync(self):
+        # Errors of the snapshot must not stop the thread which feeds
+        # the updates.
+        try:
+            book = self._snapshot()
+            self.load(book)
+            log.info("Resync order book of {} at {}".format(self.market, book["seq"]))
+            self.resyncs += 1
+        except Exception as ex:
+            log.warning("Can not load the order book of {}: {}".format(self.market, ex))
+        with self._lock:
+            self._requesting = False
+            if not self.synced:
+                self._retry = self._clock() + self._delay
+                self._delay = min(self._delay * 2, MAX_SNAPSHOT_DELAY)
+            self._reset_backoff()
+            return self.synced
+
+    def on_update(self, market, seq, updates):
+        """Listener for :attr:`cointrader.push.PushClient.listeners`."""
+        if market == self.market:
+            self.update(seq, updates)
+
+    def _load(self, asks, bids, seq):
+        self._asks.clear()
+        self._bids.clear()
+        for price, amount in asks:
+            self._asks.set(float(price), float(amount))
+        for price, amount in bids:
+            self._bids.set(float(price), float(amount))
+        self.seq = seq
+
+    def _apply(self, seq, updates):
+        for update in updates:
+            if update[0] == "o":
+                side = self._bids if int(update[1]) == BID else self._asks
+                side.set(float(update[2]), float(update[3]))
+        self.seq = seq
+
+    def _drain(self):
+        # Applies the kept back updates which follow the book and drops
+        # those which are already contained in it.
+        if self.seq is None:
+            return
+        for seq in sorted(self._pending):
+            if seq <= self.seq:
+                del self._pending[seq]
+            elif seq == self.seq + 1:
+                self._apply(seq, self._pending.pop(seq))
+            else:
+                break
+
+    def best_bid(self):
+        """Will return the highest bid or None."""
+        with self._lock:
+            return self._bids.best()
+
+    def best_ask(self):
+        """Will return the lowest ask or None."""
+        with self._lock:
+            return self._asks.best()
+
+    def spread(self):
+        """Will return the difference between the lowest ask and the
+        highest bid or None if a side is empty."""
+        with self._lock:
+            ask, bid = self._asks.best(), self._bids.best()
+        if ask is None or bid is None:
+            return None
+        return ask - bid
+
+    def depth(self, side, levels=None):
+        """Will return the levels of a side ("asks" or "bids") as list
+        of price and amount with the best price first.
+
+        :levels: Number of levels. Defaults to all levels.
+        """
+        with self._lock:
+            return (self._asks if side == "asks" else self._bids).top(levels)
+
+    def book(self, depth=10):
+        """Will return the top of the order book in the format of
+        :meth:`cointrader.exchanges.poloniex.Poloniex.book`."""
+        with self._lock:
+            return {"asks": [[price, amount] for price, amount in self._asks.top(depth)],
+                    "bids": [[price, amount] for price, amount in self._bids.top(depth)],
+                    "isFrozen": "1" if self.frozen else "0",
+                    "seq": self.seq}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._asks) + len(self._bids)
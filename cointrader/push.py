@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Client of the push API of Poloniex.
+
+The client subscribes to the ticker channel and to the channels of the
+given markets. The ticker keeps the top of the order book of every
+market, the trades of the markets are aggregated into candles by a
+:class:`CandleBuilder` per market and period. The order book updates of
+the markets are handed to listeners together with their sequence
+numbers.
+
+Messages of the push API::
+
+    [1002, null, [pair id, last, lowestAsk, highestBid, ...]]
+    [pair id, seq, [["i", {"currencyPair": ..., "orderBook": [asks, bids]}],
+                    ["o", 1 (bid) or 0 (ask), rate, amount],
+                    ["t", trade id, 1 (buy) or 0 (sell), rate, amount, timestamp],
+                    ...]]
+    [1010]
+
+The server sends a heartbeat (1010) if there was no other message for a
+second. A client which did not get any message for `stale_after`
+seconds is stale: :meth:`PushClient.top` and :meth:`PushClient.candles`
+return None then, so the markets fall back to the REST API. The
+connection is opened again with backoff until the client is stopped.
+
+The raw messages can be recorded into a file with one message per line
+and replayed, see :class:`benchmarks.standin.PushStandinServer`.
+"""
+import collections
+import json
+import logging
+import threading
+import time
+
+from cointrader import websocket
+
+log = logging.getLogger(__name__)
+
+PUSH_URL = "wss://api2.poloniex.com"
+TICKER = 1002
+HEARTBEAT = 1010
+
+STALE_AFTER = 10
+# Default seconds without any message after which the client is stale.
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 60
+# Seconds to wait before the first and before later reconnects.
+
+Top = collections.namedtuple("Top", ["bid", "ask", "last"])
+# Top of the order book and last rate of a market.
+
+
+class CandleBuilder(object):
+    """Builds candles of `period` seconds from the trades of a market.
+    The candles have the format of the chart data of the API. The
+    bucket of the first trade is not complete, so its candle is
+    dropped. Buckets without trades get a candle at the last close
+    without volume like the candles of the exchange."""
+
+    def __init__(self, period):
+        self.period = period
+        self.closed = []
+        self._candle = None
+        self._complete = False
+
+    @property
+    def candle(self):
+        """The candle of the current bucket or None."""
+        return self._candle if self._complete else None
+
+    def _close(self, bucket):
+        # Closes the current candle and fills the empty buckets before
+        # the given bucket.
+        if self._complete:
+            self.closed.append(self._candle)
+        close = self._candle["close"]
+        for date in range(self._candle["date"] + self.period, bucket, self.period):
+            self.closed.append({"date": date, "open": close, "high": close, "low": close, "close": close,
+                                "volume": 0.0, "quoteVolume": 0.0, "weightedAverage": close})
+        self._complete = True
+
+    def add(self, timestamp, rate, amount):
+        """Will add a trade. Trades of buckets which are already closed
+        are ignored.
+
+        :returns: True if the trade closed the candle of the last
+            bucket.
+        """
+        bucket = int(timestamp) // self.period * self.period
+        closed = False
+        if self._candle is not None:
+            if bucket < self._candle["date"]:
+                return False
+            if bucket > self._candle["date"]:
+                self._close(bucket)
+                self._candle = None
+                closed = True
+        if self._candle is None:
+            self._candle = {"date": bucket, "open": rate, "high": rate, "low": rate, "close": rate,
+                            "volume": 0.0, "quoteVolume": 0.0}
+        candle = self._candle
+        candle["high"] = max(candle["high"], rate)
+        candle["low"] = min(candle["low"], rate)
+        candle["close"] = rate
+        candle["volume"] += rate * amount
+        candle["quoteVolume"] += amount
+        candle["weightedAverage"] = candle["volume"] / candle["quoteVolume"] if candle["quoteVolume"] else rate
+        return closed
+
+    def flush(self, timestamp):
+        """Will close the candle of the last bucket if its period is
+        over at the given time."""
+        bucket = int(timestamp) // self.period * self.period
+        if self._candle is not None and bucket > self._candle["date"]:
+            self._close(bucket)
+            close = self._candle["close"]
+            self._candle = {"date": bucket, "open": close, "high": close, "low": close, "close": close,
+                            "volume": 0.0, "quoteVolume": 0.0, "weightedAverage": close}
+
+
+class PushClient(object):
+    """Client of the push API for the given markets."""
+
+    def __init__(self, pairs, markets, periods=(300,), url=PUSH_URL, record=None, clock=time.time,
+                 stale_after=STALE_AFTER):
+        """
+        :pairs: Dictionary of the pair ids and the names of the markets.
+            The ids are the "id" of the markets in the ticker.
+        :markets: Names of the markets to subscribe to.
+        :periods: Periods of the candles in seconds.
+        :url: Url of the push API.
+        :record: Optional file object to record the raw messages to.
+        :clock: Function returning the time of the exchange.
+        :stale_after: Seconds without any message after which the
+            client is stale. It is also the read timeout of the
+            connection.
+        """
+        self.pairs = {int(pair_id): market for pair_id, market in pairs.items()}
+        self.markets = list(markets)
+        self.url = url
+        self.seqs = {}
+        self.listeners = []
+        self._record = record
+        self._clock = clock
+        self.stale_after = stale_after
+        self.reconnects = 0
+        self.periods = tuple(periods)
+        self._tops = {}
+        self._builders = {}
+        self._reset()
+        self._lock = threading.Lock()
+        self._last = None
+        self._socket = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def _reset(self):
+        # Candles are only built from the trades of one connection, as
+        # the trades between two connections are missing.
+        self._builders = {(market, period): CandleBuilder(period)
+                          for market in self.markets for period in self.periods}
+
+    @classmethod
+    def from_ticker(cls, ticker, markets, **kwargs):
+        """Will create a client with the pair ids of the given ticker as
+        returned by the API."""
+        return cls({values["id"]: market for market, values in ticker.items() if "id" in values}, markets,
+                   **kwargs)
+
+    def connect(self):
+        """Will connect to the push API and subscribe to the ticker and
+        the markets."""
+        self._socket = websocket.connect(self.url, read_timeout=self.stale_after)
+        for channel in [TICKER] + self.markets:
+            self._socket.send(json.dumps({"command": "subscribe", "channel": channel}))
+
+    @property
+    def stale(self):
+        """True if there was no message for `stale_after` seconds."""
+        last = self._last
+        return last is None or time.monotonic() - last > self.stale_after
+
+    def run(self, reconnect=False):
+        """Will handle the messages until the connection is closed.
+
+        :reconnect: Connect again with backoff and subscribe again
+            once the connection is closed or times out, until the
+            client is stopped.
+        """
+        delay = RECONNECT_DELAY
+        while not self._stopped.is_set():
+            try:
+                if self._socket is None or self._socket.closed:
+                    self.connect()
+                    with self._lock:
+                        self._reset()
+            except (websocket.WebSocketError, OSError) as ex:
+                log.warning("Can not connect to the push API: {}".format(ex))
+            else:
+                if self._receive():
+                    delay = RECONNECT_DELAY
+                log.info("Connection to the push API closed")
+            if not reconnect:
+                break
+            if self._stopped.wait(delay):
+                break
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            self.reconnects += 1
+
+    def _receive(self):
+        # Handles the messages of the connection until it is closed and
+        # returns True if there was any message.
+        received = False
+        while True:
+            message = self._socket.recv()
+            if message is None:
+                return received
+            received = True
+            self._last = time.monotonic()
+            if self._record is not None:
+                self._record.write(message + "\n")
+            self.handle(message)
+
+    def start(self):
+        """Will connect and handle the messages in a thread which
+        reconnects until the client is stopped."""
+        self.connect()
+        self._thread = threading.Thread(target=self.run, kwargs={"reconnect": True}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._socket is not None:
+            # The thread of the client reads the close frame of the
+            # server.
+            self._socket.close(wait=False)
+        if self._thread is not None:
+            self._thread.join()
+
+    def handle(self, message):
+        """Will handle a raw message of the push API."""
+        data = json.loads(message)
+        channel = data[0]
+        if channel == HEARTBEAT or len(data) < 3:
+            return
+        if channel == TICKER:
+            self._ticker(data[2])
+        elif channel in self.pairs:
+            self._market(self.pairs[channel], data[1], data[2])
+
+    def _ticker(self, values):
+        market = self.pairs.get(int(values[0]))
+        if market is not None:
+            with self._lock:
+                self._tops[market] = Top(float(values[3]), float(values[2]), float(values[1]))
+
+    def _market(self, market, seq, updates):
+        with self._lock:
+            self.seqs[market] = seq
+            for update in updates:
+                if update[0] == "t":
+                    for period in self._periods(market):
+                        self._builders[(market, period)].add(update[5], float(update[3]), float(update[4]))
+        for listener in self.listeners:
+            listener(market, seq, updates)
+
+    def _periods(self, market):
+        return [period for name, period in self._builders if name == market]
+
+    def top(self, market):
+        """Will return the :class:`Top` of the market or None if the
+        ticker did not contain the market yet or the client is stale."""
+        if self.stale:
+            return None
+        with self._lock:
+            return self._tops.get(market)
+
+    def candles(self, market, period, since=None):
+        """Will return the closed candles of the market.
+
+        :market: Name of the market.
+        :period: Period of the candles in seconds.
+        :since: Only candles with a later date are returned.
+        :returns: List of candles or None if the client does not build
+            candles of the market and period or the client is stale.
+        """
+        if self.stale:
+            return None
+        with self._lock:
+            builder = self._builders.get((market, period))
+            if builder is None:
+                return None
+            builder.flush(self._clock())
+            return [candle for candle in builder.closed if since is None or candle["date"] > since]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Client side rate limit of the requests to the exchange.
+
+Every budget of requests is a token bucket which is refilled with a
+fixed rate. A request takes one token and waits in line if the bucket is
+empty instead of being refused by the exchange. The waits are queued in
+the order of the requests, so the requests of all threads pass at the
+allowed rate. :data:`LIMITER` is shared by all API instances of a
+process.
+"""
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+LIMITS = {"public": 6, "trading": 6}
+# Requests per second of the budgets. Poloniex allows six requests per
+# second on the public and the trading API.
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class TokenBucket(object):
+    """Token bucket with the given `rate` in tokens per second."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        :rate: Tokens which are added per second.
+        :capacity: Maximum number of tokens. Defaults to the rate, so
+            bursts last at most one second.
+        :clock: Monotonic clock in seconds.
+        :sleep: Function to wait.
+        """
+        self.rate = float(rate)
+        self.capacity = float(rate if capacity is None else capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def acquire(self, timeout=None):
+        """Will take a token and wait until it is available.
+
+        :timeout: Maximum seconds to wait. If the token is not available
+            in time :class:`RateLimitError` is raised without waiting.
+        :returns: Seconds waited.
+        """
+        with self._lock:
+            now = self._clock()
+            tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # The tokens may become negative: these are the tokens which
+            # are already promised to queued requests.
+            wait = max(0.0, (1 - tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                self._tokens = tokens
+                raise RateLimitError("Rate limit exceeded, the request would wait {:.2f}s".format(wait))
+            self._tokens = tokens - 1
+            self.requests += 1
+            if wait:
+                self.queued += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+        if wait:
+            self._sleep(wait)
+        return wait
+
+    def stats(self):
+        """Returns a dictionary with the number of requests, the number
+        of queued requests and the mean and maximum wait in seconds."""
+        with self._lock:
+            return {"requests": self.requests,
+                    "queued": self.queued,
+                    "wait_mean": self.wait_total / self.requests if self.requests else 0.0,
+                    "wait_max": self.wait_max}
+
+
+class RateLimiter(object):
+    """Token buckets of the budgets of an exchange."""
+
+    def __init__(self, limits=LIMITS, **kwargs):
+        """
+        :limits: Dictionary with the requests per second of every
+            budget.
+        :kwargs: Further arguments of :class:`TokenBucket`.
+        """
+        self.buckets = {budget: TokenBucket(rate, **kwargs) for budget, rate in limits.items()}
+
+    def acquire(self, budget, timeout=None):
+        """Will wait until a request of the given budget is allowed.
+
+        :returns: Seconds waited.
+        """
+        wait = self.buckets[budget].acquire(timeout)
+        if wait:
+            log.debug("Request of the {} budget waited {:.3f}s".format(budget, wait))
+        return wait
+
+    def stats(self):
+        """Returns the stats of every budget, see
+        :meth:`TokenBucket.stats`."""
+        return {budget: bucket.stats() for budget, bucket in self.buckets.items()}
+
+
+LIMITER = RateLimiter()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Resampling of charts into coarser resolutions.
+
+Candles of a coarser resolution are build from the candles of a finer
+base resolution. The candles are grouped into buckets of `period`
+seconds aligned to the UNIX epoch which is the same alignment the
+exchange uses for its candles.
+"""
+import numpy
+
+from cointrader.chart import COLUMNS, Chart, search_index_by_date
+
+
+def resample(arrays, period):
+    """Will resample the given chart arrays into candles of `period`
+    seconds. The last candle is build from the available base candles
+    even if its bucket is not complete yet.
+
+    :arrays: Dictionary with one array per column in `COLUMNS`.
+    :period: Period of the resampled candles in seconds.
+    :returns: Dictionary with one array per column in `COLUMNS`.
+    """
+    count = len(arrays["date"])
+    if not count:
+        return {column: arrays[column][:0].copy() for column in COLUMNS}
+    buckets = arrays["date"] // period * period
+    starts = numpy.flatnonzero(numpy.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = numpy.concatenate((starts[1:], [count])) - 1
+    return {"date": buckets[starts],
+            "open": arrays["open"][starts],
+            "high": numpy.maximum.reduceat(arrays["high"], starts),
+            "low": numpy.minimum.reduceat(arrays["low"], starts),
+            "close": arrays["close"][ends],
+            "volume": numpy.add.reduceat(arrays["volume"], starts)}
+
+
+class Resampler(object):
+
+    """Keeps a resampled chart up to date while new base candles
+    arrive. Completed candles are kept in arrays which grow on demand,
+    the candle of the current bucket is rebuild from its base candles
+    on every update. Updating a base candle which has already been
+    seen (e.g. the still open candle) replaces it."""
+
+    def __init__(self, period, capacity=256):
+        """
+        :period: Period of the resampled candles in seconds.
+        :capacity: Initial number of candles the arrays can hold.
+        """
+        self.period = period
+        self.count = 0
+        self._arrays = {column: numpy.zeros(capacity, dtype=numpy.int64 if column == "date" else numpy.float64)
+                        for column in COLUMNS}
+        self._bucket = None
+        self._pending = {}
+
+    def __len__(self):
+        return self.count + (1 if self._pending else 0)
+
+    @property
+    def last_date(self):
+        """Date of the last base candle seen."""
+        if not self._pending:
+            return None
+        return max(self._pending)
+
+    def _reserve(self, count):
+        capacity = len(self._arrays["date"])
+        if count <= capacity:
+            return
+        capacity = max(count, capacity * 2)
+        for column in COLUMNS:
+            grown = numpy.zeros(capacity, dtype=self._arrays[column].dtype)
+            grown[:self.count] = self._arrays[column][:self.count]
+            self._arrays[column] = grown
+
+    def _write_pending(self):
+        candles = [self._pending[date] for date in sorted(self._pending)]
+        self._reserve(self.count + 1)
+        index = self.count
+        self._arrays["date"][index] = self._bucket
+        self._arrays["open"][index] = candles[0]["open"]
+        self._arrays["high"][index] = max(c["high"] for c in candles)
+        self._arrays["low"][index] = min(c["low"] for c in candles)
+        self._arrays["close"][index] = candles[-1]["close"]
+        self._arrays["volume"][index] = sum(c["volume"] for c in candles)
+
+    def seed(self, arrays):
+        """Will resample all given base candles at once. The base
+        candles of the last bucket are kept to update the bucket later.
+
+        :arrays: Dictionary with one array per column in `COLUMNS`.
+        :returns: The resampler itself.
+        """
+        resampled = resample(arrays, self.period)
+        count = len(resampled["date"])
+        if not count:
+            return self
+        self.count = 0
+        self._reserve(count)
+        for column in COLUMNS:
+            self._arrays[column][:count - 1] = resampled[column][:-1]
+        self.count = count - 1
+        self._bucket = int(resampled["date"][-1])
+        first = int(numpy.searchsorted(arrays["date"], self._bucket))
+        self._pending = {}
+        for index in range(first, len(arrays["date"])):
+            candle = {column: arrays[column][index] for column in COLUMNS}
+            self._pending[int(candle["date"])] = candle
+        self._write_pending()
+        return self
+
+    def update(self, candle):
+        """Will add or replace the given base candle.
+
+        :candle: Dictionary with at least the columns in `COLUMNS`.
+        :returns: True if the candle started a new bucket.
+        """
+        date = int(candle["date"])
+        bucket = date // self.period * self.period
+        if self._bucket is not None and bucket < self._bucket:
+            return False
+        started = bucket != self._bucket
+        if started:
+            if self._pending:
+                self.count += 1
+            self._bucket = bucket
+            self._pending = {}
+        self._pending[date] = candle
+        self._write_pending()
+        return started
+
+    def chart(self, start=None, end=None, offset=0):
+        """Returns a chart on the resampled candles including the
+        candle of the current bucket. `offset` candles before `start` are
+        included to let indicators settle."""
+        length = len(self)
+        arrays = {column: self._arrays[column][:length] for column in COLUMNS}
+        first, last = 0, length
+        if start is not None:
+            first = max(search_index_by_date(arrays["date"], start) - offset, 0)
+        if end is not None:
+            last = search_index_by_date(arrays["date"], end) + 1
+        return Chart.from_arrays({column: arrays[column][first:last] for column in COLUMNS}, start, end)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Scheduling of live bots on the close of the candles.
+
+Instead of polling the chart until a new candle shows up,
+:class:`CandleScheduler` computes the time of the next candle close from
+the resolution and an estimate of the offset between the local clock and
+the clock of the exchange. It waits until shortly after the close and
+confirms the new candle with one request of the last candles only. The
+candle which closed is appended to the chart of the live market, see
+:meth:`cointrader.exchange.Market.append_candles`.
+"""
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class CandleScheduler(object):
+    """Will wait for the close of the candles of a market."""
+
+    def __init__(self, market, resolution, clock, delay=2.0, retry=1.0, tries=10):
+        """
+        :market: :class:`cointrader.exchange.Market` instance.
+        :resolution: Resolution of the candles.
+        :clock: :class:`cointrader.clock.Clock` to wait on.
+        :delay: Seconds to wait after the close before the new candle is
+            requested.
+        :retry: Seconds to wait before the new candle is requested again
+            if it is not available yet.
+        :tries: Number of requests for the new candle before giving up.
+        """
+        self._market = market
+        self._resolution = resolution
+        self._clock = clock
+        self.period = market._exchange.resolution2seconds(resolution)
+        self.delay = delay
+        self.retry = retry
+        self.tries = tries
+        self.offset = None
+
+    def estimate_offset(self):
+        """Will estimate the offset of the clock of the exchange to the
+        local clock in seconds. The time of the exchange is assigned to
+        the middle of the request. Its resolution is one second, so half
+        a second is added."""
+        sent = self._clock.time()
+        server_time = self._market._exchange.server_time()
+        received = self._clock.time()
+        self.offset = server_time + 0.5 - (sent + received) / 2.0
+        log.debug("Clock offset to the exchange: {:.3f}s".format(self.offset))
+        return self.offset
+
+    def next_close(self):
+        """Will return the time of the exchange of the next candle
+        close."""
+        if self.offset is None:
+            self.estimate_offset()
+        now = self._clock.time() + self.offset
+        return (now // self.period + 1) * self.period
+
+    def wait(self):
+        """Will wait for the next candle close and the new candle.
+
+        :returns: Date of the new candle or None if the exchange did not
+            deliver it in time.
+        """
+        close = self.next_close()
+        self._clock.sleep_until(close - self.offset + self.delay)
+        for _ in range(self.tries):
+            candles = self._market.new_candles(self._resolution, close - self.period)
+            if candles and candles[-1]["date"] >= close:
+                self._market.append_candles(self._resolution, [c for c in candles if c["date"] < close])
+                return candles[-1]["date"]
+            self._clock.sleep(self.retry)
+        log.warning("No candle at {} after {} requests".format(close, self.tries))
+        # The clock of the exchange may have drifted.
+        self.estimate_offset()
+        return None
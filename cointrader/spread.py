@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Spread models for backtests.
+
+Live markets ask the exchange for the spread with
+:meth:`cointrader.exchange.Poloniex.get_spread`. This is a request of the
+ticker, so backtests use a spread model instead which makes no request.
+The spread is the half of the difference between the lowest ask and the
+highest bid in percent of the price like the spread of the exchange.
+The model of a backtest is chosen by its name in :data:`SPREAD_MODELS`,
+see :func:`spread_model`.
+"""
+import numpy
+
+
+class SpreadModel(object):
+    """Baseclass for all spread models."""
+
+    def spread(self, chart):
+        """Will return the spread in percent at the last datapoint of
+        the given chart.
+
+        :chart: Chart instance or None if no chart is loaded yet.
+        """
+        raise NotImplementedError
+
+    def series(self, chart):
+        """Will return the spread in percent at every datapoint of the
+        given chart as array or as single value if it is the same for
+        all datapoints, see :func:`cointrader.backtest.run`."""
+        raise NotImplementedError
+
+
+class FixedSpread(SpreadModel):
+    """Constant spread, e.g. the spread of the market captured once at
+    the start of the backtest."""
+
+    def __init__(self, spread):
+        self.value = float(spread)
+
+    def spread(self, chart):
+        return self.value
+
+    def series(self, chart):
+        return self.value
+
+
+class CandleSpread(SpreadModel):
+    """Spread estimated from the high and low of the candles, see
+    :func:`cointrader.ta.hl_spread`. Before a chart is loaded the
+    `default` spread is used."""
+
+    def __init__(self, window=20, default=0.0):
+        self.window = window
+        self.default = float(default)
+
+    def spread(self, chart):
+        if chart is None or not len(chart):
+            return self.default
+        return float(chart.spread(self.window)[-1])
+
+    def series(self, chart):
+        return chart.spread(self.window)
+
+
+SPREAD_MODELS = {"fixed": FixedSpread, "candles": CandleSpread}
+# Spread models by their name.
+
+
+def spread_model(name, spread):
+    """Will return the spread model with the given name.
+
+    :name: Name of the model in :data:`SPREAD_MODELS`.
+    :spread: Current spread of the market in percent. The fixed model
+        keeps it, the candle model uses it until a chart is loaded.
+    """
+    if name == "candles":
+        return CandleSpread(default=spread)
+    return SPREAD_MODELS[name](spread)
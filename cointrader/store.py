@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import logging
+import sqlalchemy as sa
+
+from cointrader.archive import Archive, append_archive, write_archive
+from cointrader.exchanges.poloniex import totimestamp
+
+log = logging.getLogger(__name__)
+
+STORE_URL = 'sqlite://'
+# Database of the local candle store. It is kept separate from the
+# database of the bots. The default is in memory, see
+# :attr:`cointrader.config.Config.store_url` for the file of the bots.
+
+metadata = sa.MetaData()
+
+candles = sa.Table(
+    "candles", metadata,
+    sa.Column("market", sa.String, primary_key=True),
+    sa.Column("period", sa.Integer, primary_key=True),
+    sa.Column("date", sa.Integer, primary_key=True),
+    sa.Column("open", sa.Float, nullable=False),
+    sa.Column("high", sa.Float, nullable=False),
+    sa.Column("low", sa.Float, nullable=False),
+    sa.Column("close", sa.Float, nullable=False),
+    sa.Column("volume", sa.Float, nullable=False),
+    sa.Column("quoteVolume", sa.Float),
+    sa.Column("weightedAverage", sa.Float),
+)
+
+ranges = sa.Table(
+    "ranges", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("market", sa.String, nullable=False, index=True),
+    sa.Column("period", sa.Integer, nullable=False),
+    sa.Column("start", sa.Integer, nullable=False),
+    sa.Column("end", sa.Integer, nullable=False),
+)
+
+CANDLE_COLUMNS = [c.name for c in candles.columns if c.name not in ("market", "period")]
+
+
+def merge_ranges(items, period):
+    """Will merge the given list of (start, end) tuples into a sorted
+    list of non overlapping ranges. Ranges which are only separated by
+    a single period are merged too."""
+    merged = []
+    for start, end in sorted(items):
+        if merged and start <= merged[-1][1] + period:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered, start, end, period):
+    """Returns the list of (start, end) tuples within `start` and
+    `end` which are not part of the `covered` ranges."""
+    missing = []
+    for cstart, cend in merge_ranges(covered, period):
+        if cend < start or cstart > end:
+            continue
+        if cstart > start:
+            missing.append((start, cstart - period))
+        start = cend + period
+    if start <= end:
+        missing.append((start, end))
+    return missing
+
+
+class CandleStore(object):
+
+    """Local on-disk store of chart data. The store is keyed by the
+    market and the period of the candles. It remembers which time
+    ranges are already stored and will only request the missing ranges
+    from the API. The candle which is still open at the time of the
+    request is stored but never marked as covered, so it is requested
+    again on the next call."""
+
+    def __init__(self, api, url=STORE_URL, read_only=False):
+        """
+        :api: :class:`cointrader.exchanges.poloniex.Api` instance
+        :url: SQLAlchemy database url of the store.
+        :read_only: Never write to the store. Missing candles are
+            requested but not saved and the candle which is still open
+            is taken from the store as it is. Used by processes which
+            share a store another process keeps up to date.
+        """
+        self._api = api
+        self.url = url
+        self.read_only = read_only
+        path = sa.engine.url.make_url(url).database
+        if not read_only and url.startswith("sqlite") and path and path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        self._engine = sa.create_engine(url)
+        if not read_only:
+            metadata.create_all(self._engine)
+
+    @property
+    def in_memory(self):
+        """True if the store is in memory and can not be shared with
+        other processes."""
+        return sa.engine.url.make_url(self.url).database in (None, "", ":memory:")
+
+    def _covered(self, conn, market, period):
+        query = ranges.select().where(sa.and_(ranges.c.market == market, ranges.c.period == period))
+        return [(row.start, row.end) for row in conn.execute(query)]
+
+    def _set_covered(self, conn, market, period, covered):
+        conn.execute(ranges.delete().where(sa.and_(ranges.c.market == market, ranges.c.period == period)))
+        if covered:
+            conn.execute(ranges.insert(), [{"market": market, "period": period, "start": start, "end": end}
+                                           for start, end in covered])
+
+    def _fetch(self, market, start, end, period):
+        data = self._api.chart(market,
+                               datetime.datetime.utcfromtimestamp(start),
+                               datetime.datetime.utcfromtimestamp(end),
+                               period)
+        # Poloniex returns a single empty datapoint with date 0 if there
+        # is no data in the requested range.
+        return [d for d in data if d["date"]]
+
+    def _save(self, conn, market, period, data):
+        # Candles which are already stored (e.g. the candle which was
+        # still open) are updated, the others are inserted. Done without
+        # a dialect specific upsert to support every database of the url.
+        dates = [d["date"] for d in data]
+        query = sa.select(candles.c.date).where(sa.and_(candles.c.market == market,
+                                                        candles.c.period == period,
+                                                        candles.c.date >= min(dates),
+                                                        candles.c.date <= max(dates)))
+        stored = {row.date for row in conn.execute(query)}
+        rows = [dict({c: d.get(c) for c in CANDLE_COLUMNS}, market=market, period=period) for d in data]
+        new = [row for row in rows if row["date"] not in stored]
+        if new:
+            conn.execute(candles.insert(), new)
+        old = [dict({"_" + c: row[c] for c in ("market", "period", "date")},
+                    **{c: row[c] for c in CANDLE_COLUMNS if c != "date"})
+               for row in rows if row["date"] in stored]
+        if old:
+            conn.execute(candles.update().where(sa.and_(candles.c.market == sa.bindparam("_market"),
+                                                        candles.c.period == sa.bindparam("_period"),
+                                                        candles.c.date == sa.bindparam("_date"))), old)
+
+    def update(self, market, start, end, period=1800, now=None):
+        """Will request all missing candles between `start` and `end`
+        from the API and save them in the store.
+
+        :market: Currency pair like BTC_DASH.
+        :start: Datetime object.
+        :end: Datetime object.
+        :period: Period of the candles in seconds.
+        :now: Current datetime. Defaults to utcnow.
+        :returns: Number of API requests done.
+        """
+        if now is None:
+            now = datetime.datetime.utcnow()
+        first = -(-totimestamp(start) // period) * period
+        last = totimestamp(end) // period * period
+        # The last candle is only complete if its period is over.
+        last_closed = min(last, (totimestamp(now) - period) // period * period)
+
+        requests = 0
+        with self._engine.begin() as conn:
+            covered = self._covered(conn, market, period)
+            for mstart, mend in missing_ranges(covered, first, last, period):
+                data = self._fetch(market, mstart, mend, period)
+                requests += 1
+                if data:
+                    self._save(conn, market, period, data)
+                if mstart <= last_closed:
+                    covered.append((mstart, min(mend, last_closed)))
+            self._set_covered(conn, market, period, merge_ranges(covered, period))
+        log.debug("Candle store {} {}: {} requests".format(market, period, requests))
+        return requests
+
+    def chart(self, market, start, end, period=1800):
+        """Returns the chart data between `start` and `end` in the same
+        format as :meth:`cointrader.exchanges.poloniex.Poloniex.chart`.
+        Missing data is requested from the API first."""
+        if self.read_only:
+            return self._read(market, start, end, period)
+        self.update(market, start, end, period)
+        query = candles.select().where(sa.and_(candles.c.market == market,
+                                               candles.c.period == period,
+                                               candles.c.date >= totimestamp(start),
+                                               candles.c.date <= totimestamp(end))).order_by(candles.c.date)
+        with self._engine.connect() as conn:
+            return [{c: getattr(row, c) for c in CANDLE_COLUMNS} for row in conn.execute(query)]
+
+    def _read(self, market, start, end, period):
+        # Chart data of a read-only store. The candles of missing ranges
+        # are requested and merged without saving them.
+        first = -(-totimestamp(start) // period) * period
+        last = totimestamp(end) // period * period
+        query = candles.select().where(sa.and_(candles.c.market == market,
+                                               candles.c.period == period,
+                                               candles.c.date >= first,
+                                               candles.c.date <= last)).order_by(candles.c.date)
+        with self._engine.connect() as conn:
+            stored = [{c: getattr(row, c) for c in CANDLE_COLUMNS} for row in conn.execute(query)]
+            covered = self._covered(conn, market, period)
+        if stored:
+            # The candle which is still open is stored but not covered.
+            covered.append((stored[-1]["date"], stored[-1]["date"]))
+        data = {d["date"]: d for d in stored}
+        for mstart, mend in missing_ranges(covered, first, last, period):
+            data.update((d["date"], d) for d in self._fetch(market, mstart, mend, period) if first <= d["date"] <= last)
+        return [data[date] for date in sorted(data)]
+
+    def export(self, market, start, end, period, path):
+        """Will write the chart data between `start` and `end` into the
+        candle archive at `path`. If the archive exists the newer
+        candles are appended.
+
+        :returns: :class:`cointrader.archive.Archive` instance.
+        """
+        data = self.chart(market, start, end, period)
+        if os.path.exists(path):
+            append_archive(path, data, market, period)
+        else:
+            write_archive(path, data, market, period)
+        return Archive(path)
@@ -2,13 +2,20 @@
 import datetime
 import logging
 import string
+import numpy
 
+from cointrader.streaming import Extrema
+from cointrader.ta import local_extrema
 from cointrader.indicators import (
-    SELL_ZONE, WAIT, BUY, SELL, QUIT, Signal, macdh_momententum, macdh, double_cross
+    MIN_POINTS, SELL_ZONE, WAIT, BUY, SELL, QUIT, Signal, Signals, macdh_momententum, macdh, double_cross
 )
 
 log = logging.getLogger(__name__)
 
+EXTREMA_START = 121
+# Index of the first close which is used to find the local extrema in
+# backtests once the chart has more closes.
+
 
 class Strategy(object):
     """Docstring for Strategy. """
@@ -28,6 +35,28 @@ class Strategy(object):
         market"""
         raise NotImplementedError
 
+    def backtest_signals(self, chart, start=MIN_POINTS):
+        """Will return the signals for every datapoint of the chart as
+        they are emitted if :meth:`signal` is called for every datapoint
+        from `start` on in a backtest. The signals of the datapoints
+        before `start` are WAIT.
+
+        This default implementation calls :meth:`signal` for every
+        datapoint. Strategies should overwrite it with a vectorized
+        implementation.
+
+        :chart: Chart instance
+        :start: Index of the first datapoint a signal is calculated for.
+        :returns: :class:`cointrader.indicators.Signals` instance.
+        """
+        signals = Signals(numpy.full(len(chart), WAIT), chart.column("date"))
+        for index in range(start, len(chart)):
+            signal = self.signal(chart.view(index + 1))
+            signals.value[index] = signal.value
+            signals.over_sell[index] = signal.over_sell
+            signals.max_up[index] = signal.max_up
+        return signals
+
 
 class NullStrategy(Strategy):
     """The NullStrategy does nothing than WAIT. It will emit not BUY or
@@ -53,29 +82,50 @@ class Klondike(Strategy):
             return signal
         return Signal(WAIT, datetime.datetime.utcfromtimestamp(chart.date))
 
+    def backtest_signals(self, chart, start=MIN_POINTS):
+        value = numpy.full(len(chart), WAIT)
+        macdh = chart.macdh()
+        a, b, c = macdh[:-2], macdh[1:-1], macdh[2:]
+        value[2:] = numpy.select([(a < b) & (b > c) & (c > 0), (a > b) & (b < c) & (c < 0)], [SELL, BUY], WAIT)
+        value[:max(start, 0)] = WAIT
+        return Signals(value, chart.column("date"))
+
 
 class Followtrend(Strategy):
-    """Simple trend follow strategie."""
+    """Simple trend follow strategie.
+
+    :fast: Window size of the faster EMA of the double cross.
+    :slow: Window size of the slower EMA of the double cross.
+    :buy_rsi: RSI below which buying is allowed.
+    :sell_wr: WR above which selling is allowed.
+    :over_sell_rsi: RSI above which the market is over sold.
+    :min_adx: ADX above which buying is allowed.
+    """
 
-    def __init__(self):
+    def __init__(self, fast=13, slow=26, buy_rsi=63, sell_wr=63, over_sell_rsi=70, min_adx=20):
 
         Strategy.__init__(self)
+        self.fast = fast
+        self.slow = slow
+        self.buy_rsi = buy_rsi
+        self.sell_wr = sell_wr
+        self.over_sell_rsi = over_sell_rsi
+        self.min_adx = min_adx
         self._macd = WAIT
         self.verbose = False
         self.EMA = []
         self.trend = []
         self.buy_tick = 0
         self.buy_tick_enable = False
+        self._extrema = Extrema()
 
     def signal(self, chart, verbose=False, first_buy_price=1000000, backtest=False, backtest_tick=0):
 
         global SELL_ZONE
         self.verbose = verbose
         # Get current chart
-        closing = chart.values()
-
-        self._value = closing[-1][1]
-        self._date = datetime.datetime.utcfromtimestamp(closing[-1][0])
+        self._value = chart.close
+        self._date = datetime.datetime.utcfromtimestamp(chart.date)
 
         # MACDH is an early indicator for trend changes. We are using the
         # MACDH as a precondition for trading signals here and required
@@ -91,14 +141,14 @@ class Followtrend(Strategy):
 
         # Finally we are using the double_cross signal as confirmation
         # of the former MACDH signal
-        dc_signal = double_cross(current_strategy=self, chart=chart)
+        dc_signal = double_cross(current_strategy=self, chart=chart, fast=self.fast, slow=self.slow)
 
         list = chart.rsi()
         list_wr = chart.wr()
         list_dmi = chart.dmi()
         print(" ADX: {:+.2f}".format(list_dmi[-1]), end=" ", flush=True)
-        good_to_sell = (list_wr[-1] > 63 and first_buy_price < self._value)
-        good_to_buy = list[-1] < 63 and list_dmi[-1] > 20
+        good_to_sell = (list_wr[-1] > self.sell_wr and first_buy_price < self._value)
+        good_to_buy = list[-1] < self.buy_rsi and list_dmi[-1] > self.min_adx
 
         if (self.EMA[-2] >= 0 > self.EMA[-1] or self.EMA[-2] < 0 <= self.EMA[-1]) \
             and ((self._macd == BUY and dc_signal.value == BUY and good_to_buy)
@@ -144,7 +194,7 @@ class Followtrend(Strategy):
 
         log.debug("P: {:.5f} MACD+DC {}: {}".format(self._value, signal.date, signal.value))
         self.signals["DC"] = signal
-        if list[-1] > 70:
+        if list[-1] > self.over_sell_rsi:
             signal.over_sell = True
             SELL_ZONE += 1
             print(" SELL_ZONE: {:.2f}".format(SELL_ZONE, self._value), end=" ", flush=True)
@@ -154,43 +204,99 @@ class Followtrend(Strategy):
         if signal.value == SELL:
             SELL_ZONE = 0
 
-        only_closes = []
+        closes = chart.column("close")
         if backtest:
-            current_chart = chart.data[121 - abs(backtest_tick) if len(chart.data) > 121 else 0:backtest_tick]
+            window = slice(EXTREMA_START - abs(backtest_tick) if len(closes) > EXTREMA_START else 0, backtest_tick)
         else:
-            if len(chart.data) >= 2:
-                current_chart = chart.data[:-2]
-            else:
-                current_chart = chart.data
-        for x in current_chart[:-2]:
-            only_closes.append(x["close"])
-
-        if current_chart:
-            last_max, last_min = self.FindMaximaMinima(numbers=only_closes)
-            report = ""
-            current_price = current_chart[-1]['close']
-            if last_max:
-                if len(last_max) == 1:
-                    last_max = last_max[-1]
-                else:
-                    last_max = max(last_max)
-                    if current_price > last_max:
-                        report = report + "Пробитие локального МАКСИМУМА "
-                        signal.max_up = True
-
-            if last_min:
-                if len(last_min) == 1:
-                    last_min = last_min[-1]
-                else:
-                    last_min = min(last_min)
-                    if current_price < last_min:
-                        report = report.join("Пробитие локального МИНИМУМА")
+            window = slice(None, -2 if len(closes) >= 2 else None)
+        current_closes = closes[window]
+        only_closes = current_closes[:-2]
+
+        report = ""
+        if len(current_closes):
+            # The extrema are only updated with the new closes.
+            extrema = self._extrema.update(chart.column("date")[window][:-2], only_closes)
+            current_price = current_closes[-1]
+            if extrema.maxima > 1 and current_price > extrema.highest:
+                report = report + "Пробитие локального МАКСИМУМА "
+                signal.max_up = True
+            if extrema.minima > 1 and current_price < extrema.lowest:
+                report = report.join("Пробитие локального МИНИМУМА")
 
         if report:
             print(report, end=" ", flush=True)
 
         return signal
 
+    def backtest_signals(self, chart, start=MIN_POINTS, first_buy_price=1000000, origin=0):
+        """Will return the signals for every datapoint of the chart as
+        they are emitted by :meth:`signal` in a backtest which calls it
+        for every datapoint from `start` on. The state of the strategy
+        (MACDH signal, EMA differences and trends) is updated as if
+        :meth:`signal` was called.
+
+        :chart: Chart instance
+        :start: Index of the first datapoint a signal is calculated for.
+        :first_buy_price: Price of the first buy. Either a number or an
+            array with one price per datapoint.
+        :origin: Index of the datapoint the local extrema are counted
+            from, like the first datapoint of the chart of a bot. Use it
+            to backtest a part of a longer chart.
+        :returns: :class:`cointrader.indicators.Signals` instance.
+        """
+        count = len(chart)
+        start = max(start, 1)
+        closes = chart.column("close")
+        value = numpy.full(count, WAIT)
+        over_sell = numpy.zeros(count, dtype=bool)
+        max_up = numpy.zeros(count, dtype=bool)
+        if start >= count:
+            return Signals(value, chart.column("date"), over_sell, max_up)
+
+        ticks = numpy.arange(start, count)
+        close = closes[ticks]
+
+        # MACDH signal which stays until the next change.
+        macdh = chart.macdh()
+        current, previous = macdh[ticks], macdh[ticks - 1]
+        macdh_value = numpy.select([(current < 0) & (previous > 0), (current > 0) & (previous < 0)], [SELL, BUY], WAIT)
+        changed = numpy.maximum.accumulate(numpy.where(macdh_value != WAIT, numpy.arange(len(ticks)), -1))
+        macd = numpy.where(changed >= 0, macdh_value[changed], self._macd)
+
+        # Double cross of the EMAs.
+        fast, slow = chart.ema(self.fast)[ticks], chart.ema(self.slow)[ticks]
+        dc_value = numpy.select([(close > fast) & (fast > slow), (close < fast) & (fast < slow)], [BUY, SELL], WAIT)
+        ema_diff = slow - fast
+        previous_diff = numpy.concatenate(([self.EMA[-1] if self.EMA else ema_diff[0]], ema_diff[:-1]))
+        cross = ((previous_diff >= 0) & (0 > ema_diff)) | ((previous_diff < 0) & (0 <= ema_diff))
+
+        rsi = chart.rsi()[ticks]
+        if numpy.ndim(first_buy_price):
+            first_buy_price = numpy.asarray(first_buy_price)[ticks]
+        good_to_sell = (chart.wr()[ticks] > self.sell_wr) & (first_buy_price < close)
+        good_to_buy = (rsi < self.buy_rsi) & (chart.dmi()[ticks] > self.min_adx)
+        buy = (macd == BUY) & (dc_value == BUY)
+        value[ticks] = numpy.select([cross & ((buy & good_to_buy) | ((macd == SELL) & (dc_value == SELL))),
+                                     buy & ~good_to_buy,
+                                     good_to_sell],
+                                    [dc_value, QUIT, SELL], WAIT)
+        over_sell[ticks] = rsi > self.over_sell_rsi
+
+        # Breakout of the local extrema of the closes in the window
+        # before the current close.
+        extrema_start = origin + EXTREMA_START
+        for first, selected in ((origin, ticks + 1 <= extrema_start), (extrema_start, ticks + 1 > extrema_start)):
+            maxima = chart.maxima(first)
+            ends = numpy.maximum(ticks[selected] - 1, first)
+            max_up[ticks[selected]] = (maxima[ends, 0] > 1) & (close[selected] > maxima[ends, 1])
+
+        if not self.EMA:
+            self.EMA.append(ema_diff[0])
+        self.EMA.extend(ema_diff.tolist())
+        self.trend.extend(numpy.select([fast < slow, fast > slow], ["Рынок  ВНИЗ", "Рынок ВВЕРХ"], "ПОВОРОТ").tolist())
+        self._macd = int(macd[-1])
+        return Signals(value, chart.column("date"), over_sell, max_up)
+
     """
     Find All Local Maximums and Minimums in a list of Integers.
     An element is a local maximum and minimums if it is larger than the two elements adjacent to it, or if it is the first or last element and larger than the one element adjacent to it.
@@ -198,26 +304,12 @@ class Followtrend(Strategy):
     Example:  for 3, 2, 4, 1 the local maxima are at indices 0 and 2.  
     """
 
-    def FindMaximaMinima(self, numbers: list):
-
-        maxima = []
-        minima = []
-        length = len(numbers)
-        if length >= 2:
-            if numbers[0] > numbers[1]:
-                maxima.append(numbers[0])
-            else:
-                minima.append(numbers[0])
-
-            if length > 3:
-                for i in range(1, length - 1):
-                    if numbers[i] > numbers[i - 1] and numbers[i] > numbers[i + 1]:
-                        maxima.append(numbers[i])
-                    elif numbers[i] < numbers[i - 1] and numbers[i] < numbers[i + 1]:
-                        minima.append(numbers[i])
-
-            if numbers[length - 1] > numbers[length - 2]:
-                maxima.append(numbers[length - 1])
-            elif numbers[length - 1] < numbers[length - 2]:
-                minima.append(numbers[length - 1])
-        return maxima, minima
+    def FindMaximaMinima(self, numbers: list, indices=False):
+        """Returns the lists of the local maxima and minima of `numbers`.
+        If `indices` is true the lists of their indices are returned
+        too."""
+        numbers = numpy.asarray(numbers, dtype=numpy.float64)
+        maxima, minima = local_extrema(numbers)
+        if indices:
+            return numbers[maxima].tolist(), numbers[minima].tolist(), maxima.tolist(), minima.tolist()
+        return numbers[maxima].tolist(), numbers[minima].tolist()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Stateful indicators for live trading.
+
+The indicators of :class:`cointrader.chart.Chart` are calculated over the
+whole chart on every call. The indicators in this module are seeded once
+from the history of a chart and are then updated in constant time for
+every new candle. Their values are the same as the values calculated by
+stockstats for the same chart.
+"""
+import collections
+
+import numpy
+
+NAN = float("nan")
+
+
+class StreamingIndicator(object):
+    """Baseclass for all streaming indicators. A indicator is feed with
+    the high, low and close value of every candle in chronological
+    order."""
+
+    def __init__(self):
+        self.value = NAN
+        self.count = 0
+
+    def seed(self, chart):
+        """Will feed all datapoints of the given chart into the
+        indicator.
+
+        :chart: :class:`cointrader.chart.Chart` instance
+        :returns: The indicator itself.
+        """
+        highs = chart.column("high").tolist()
+        lows = chart.column("low").tolist()
+        closes = chart.column("close").tolist()
+        for high, low, close in zip(highs, lows, closes):
+            self.update(high, low, close)
+        return self
+
+    def append(self, candle):
+        """Will update the indicator with a new candle given as
+        dictionary like it is returned from the API.
+
+        :candle: Dictionary with at least high, low and close.
+        :returns: The new value of the indicator.
+        """
+        return self.update(float(candle["high"]), float(candle["low"]), float(candle["close"]))
+
+    def update(self, high, low, close):
+        self.count += 1
+        self.value = self._update(high, low, close)
+        return self.value
+
+    def _update(self, high, low, close):
+        raise NotImplementedError
+
+
+class EWM(object):
+    """Exponential weighted mean with `adjust=True`. This is the same
+    recurrence pandas uses for `Series.ewm(alpha=alpha).mean()`, so the
+    results are identical."""
+
+    def __init__(self, alpha):
+        self.factor = 1.0 - alpha
+        self.weight = 1.0
+        self.nobs = 0
+        self.value = NAN
+
+    def update(self, value):
+        observation = value == value
+        if self.value == self.value:
+            self.weight *= self.factor
+            if observation:
+                if self.value != value:
+                    self.value = (self.weight * self.value + value) / (self.weight + 1.0)
+                self.weight += 1.0
+        elif observation:
+            self.value = value
+        self.nobs += observation
+        return self.value
+
+
+class EMA(StreamingIndicator):
+    """Exponential moving average of the close (close_N_ema)."""
+
+    def __init__(self, window=10):
+        StreamingIndicator.__init__(self)
+        self.window = window
+        self._ewm = EWM(2.0 / (window + 1))
+
+    def _update(self, high, low, close):
+        return self._ewm.update(close)
+
+
+class SMA(StreamingIndicator):
+    """Simple moving average of the close (close_N_sma). The sum of the
+    window is kept running. It is summed up again once per window to
+    drop the rounding errors of the running sum."""
+
+    def __init__(self, window=10):
+        StreamingIndicator.__init__(self)
+        self.window = window
+        self._values = collections.deque(maxlen=window)
+        self._sum = 0.0
+
+    def _update(self, high, low, close):
+        if len(self._values) == self.window:
+            self._sum -= self._values[0]
+        self._values.append(close)
+        if self.count % self.window == 0:
+            self._sum = sum(self._values)
+        else:
+            self._sum += close
+        return self._sum / len(self._values)
+
+
+class MACD(StreamingIndicator):
+    """Moving average convergence divergence. The `value` is the MACD
+    histogram (macdh), the MACD line and the signal line are available
+    as `macd` and `macds`."""
+
+    def __init__(self, short=12, long=26, signal=9):
+        StreamingIndicator.__init__(self)
+        self._short = EWM(2.0 / (short + 1))
+        self._long = EWM(2.0 / (long + 1))
+        self._signal = EWM(2.0 / (signal + 1))
+        self.macd = NAN
+        self.macds = NAN
+
+    def _update(self, high, low, close):
+        self.macd = self._short.update(close) - self._long.update(close)
+        self.macds = self._signal.update(self.macd)
+        return self.macd - self.macds
+
+
+class RSI(StreamingIndicator):
+    """Relative strength index (rsi_N)."""
+
+    def __init__(self, window=9):
+        StreamingIndicator.__init__(self)
+        self.window = window
+        self._up = EWM(1.0 / window)
+        self._down = EWM(1.0 / window)
+        self._last = None
+
+    def _update(self, high, low, close):
+        diff = 0.0 if self._last is None else close - self._last
+        self._last = close
+        up = self._up.update(diff if diff > 0 else 0.0)
+        down = self._down.update(-diff if diff < 0 else 0.0)
+        total = up + down
+        if self.count == 1 or total == 0:
+            return 50.0
+        return 100 * (up / total)
+
+
+class WR(StreamingIndicator):
+    """Williams overbought/oversold index (wr_N)."""
+
+    def __init__(self, window=9):
+        StreamingIndicator.__init__(self)
+        self.window = window
+        # Monotonic queues of the position and value of the highs and
+        # lows which are not dominated by a later value of the window.
+        self._highs = collections.deque()
+        self._lows = collections.deque()
+
+    def _push(self, queue, value, dominated):
+        while queue and dominated(queue[-1][1], value):
+            queue.pop()
+        queue.append((self.count, value))
+        while queue[0][0] <= self.count - self.window:
+            queue.popleft()
+        return queue[0][1]
+
+    def _update(self, high, low, close):
+        hn = self._push(self._highs, high, lambda a, b: a <= b)
+        ln = self._push(self._lows, low, lambda a, b: a >= b)
+        if hn - ln == 0:
+            return -0.0
+        return (hn - close) / (hn - ln) * -100
+
+
+class ADX(StreamingIndicator):
+    """Average directional index (adx). The directional indicators are
+    smoothed over `window` periods and the ADX is the EMA over `smooth`
+    periods of the DX."""
+
+    def __init__(self, window=14, smooth=6):
+        StreamingIndicator.__init__(self)
+        self._tr = EWM(1.0 / window)
+        self._pdm = EWM(1.0 / window)
+        self._ndm = EWM(1.0 / window)
+        self._adx = EWM(2.0 / (smooth + 1))
+        self._last = None
+        self.dx = NAN
+
+    def _update(self, high, low, close):
+        if self._last is None:
+            self._last = (high, low, close)
+        last_high, last_low, last_close = self._last
+        self._last = (high, low, close)
+
+        tr = max(high - low, abs(high - last_close), abs(low - last_close))
+        hd = high - last_high
+        ld = last_low - low
+        atr = self._tr.update(tr)
+        pdm = self._pdm.update(hd if hd > 0 and hd > ld else 0.0)
+        ndm = self._ndm.update(ld if ld > 0 and ld > hd else 0.0)
+
+        if atr == 0:
+            self.dx = NAN
+        else:
+            pdi = pdm / atr * 100
+            ndi = ndm / atr * 100
+            divisor = pdi + ndi
+            self.dx = abs(pdi - ndi) / divisor * 100 if divisor != 0 else 0.0
+        return self._adx.update(self.dx)
+
+
+class Extrema(object):
+    """Running local maxima and minima of a window of values which only
+    moves forward like the closes of a chart in a backtest or in live
+    trading. The rules for the local extrema are the same as in
+    :func:`cointrader.ta.local_extrema`.
+
+    Every value is classified once when the value after it arrives. The
+    largest maximum and the smallest minimum within the window are kept
+    in monotonic queues, so updating the window only looks at the new
+    values and the number of extrema and the extreme values are
+    available in constant time. If the window does not continue the
+    values seen before the state is rebuilt from the window."""
+
+    def __init__(self):
+        self.maxima = 0
+        self.minima = 0
+        self.highest = None
+        self.lowest = None
+        self._reset()
+
+    def _reset(self):
+        self._start = None
+        self._previous = None
+        self._last = None
+        self._maxima = collections.deque()
+        self._minima = collections.deque()
+        self._highest = collections.deque()
+        self._lowest = collections.deque()
+
+    def _seed(self, keys, values):
+        self._reset()
+        keys = numpy.asarray(keys)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        # Only the inner extrema are kept. Their classification does not
+        # change if more values are added.
+        left, middle, right = values[:-2], values[1:-1], values[2:]
+        for extrema, queue, inner, accumulate in (
+                (self._maxima, self._highest, (middle > left) & (middle > right), numpy.maximum),
+                (self._minima, self._lowest, (middle < left) & (middle < right), numpy.minimum)):
+            index = numpy.flatnonzero(inner) + 1
+            extrema.extend(keys[index].tolist())
+            # The queue keeps the extrema which are more extreme than
+            # all extrema after them.
+            extreme = values[index]
+            later = accumulate.accumulate(extreme[::-1])[::-1][1:]
+            keep = numpy.ones(len(index), dtype=bool)
+            keep[:-1] = extreme[:-1] > later if accumulate is numpy.maximum else extreme[:-1] < later
+            queue.extend(zip(keys[index[keep]].tolist(), extreme[keep].tolist()))
+        if len(values) > 1:
+            self._previous = (keys[-2], values[-2])
+        self._last = (keys[-1], values[-1])
+
+    def _add(self, extrema, queue, key, value, dominated):
+        extrema.append(key)
+        while queue and dominated(queue[-1][1], value):
+            queue.pop()
+        queue.append((key, value))
+
+    def _append(self, key, value):
+        if self._previous is not None:
+            last_key, last_value = self._last
+            previous_value = self._previous[1]
+            if last_value > previous_value and last_value > value:
+                self._add(self._maxima, self._highest, last_key, last_value, lambda a, b: a <= b)
+            elif last_value < previous_value and last_value < value:
+                self._add(self._minima, self._lowest, last_key, last_value, lambda a, b: a >= b)
+        self._previous, self._last = self._last, (key, value)
+
+    def _continues(self, keys, values):
+        if self._last is None or keys[0] < self._start:
+            return None
+        key, value = self._last
+        index = int(numpy.searchsorted(keys, key))
+        if index >= len(keys) or keys[index] != key or values[index] != value:
+            return None
+        return index + 1
+
+    def update(self, keys, values):
+        """Will move the window to the given values.
+
+        :keys: Increasing array of keys (e.g. dates) of the values.
+        :values: Array of values.
+        :returns: The extrema itself.
+        """
+        count = len(values)
+        if not count:
+            self._reset()
+        else:
+            new = self._continues(keys, values)
+            if new is None:
+                self._seed(keys, values)
+            else:
+                for key, value in zip(keys[new:].tolist(), values[new:].tolist()):
+                    self._append(key, value)
+            self._start = keys[0]
+            for extrema, queue in ((self._maxima, self._highest), (self._minima, self._lowest)):
+                while extrema and extrema[0] <= self._start:
+                    extrema.popleft()
+                while queue and queue[0][0] <= self._start:
+                    queue.popleft()
+        self._query(values)
+        return self
+
+    def _query(self, values):
+        count = len(values)
+        self.maxima, self.minima = 0, 0
+        self.highest, self.lowest = None, None
+        if count < 2:
+            return
+        highest, lowest = [], []
+        if count > 3:
+            self.maxima, self.minima = len(self._maxima), len(self._minima)
+            highest = [self._highest[0][1]] if self._highest else []
+            lowest = [self._lowest[0][1]] if self._lowest else []
+        if values[0] > values[1]:
+            self.maxima += 1
+            highest.append(values[0])
+        else:
+            self.minima += 1
+            lowest.append(values[0])
+        if values[-1] > values[-2]:
+            self.maxima += 1
+            highest.append(values[-1])
+        elif values[-1] < values[-2]:
+            self.minima += 1
+            lowest.append(values[-1])
+        self.highest = float(max(highest)) if highest else None
+        self.lowest = float(min(lowest)) if lowest else None
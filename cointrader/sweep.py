@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Parameter sweeps of the Followtrend strategy.
+
+A sweep runs a backtest with :func:`cointrader.backtest.run` for every
+combination of parameters on the same chart. The parameters are the
+keyword arguments of :class:`cointrader.strategy.Followtrend` and the
+stop rules `stop_loss` and `stop_drop` of the backtest.
+
+The indicators are cached on the chart by their name and parameters,
+so every distinct indicator (e.g. the EMA of one window size) is only
+calculated once and reused for all combinations which need it. The
+combinations are split into chunks which are backtested in a pool of
+worker processes. Every worker builds the chart once and keeps it for
+all of its chunks.
+"""
+import collections
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from terminaltables import AsciiTable
+
+from cointrader.backtest import STOP_DROP, STOP_LOSS, run
+from cointrader.chart import COLUMNS, Chart
+from cointrader.indicators import MIN_POINTS
+from cointrader.strategy import Followtrend
+
+DEFAULTS = collections.OrderedDict([
+    ("fast", 13),
+    ("slow", 26),
+    ("buy_rsi", 63),
+    ("sell_wr", 63),
+    ("over_sell_rsi", 70),
+    ("min_adx", 20),
+    ("stop_loss", STOP_LOSS),
+    ("stop_drop", STOP_DROP),
+])
+# Parameters of a sweep and their default values.
+STRATEGY_PARAMS = ("fast", "slow", "buy_rsi", "sell_wr", "over_sell_rsi", "min_adx")
+# Parameters of a sweep which are passed to the strategy.
+
+Score = collections.namedtuple("Score", ["params", "profit", "value", "trades", "stopped"])
+# Result of the backtest of one combination of parameters. `trades` is
+# the number of trades and `stopped` the date the stop rules stopped the
+# backtest or None.
+
+_worker = {}
+# Chart and settings of a worker process of the sweep.
+
+
+def grid(**ranges):
+    """Returns all combinations of the given parameter values. Parameters
+    which are not given keep their default value. Combinations with a
+    fast EMA which is not faster than the slow EMA are left out.
+
+    :ranges: Iterable of values per parameter of `DEFAULTS`.
+    :returns: List of dictionaries with the parameters.
+    """
+    unknown = set(ranges) - set(DEFAULTS)
+    if unknown:
+        raise ValueError("Unknown parameters: {}".format(", ".join(sorted(unknown))))
+    names = list(DEFAULTS)
+    values = [list(ranges[name]) if name in ranges else [DEFAULTS[name]] for name in names]
+    combinations = []
+    for combination in itertools.product(*values):
+        params = dict(zip(names, combination))
+        if params["fast"] < params["slow"]:
+            combinations.append(params)
+    return combinations
+
+
+def evaluate(chart, params, btc=1.0, spread=0.0, start=MIN_POINTS):
+    """Will backtest the Followtrend strategy with the given parameters
+    on the chart.
+
+    :chart: Chart instance
+    :params: Dictionary with the parameters. Missing parameters keep
+        their default value.
+    :btc: BTC at the start of the backtest.
+    :spread: Spread of the market in percent of the price or array of
+        the spread at every datapoint of the chart.
+    :start: Index of the first datapoint to trade on. The local extrema
+        are counted from `MIN_POINTS` datapoints before it, like in the
+        chart of a bot which starts there.
+    :returns: :class:`Score`
+    """
+    params = dict(DEFAULTS, **params)
+    strategy = Followtrend(**{name: params[name] for name in STRATEGY_PARAMS})
+    signals = strategy.backtest_signals(chart, start=start, origin=max(start - MIN_POINTS, 0))
+    result = run(chart, signals, btc, spread, start, params["stop_loss"], params["stop_drop"])
+    return Score(params, result.profit, result.value, len(result.trades), result.stopped)
+
+
+def _init_worker(arrays, btc, spread, start):
+    _worker.update(chart=Chart.from_arrays(arrays, None, None), btc=btc, spread=spread, start=start)
+
+
+def _evaluate_chunk(chunk):
+    return [evaluate(_worker["chart"], params, _worker["btc"], _worker["spread"], _worker["start"])
+            for params in chunk]
+
+
+def sweep(chart, combinations, btc=1.0, spread=0.0, start=MIN_POINTS, processes=None, chunksize=None):
+    """Will backtest every combination of parameters on the chart.
+
+    :chart: Chart instance
+    :combinations: List of parameter dictionaries, see :func:`grid`.
+    :btc: BTC at the start of the backtests.
+    :spread: Spread of the market in percent of the price or array of
+        the spread at every datapoint of the chart.
+    :start: Index of the first datapoint to trade on.
+    :processes: Number of worker processes. Defaults to the number of
+        CPUs. With one process the sweep runs in this process.
+    :chunksize: Number of combinations per task of a worker.
+    :returns: List of :class:`Score` ranked by profit, best first.
+    """
+    combinations = list(combinations)
+    if processes == 1:
+        scores = [evaluate(chart, params, btc, spread, start) for params in combinations]
+    else:
+        processes = processes or os.cpu_count() or 1
+        if chunksize is None:
+            chunksize = max(len(combinations) // (4 * processes), 1)
+        arrays = {column: chart.column(column) for column in COLUMNS}
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(arrays, btc, spread, start)) as pool:
+            chunks = [combinations[i:i + chunksize] for i in range(0, len(combinations), chunksize)]
+            scores = list(itertools.chain.from_iterable(pool.map(_evaluate_chunk, chunks)))
+    return sorted(scores, key=lambda score: score.profit, reverse=True)
+
+
+def table(scores, limit=20):
+    """Returns the first `limit` scores as table."""
+    names = list(DEFAULTS)
+    out = [["#"] + names + ["PROFIT", "TRADES", "STOP"]]
+    for rank, score in enumerate(scores[:limit], 1):
+        out.append([rank] + [score.params[name] for name in names] +
+                   ["{:.2f}%".format(score.profit), score.trades, score.stopped or ""])
+    return AsciiTable(out).table
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Vectorized indicators on NumPy arrays.
+
+The functions in this module calculate the indicators used by the
+strategies directly on float64 arrays. They follow the formulas of
+stockstats, so the values are the same as the values of the
+corresponding stockstats columns (up to floating point rounding):
+
+    =============  ==========================
+    stockstats     function
+    =============  ==========================
+    close_N_sma    ``sma(close, N)``
+    close_N_ema    ``ema(close, N)``
+    macd           ``macd(close)[0]``
+    macds          ``macd(close)[1]``
+    macdh          ``macd(close)[2]``
+    rsi_N          ``rsi(close, N)``
+    wr_N           ``wr(high, low, close, N)``
+    adx            ``adx(high, low, close)``
+    =============  ==========================
+"""
+import functools
+import math
+import numpy
+
+MAX_SCALE = 1e150
+# Largest factor used to scale the values within a block of the
+# exponential weighted mean. It limits the size of the blocks so that
+# the scaled values do not overflow.
+
+
+def _block_size(factor):
+    if factor <= 0:
+        return 1
+    return max(int(math.log(MAX_SCALE) / -math.log(factor)), 1)
+
+
+@functools.lru_cache(maxsize=64)
+def _powers(factor, count):
+    """Returns the read-only array of ``factor ** k`` for k in
+    ``range(count)``."""
+    powers = numpy.exp(numpy.arange(count) * math.log(factor))
+    powers.flags.writeable = False
+    return powers
+
+
+def _ewsum(values, factor):
+    """Returns the exponential weighted sums ``s[t] = factor * s[t-1] +
+    values[t]``. The recurrence is solved for blocks of values at once
+    by scaling the values with the powers of `factor`."""
+    count = len(values)
+    sums = numpy.empty(count)
+    if factor == 0:
+        sums[:] = values
+        return sums
+    size = min(_block_size(factor), count) or 1
+    powers = _powers(factor, size)
+    carry = 0.0
+    for start in range(0, count, size):
+        block = values[start:start + size]
+        scale = powers[:len(block)]
+        block_sums = numpy.cumsum(block / scale) * scale + carry * factor * scale
+        sums[start:start + size] = block_sums
+        carry = block_sums[-1]
+    return sums
+
+
+def ewm(values, alpha):
+    """Exponential weighted mean with `adjust=True`. This is the same as
+    ``pandas.Series(values).ewm(alpha=alpha).mean()``. NaN values are
+    skipped but still decay the weights of the previous values.
+
+    :values: Array of float64 values.
+    :alpha: Smoothing factor.
+    :returns: Array of float64 values.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    missing = numpy.isnan(values)
+    factor = 1.0 - alpha
+    if missing.any():
+        weights = _ewsum((~missing).astype(numpy.float64), factor)
+        sums = _ewsum(numpy.where(missing, 0.0, values), factor)
+    else:
+        # Without missing values the sums of the weights are a
+        # geometric series.
+        weights = (1.0 - factor * _powers(factor, len(values))) / alpha if factor else numpy.ones(len(values))
+        sums = _ewsum(values, factor)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(weights > 0, sums / weights, numpy.nan)
+
+
+def smma(values, window):
+    """Smoothed moving average."""
+    return ewm(values, 1.0 / window)
+
+
+def ema(values, window):
+    """Exponential moving average (close_N_ema)."""
+    return ewm(values, 2.0 / (window + 1))
+
+
+def sma(values, window):
+    """Simple moving average (close_N_sma). The first values are the
+    average of the available values."""
+    values = numpy.asarray(values, dtype=numpy.float64)
+    sums = numpy.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts = numpy.minimum(numpy.arange(1, len(values) + 1), window)
+    return sums / counts
+
+
+def _rolling(values, window, reduce):
+    values = numpy.asarray(values, dtype=numpy.float64)
+    count = len(values)
+    if not count:
+        return values.copy()
+    # Padding with the first value does not change the minimum or
+    # maximum of the first windows.
+    padded = numpy.concatenate((numpy.full(window - 1, values[0]), values))
+    result = padded[:count].copy()
+    for offset in range(1, window):
+        reduce(result, padded[offset:offset + count], out=result)
+    return result
+
+
+def rolling_max(values, window):
+    return _rolling(values, window, numpy.maximum)
+
+
+def rolling_min(values, window):
+    return _rolling(values, window, numpy.minimum)
+
+
+def _diff(values):
+    diff = numpy.zeros_like(values)
+    diff[1:] = numpy.diff(values)
+    return diff
+
+
+def macd(close, short=12, long=26, signal=9):
+    """Moving average convergence divergence.
+
+    :returns: Tuple of the MACD line, the signal line and the histogram.
+    """
+    line = ema(close, short) - ema(close, long)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def macdh(close, short=12, long=26, signal=9):
+    """MACD histogram (macdh)."""
+    return macd(close, short, long, signal)[2]
+
+
+def rsi(close, window=9):
+    """Relative strength index (rsi_N)."""
+    diff = _diff(numpy.asarray(close, dtype=numpy.float64))
+    up = smma(numpy.where(diff > 0, diff, 0.0), window)
+    down = smma(numpy.where(diff < 0, -diff, 0.0), window)
+    total = up + down
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        values = numpy.where(total != 0, 100 * (up / total), 50.0)
+    if len(values):
+        values[0] = 50.0
+    return values
+
+
+def wr(high, low, close, window=9):
+    """Williams overbought/oversold index (wr_N)."""
+    hn = rolling_max(high, window)
+    ln = rolling_min(low, window)
+    hn_ln = hn - ln
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(hn_ln != 0, (hn - close) / hn_ln, 0.0) * -100
+
+
+def adx(high, low, close, window=14, smooth=6):
+    """Average directional index (adx). The directional indicators are
+    smoothed over `window` periods and the ADX is the EMA over `smooth`
+    periods of the DX."""
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    close = numpy.asarray(close, dtype=numpy.float64)
+    if not len(close):
+        return close.copy()
+    last_close = numpy.concatenate(([close[0]], close[:-1]))
+    tr = numpy.maximum(high - low, numpy.maximum(numpy.abs(high - last_close), numpy.abs(low - last_close)))
+    hd = _diff(high)
+    ld = -_diff(low)
+    atr = smma(tr, window)
+    pdm = smma(numpy.where((hd > 0) & (hd > ld), hd, 0.0), window)
+    ndm = smma(numpy.where((ld > 0) & (ld > hd), ld, 0.0), window)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        pdi = pdm / atr * 100
+        ndi = ndm / atr * 100
+        divisor = pdi + ndi
+        dx = numpy.where(divisor != 0, numpy.abs(pdi - ndi) / divisor, 0.0) * 100
+    return ema(dx, smooth)
+
+
+def local_extrema(values):
+    """Returns the indices of the local maxima and minima of `values`.
+    An inner value is a local maximum (minimum) if it is larger (smaller)
+    than both of its neighbours. Inner values are only considered if
+    there are more than three values. The first value is a maximum if it
+    is larger than the second value, otherwise it is a minimum. The last
+    value is a maximum (minimum) if it is larger (smaller) than the
+    value before.
+
+    :values: Array of float64 values.
+    :returns: Tuple of the index arrays of the maxima and the minima.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    count = len(values)
+    if count < 2:
+        return numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0, dtype=numpy.intp)
+    if count > 3:
+        left, middle, right = values[:-2], values[1:-1], values[2:]
+        inner_maxima = numpy.flatnonzero((middle > left) & (middle > right)) + 1
+        inner_minima = numpy.flatnonzero((middle < left) & (middle < right)) + 1
+    else:
+        inner_maxima = inner_minima = numpy.zeros(0, dtype=numpy.intp)
+    first_max = values[0] > values[1]
+    last = [[count - 1]]
+    maxima = ([[0]] if first_max else []) + [inner_maxima] + (last if values[-1] > values[-2] else [])
+    minima = ([] if first_max else [[0]]) + [inner_minima] + (last if values[-1] < values[-2] else [])
+    return numpy.concatenate(maxima).astype(numpy.intp), numpy.concatenate(minima).astype(numpy.intp)
+
+
+def window_extrema(values, start=0):
+    """Returns the local extrema of all windows ``values[start:end]``
+    for every `end` from 0 to ``len(values)`` as found by
+    :func:`local_extrema` on each window.
+
+    :values: Array of float64 values.
+    :start: Start of the windows.
+    :returns: Tuple of four arrays with ``len(values) + 1`` items: the
+        number of maxima, the largest maximum, the number of minima and
+        the smallest minimum per end of the window. The extreme values
+        are NaN if there is no maximum or minimum.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    count = len(values)
+    if not count:
+        return numpy.zeros(1, dtype=numpy.intp), numpy.full(1, numpy.nan), numpy.zeros(1, dtype=numpy.intp), \
+            numpy.full(1, numpy.nan)
+    ends = numpy.arange(count + 1)
+    length = ends - start
+    last = numpy.clip(ends - 1, 0, None)
+    previous = numpy.clip(ends - 2, 0, None)
+
+    # Inner extrema of the whole array. An inner value is an inner value
+    # of a window if the window contains both of its neighbours, so the
+    # inner extrema up to the previous value are counted.
+    inner_maxima = numpy.zeros(count, dtype=bool)
+    inner_minima = numpy.zeros(count, dtype=bool)
+    left, middle, right = values[:-2], values[1:-1], values[2:]
+    inner_maxima[1:-1] = (middle > left) & (middle > right)
+    inner_minima[1:-1] = (middle < left) & (middle < right)
+    inner_maxima[:start + 1] = False
+    inner_minima[:start + 1] = False
+    inner = length > 3
+    maxima = numpy.where(inner, numpy.cumsum(inner_maxima)[previous], 0)
+    minima = numpy.where(inner, numpy.cumsum(inner_minima)[previous], 0)
+    highest = numpy.where(inner, numpy.maximum.accumulate(numpy.where(inner_maxima, values, -numpy.inf))[previous],
+                          -numpy.inf)
+    lowest = numpy.where(inner, numpy.minimum.accumulate(numpy.where(inner_minima, values, numpy.inf))[previous],
+                         numpy.inf)
+
+    # The first and the last value of the windows with at least two
+    # values.
+    valid = length >= 2
+    if start + 1 < count:
+        first_max = valid & (values[start] > values[start + 1])
+        first_min = valid & ~first_max
+        maxima = maxima + first_max
+        minima = minima + first_min
+        highest = numpy.where(first_max, numpy.maximum(highest, values[start]), highest)
+        lowest = numpy.where(first_min, numpy.minimum(lowest, values[start]), lowest)
+    last_max = valid & (values[last] > values[previous])
+    last_min = valid & (values[last] < values[previous])
+    maxima = maxima + last_max
+    minima = minima + last_min
+    highest = numpy.where(last_max, numpy.maximum(highest, values[last]), highest)
+    lowest = numpy.where(last_min, numpy.minimum(lowest, values[last]), lowest)
+    return (maxima, numpy.where(maxima > 0, highest, numpy.nan),
+            minima, numpy.where(minima > 0, lowest, numpy.nan))
+
+
+def window_maxima(values, start=0):
+    """Returns the local maxima of the windows ``values[start:index]``
+    for every index of `values` as found by :func:`window_extrema`. So
+    every row only depends on the values before its index.
+
+    :values: Array of float64 values.
+    :start: Start of the windows.
+    :returns: Array with one row per value and two columns: the number
+        of maxima and the largest maximum of the window before the
+        value.
+    """
+    maxima, highest, _, _ = window_extrema(values, start)
+    return numpy.column_stack((maxima, highest))[:-1]
+
+
+def hl_spread(high, low, window=20):
+    """Spread estimated from the high and low prices of two consecutive
+    candles with the estimator of Corwin and Schultz. Negative estimates
+    are set to zero and the estimates are averaged over `window`
+    candles.
+
+    :returns: Array of the half spread in percent of the price.
+    """
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    if not len(high):
+        return high.copy()
+    last_high = numpy.concatenate(([high[0]], high[:-1]))
+    last_low = numpy.concatenate(([low[0]], low[:-1]))
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        beta = numpy.log(high / low) ** 2 + numpy.log(last_high / last_low) ** 2
+        gamma = numpy.log(numpy.maximum(high, last_high) / numpy.minimum(low, last_low)) ** 2
+        denominator = 3 - 2 * math.sqrt(2)
+        alpha = (numpy.sqrt(2 * beta) - numpy.sqrt(beta)) / denominator - numpy.sqrt(gamma / denominator)
+        spread = 2 * (numpy.exp(alpha) - 1) / (1 + numpy.exp(alpha))
+    spread = numpy.where(numpy.isfinite(spread) & (spread > 0), spread, 0.0)
+    return sma(spread, window) * 50
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Snapshot of the ticker of all markets.
+
+The ticker of the exchange always contains all markets, so one snapshot
+serves the markets, the spreads and the BTC rates of all bots.
+:data:`TICKERS` is shared by all exchanges of a process. The snapshot
+is requested again once it is older than its TTL or on an explicit
+refresh.
+"""
+import threading
+import time
+
+TICKER_TTL = 10
+# Default seconds a ticker snapshot is used.
+
+
+class TickerCache(object):
+    """Ticker snapshot with a TTL in seconds."""
+
+    def __init__(self, ttl=TICKER_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.requests = 0
+        self._clock = clock
+        self._snapshot = None
+        self._time = None
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        return self._snapshot is None or self._clock() - self._time >= self.ttl
+
+    def get(self, api):
+        """Will return the ticker snapshot. A new snapshot is requested
+        from the API if the snapshot is stale.
+
+        :api: :class:`cointrader.exchanges.poloniex.Api` instance.
+        """
+        with self._lock:
+            if self._stale():
+                self._update(api)
+            return self._snapshot
+
+    def refresh(self, api):
+        """Will request a new snapshot from the API."""
+        with self._lock:
+            self._update(api)
+            return self._snapshot
+
+    def load(self, snapshot):
+        """Will use the given snapshot as if it was requested now."""
+        with self._lock:
+            self._snapshot = snapshot
+            self._time = self._clock()
+
+    def invalidate(self):
+        """Will drop the snapshot. The next access requests a new one."""
+        with self._lock:
+            self._snapshot = None
+
+    def _update(self, api):
+        self._snapshot = api.ticker()
+        self._time = self._clock()
+        self.requests += 1
+
+
+TICKERS = TickerCache()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Walk-forward optimization of the Followtrend strategy.
+
+The history is split into rolling folds. Every fold has an in-sample
+part on which the parameters are optimized with a sweep of
+:mod:`cointrader.sweep` and the directly following out-of-sample part on
+which the best parameters are scored.
+
+The backtests of a fold run on views of one chart of the whole history,
+so the indicators are calculated once for the history and shared by all
+folds. The indicators at the start of a fold are therefore warmed up on
+the datapoints before the fold. The local extrema of the Followtrend
+strategy are counted from the start of the chart a bot would have for
+the fold, so they do not depend on the history before it. The folds are
+processed in a pool of worker processes which build the chart once.
+"""
+import collections
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from terminaltables import AsciiTable
+
+from cointrader.chart import COLUMNS, Chart
+from cointrader.indicators import MIN_POINTS
+from cointrader.sweep import DEFAULTS, evaluate, sweep
+
+Fold = collections.namedtuple("Fold", ["start", "split", "end"])
+# Indices of the datapoints of a fold. The in-sample part is
+# ``[start, split)`` and the out-of-sample part is ``[split, end)``.
+
+FoldResult = collections.namedtuple("FoldResult", ["fold", "params", "in_sample", "out_of_sample"])
+# Best parameters of the in-sample part of a fold and the
+# :class:`cointrader.sweep.Score` of these parameters on the in-sample
+# and the out-of-sample part.
+
+_worker = {}
+# Chart and settings of a worker process of the walk-forward.
+
+
+def folds(count, train, test, step=None, offset=MIN_POINTS):
+    """Returns the rolling folds of a history with `count` datapoints.
+
+    :count: Number of datapoints of the history.
+    :train: Number of datapoints of the in-sample part of a fold.
+    :test: Number of datapoints of the out-of-sample part of a fold.
+    :step: Number of datapoints between the starts of two folds.
+        Defaults to `test`, so the out-of-sample parts do not overlap.
+    :offset: Index of the first datapoint of the first fold. The
+        datapoints before are only used to warm up the indicators.
+    :returns: List of :class:`Fold`.
+    """
+    if train < 1 or test < 1:
+        raise ValueError("The parts of a fold must have at least one datapoint")
+    step = test if step is None else step
+    if step < 1:
+        raise ValueError("The step must be at least one datapoint")
+    return [Fold(start, start + train, start + train + test)
+            for start in range(offset, count - train - test + 1, step)]
+
+
+def optimize(chart, fold, combinations, btc=1.0, spread=0.0):
+    """Will optimize the parameters on the in-sample part of the fold and
+    score the best parameters on the out-of-sample part.
+
+    :chart: Chart instance of the whole history.
+    :fold: :class:`Fold`
+    :combinations: List of parameter dictionaries, see
+        :func:`cointrader.sweep.grid`.
+    :btc: BTC at the start of every backtest.
+    :spread: Spread of the market in percent of the price or array of
+        the spread at every datapoint of the chart.
+    :returns: :class:`FoldResult`
+    """
+    scores = sweep(chart.view(fold.split), combinations, btc, spread, fold.start, processes=1)
+    best = scores[0]
+    out_of_sample = evaluate(chart.view(fold.end), best.params, btc, spread, fold.split)
+    return FoldResult(fold, best.params, best, out_of_sample)
+
+
+def _init_worker(arrays, combinations, btc, spread):
+    _worker.update(chart=Chart.from_arrays(arrays, None, None), combinations=combinations, btc=btc, spread=spread)
+
+
+def _optimize(fold):
+    return optimize(_worker["chart"], fold, _worker["combinations"], _worker["btc"], _worker["spread"])
+
+
+def walk_forward(chart, combinations, train, test, step=None, btc=1.0, spread=0.0, processes=None):
+    """Will run a walk-forward optimization on the chart.
+
+    :chart: Chart instance of the whole history.
+    :combinations: List of parameter dictionaries, see
+        :func:`cointrader.sweep.grid`.
+    :train: Number of datapoints of the in-sample part of a fold.
+    :test: Number of datapoints of the out-of-sample part of a fold.
+    :step: Number of datapoints between the starts of two folds.
+    :btc: BTC at the start of every backtest.
+    :spread: Spread of the market in percent of the price or array of
+        the spread at every datapoint of the chart.
+    :processes: Number of worker processes. Defaults to the number of
+        CPUs. With one process the folds are processed in this process.
+    :returns: List of :class:`FoldResult` in the order of the folds.
+    """
+    combinations = list(combinations) or [dict(DEFAULTS)]
+    selected = folds(len(chart), train, test, step)
+    if processes == 1:
+        return [optimize(chart, fold, combinations, btc, spread) for fold in selected]
+    arrays = {column: chart.column(column) for column in COLUMNS}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(arrays, combinations, btc, spread)) as pool:
+        return list(pool.map(_optimize, selected))
+
+
+def profit(results):
+    """Returns the compounded out-of-sample profit in percent of the
+    folds. Only meaningful if the out-of-sample parts do not overlap."""
+    value = 1.0
+    for result in results:
+        value *= 1 + result.out_of_sample.profit / 100
+    return (value - 1) * 100
+
+
+def table(chart, results):
+    """Returns the results of the folds as table."""
+    dates = chart.column("date")
+    names = [name for name in DEFAULTS if len({result.params[name] for result in results}) > 1] or list(DEFAULTS)
+    out = [["IN-SAMPLE", "OUT-OF-SAMPLE"] + names + ["IN", "OUT"]]
+    for result in results:
+        fold = result.fold
+        out.append(["{} - {}".format(_date(dates[fold.start]), _date(dates[fold.split - 1])),
+                    "{} - {}".format(_date(dates[fold.split]), _date(dates[fold.end - 1]))] +
+                   [result.params[name] for name in names] +
+                   ["{:.2f}%".format(result.in_sample.profit), "{:.2f}%".format(result.out_of_sample.profit)])
+    return AsciiTable(out).table
+
+
+def _date(timestamp):
+    return datetime.datetime.utcfromtimestamp(int(timestamp)).strftime("%Y-%m-%d %H:%M")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Minimal WebSocket protocol (RFC 6455) on plain sockets.
+
+Only what the push API needs is implemented: the opening handshake of
+clients and servers, text and binary messages (also fragmented), ping,
+pong and close. Frames of clients are masked, frames of servers are
+not, as required by the RFC.
+"""
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+from urllib.parse import urlparse
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+CONTINUATION = 0x0
+TEXT = 0x1
+BINARY = 0x2
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+CLOSE_TIMEOUT = 5
+# Seconds to wait for the close frame of the peer.
+
+
+class WebSocketError(Exception):
+    pass
+
+
+def accept_key(key):
+    """Returns the Sec-WebSocket-Accept value for the given
+    Sec-WebSocket-Key."""
+    digest = hashlib.sha1((key + GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def _mask(data, key):
+    length = len(data)
+    if not length:
+        return data
+    mask = (key * (length // 4 + 1))[:length]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(mask, "big")).to_bytes(length, "big")
+
+
+def encode_frame(payload, opcode=TEXT, mask=False):
+    """Returns a final frame with the given payload.
+
+    :payload: Bytes of the payload.
+    :opcode: Opcode of the frame.
+    :mask: Mask the payload, which is required for frames of clients.
+    """
+    length = len(payload)
+    header = bytearray([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(bit | length)
+    elif length < 1 << 16:
+        header.append(bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(bit | 127)
+        header += struct.pack("!Q", length)
+    if mask:
+        key = os.urandom(4)
+        return bytes(header) + key + _mask(payload, key)
+    return bytes(header) + payload
+
+
+def _read_headers(reader):
+    lines = []
+    while True:
+        line = reader.readline(65537)
+        if not line:
+            raise WebSocketError("Connection closed during the handshake")
+        line = line.decode("latin-1").rstrip("\r\n")
+        if not line:
+            break
+        lines.append(line)
+    if not lines:
+        raise WebSocketError("Empty handshake")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+class WebSocket(object):
+    """WebSocket connection on a connected socket."""
+
+    def __init__(self, sock, client, reader=None):
+        """
+        :sock: Connected socket after the opening handshake.
+        :client: True for the client side of the connection.
+        :reader: Buffered reader of the socket which was used for the
+            handshake.
+        """
+        self.sock = sock
+        self.client = client
+        self.closed = False
+        self._reader = reader if reader is not None else sock.makefile("rb")
+
+    def _read(self, count):
+        data = self._reader.read(count)
+        if len(data) != count:
+            raise WebSocketError("Connection closed")
+        return data
+
+    def read_frame(self):
+        """Will read the next frame.
+
+        :returns: Tuple of fin, opcode and payload.
+        """
+        first, second = self._read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read(8))[0]
+        key = self._read(4) if second & 0x80 else None
+        payload = self._read(length)
+        if key is not None:
+            payload = _mask(payload, key)
+        return bool(first & 0x80), first & 0x0F, payload
+
+    def _send_frame(self, payload, opcode):
+        self.sock.sendall(encode_frame(payload, opcode, mask=self.client))
+
+    def send(self, message):
+        """Will send a text message (str) or binary message (bytes)."""
+        if isinstance(message, str):
+            self._send_frame(message.encode(), TEXT)
+        else:
+            self._send_frame(message, BINARY)
+
+    def ping(self, payload=b""):
+        self._send_frame(payload, PING)
+
+    def recv(self):
+        """Will wait for the next message. Pings are answered on the way.
+
+        :returns: str for text messages, bytes for binary messages or
+            None if the connection was closed.
+        """
+        if self.closed:
+            return None
+        fragments = []
+        message_opcode = None
+        while True:
+            try:
+                fin, opcode, payload = self.read_frame()
+            except (WebSocketError, OSError, ValueError):
+                self.closed = True
+                self.sock.close()
+                return None
+            if opcode == PING:
+                self._send_frame(payload, PONG)
+            elif opcode == PONG:
+                pass
+            elif opcode == CLOSE:
+                self.close(payload[:2] or b"", wait=False)
+                return None
+            else:
+                if opcode != CONTINUATION:
+                    message_opcode = opcode
+                fragments.append(payload)
+                if fin:
+                    data = b"".join(fragments)
+                    return data.decode() if message_opcode == TEXT else data
+
+    def close(self, status=b"\x03\xe8", wait=True):
+        """Will send a close frame and close the socket.
+
+        :status: Status code of the close frame.
+        :wait: Wait for the close frame of the peer before the socket is
+            closed. Otherwise messages which are still on the way to
+            the peer may be lost.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._send_frame(status, CLOSE)
+        except OSError:
+            wait = False
+        if wait:
+            try:
+                self.sock.settimeout(CLOSE_TIMEOUT)
+                while self.read_frame()[1] != CLOSE:
+                    pass
+            except (WebSocketError, OSError, ValueError):
+                pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def connect(url, timeout=10, read_timeout=None):
+    """Will open a WebSocket connection to the given ws:// or wss://
+    url.
+
+    :timeout: Seconds to wait for the connection and the handshake.
+    :read_timeout: Seconds to wait for the next frame. If no frame
+        arrives in time :meth:`WebSocket.recv` returns None as if the
+        connection was closed. Defaults to wait forever.
+    :returns: :class:`WebSocket`
+    """
+    parts = urlparse(url)
+    secure = parts.scheme == "wss"
+    port = parts.port or (443 if secure else 80)
+    sock = socket.create_connection((parts.hostname, port), timeout)
+    if secure:
+        sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    key = base64.b64encode(os.urandom(16)).decode()
+    request = ("GET {} HTTP/1.1\r\n"
+               "Host: {}\r\n"
+               "Upgrade: websocket\r\n"
+               "Connection: Upgrade\r\n"
+               "Sec-WebSocket-Key: {}\r\n"
+               "Sec-WebSocket-Version: 13\r\n\r\n").format(parts.path or "/", parts.netloc, key)
+    sock.sendall(request.encode())
+    reader = sock.makefile("rb")
+    status, headers = _read_headers(reader)
+    if status.split(" ")[1:2] != ["101"] or headers.get("sec-websocket-accept") != accept_key(key):
+        sock.close()
+        raise WebSocketError("Handshake failed: {}".format(status))
+    sock.settimeout(read_timeout)
+    return WebSocket(sock, client=True, reader=reader)
+
+
+def accept(sock):
+    """Will answer the opening handshake of a client on the given
+    socket.
+
+    :returns: :class:`WebSocket`
+    """
+    reader = sock.makefile("rb")
+    _, headers = _read_headers(reader)
+    key = headers.get("sec-websocket-key")
+    if headers.get("upgrade", "").lower() != "websocket" or not key:
+        sock.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        raise WebSocketError("Not a WebSocket handshake")
+    sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                  "Upgrade: websocket\r\n"
+                  "Connection: Upgrade\r\n"
+                  "Sec-WebSocket-Accept: {}\r\n\r\n").format(accept_key(key)).encode())
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return WebSocket(sock, client=False, reader=reader)
@@ -17,6 +17,7 @@ requirements = [
     'stockstats',
     'termcolor',
     'terminaltables',
+    'numpy',
     'pandas', 'cx_Freeze'
     # TODO: put package requirements here
 ]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+helpers
+----------------------------------
+
+Chart data shared by the tests and the benchmarks.
+"""
+import json
+import os
+import random
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+def make_data(count=300, seed=1):
+    """Returns `count` candles of a random walk with a period of five
+    minutes in the format of :meth:`cointrader.exchanges.poloniex.Poloniex.chart`."""
+    rnd = random.Random(seed)
+    price = 0.07
+    data = []
+    for i in range(count):
+        open_ = price
+        price *= 1 + rnd.gauss(0, 0.01)
+        data.append({"date": 1500000000 + i * 300,
+                     "open": open_,
+                     "high": max(open_, price) * (1 + rnd.random() * 0.005),
+                     "low": min(open_, price) * (1 - rnd.random() * 0.005),
+                     "close": price,
+                     "volume": rnd.random() * 10})
+    return data
+
+
+def load_chart(name="BTC_ETH-300"):
+    """Returns the chart data of the fixture `name` in tests/data.
+
+    BTC_ETH-300 has 400 candles of five minutes in the format of the
+    exchange with prices rounded to satoshis. Unlike a random walk it
+    has trends, a crash, stretches of candles with the same close and
+    periods without trades where the candle is flat and has no
+    volume."""
+    with open(os.path.join(DATA, name + ".json")) as f:
+        return json.load(f)
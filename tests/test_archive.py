@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_archive
+----------------------------------
+
+Tests for `cointrader.archive` module.
+"""
+import datetime
+
+import numpy
+import pytest
+
+
+def make_data(first, count):
+    return [{"date": 1500000000 + i * 300, "open": 1.0, "high": 2.0, "low": 0.5,
+             "close": float(i), "volume": 1.0} for i in range(first, first + count)]
+
+
+def test_write_and_open(tmpdir):
+    from cointrader.archive import write_archive, Archive
+    path = str(tmpdir.join("BTC_DASH.candles"))
+    write_archive(path, make_data(0, 10), "BTC_DASH", 300)
+    archive = Archive(path)
+    assert archive.market == "BTC_DASH"
+    assert archive.period == 300
+    assert len(archive) == 10
+    assert archive.arrays["date"].dtype == numpy.dtype("<i8")
+    assert archive.arrays["close"].tolist() == [float(i) for i in range(10)]
+    assert not archive.arrays["close"].flags.writeable
+
+
+def test_chart_is_not_copied(tmpdir):
+    from cointrader.archive import write_archive, Archive
+    path = str(tmpdir.join("BTC_DASH.candles"))
+    write_archive(path, make_data(0, 10), "BTC_DASH", 300)
+    archive = Archive(path)
+    start = datetime.datetime.utcfromtimestamp(1500000000 + 5 * 300)
+    chart = archive.chart(start, None, offset=2)
+    assert chart.column("close").tolist() == [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    assert numpy.shares_memory(chart.column("close"), archive.arrays["close"])
+
+
+def test_append(tmpdir):
+    from cointrader.archive import write_archive, append_archive, Archive
+    path = str(tmpdir.join("BTC_DASH.candles"))
+    write_archive(path, make_data(0, 10), "BTC_DASH", 300, capacity=12)
+    assert append_archive(path, make_data(8, 4)) == 2
+    assert Archive(path).capacity == 12
+    assert append_archive(path, make_data(12, 3)) == 3
+    archive = Archive(path)
+    assert archive.capacity == 24
+    assert archive.arrays["close"].tolist() == [float(i) for i in range(15)]
+
+
+def test_rewrite_keeps_mapped_archive(tmpdir):
+    from cointrader.archive import ArchiveError, write_archive, append_archive, Archive
+    path = str(tmpdir.join("BTC_DASH.candles"))
+    write_archive(path, make_data(0, 10), "BTC_DASH", 300)
+    old = Archive(path)
+    assert append_archive(path, make_data(10, 5)) == 5
+    # The old mapping still reads the replaced file.
+    assert old.arrays["close"].tolist() == [float(i) for i in range(10)]
+    assert len(Archive(path)) == 15
+    assert tmpdir.listdir(lambda p: p.ext == ".tmp") == []
+    with pytest.raises(ArchiveError):
+        append_archive(path, make_data(15, 1), "BTC_ETH", 300)
+    with pytest.raises(ArchiveError):
+        append_archive(path, make_data(15, 1), "BTC_DASH", 1800)
+
+
+def test_export_from_store(tmpdir):
+    from cointrader.store import CandleStore
+    from tests.test_store import FakeApi, dt
+    store = CandleStore(FakeApi(), "sqlite:///{}".format(tmpdir.join("candles.db")))
+    path = str(tmpdir.join("BTC_DASH.candles"))
+    archive = store.export("BTC_DASH", dt(1500000000), dt(1500000900), 300, path)
+    assert archive.arrays["date"].tolist() == [1500000000, 1500000300, 1500000600, 1500000900]
+    archive = store.export("BTC_DASH", dt(1500000000), dt(1500001200), 300, path)
+    assert len(archive) == 5
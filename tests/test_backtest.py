@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_backtest
+----------------------------------
+
+Tests for the backtest signals of the strategies and the
+`cointrader.backtest` module.
+"""
+import contextlib
+import io
+
+import pytest
+
+from tests.helpers import make_data
+
+
+def tick_signals(strategy, chart, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [strategy.signal(chart.view(n), *args + (n,) if args else ()) for n in range(121, len(chart) + 1)]
+
+
+@pytest.mark.parametrize("seed", [1, 3])
+def test_followtrend_backtest_signals(seed):
+    from cointrader.chart import Chart
+    from cointrader.strategy import Followtrend
+    chart = Chart(make_data(600, seed), None, None)
+    strategy, batch = Followtrend(), Followtrend()
+    expected = tick_signals(strategy, chart, False, 0.069, True)
+    signals = batch.backtest_signals(chart, first_buy_price=0.069)
+    assert len(signals) == len(chart)
+    assert [signals[n - 1].value for n in range(121, len(chart) + 1)] == [s.value for s in expected]
+    assert [signals[n - 1].over_sell for n in range(121, len(chart) + 1)] == [s.over_sell for s in expected]
+    assert [signals[n - 1].max_up for n in range(121, len(chart) + 1)] == [s.max_up for s in expected]
+    assert batch.EMA == strategy.EMA
+    assert batch.trend == strategy.trend
+    assert batch._macd == strategy._macd
+
+
+def test_backtest_signals_start():
+    from cointrader.chart import Chart
+    from cointrader.strategy import Followtrend, Klondike
+    chart = Chart(make_data(600), None, None)
+    for strategy in (Followtrend(), Klondike()):
+        # The start is the second positional argument of all strategies.
+        signals = strategy.backtest_signals(chart, 300)
+        assert not signals.value[:300].any()
+        assert signals.value[300:].any()
+
+
+def test_followtrend_extrema_origin():
+    from cointrader.chart import COLUMNS, Chart
+    from cointrader.strategy import Followtrend
+    chart = Chart(make_data(600), None, None)
+    part = Chart.from_arrays({column: chart.column(column)[200:] for column in COLUMNS}, None, None)
+    # The breakouts only depend on the closes from the origin on.
+    signals = Followtrend().backtest_signals(chart, 320, origin=200)
+    expected = Followtrend().backtest_signals(part, 120)
+    assert signals.max_up[200:].tolist() == expected.max_up.tolist()
+    assert signals.max_up[320:].tolist() != Followtrend().backtest_signals(chart, 320).max_up[320:].tolist()
+
+
+def test_klondike_backtest_signals():
+    from cointrader.chart import Chart
+    from cointrader.strategy import Klondike
+    chart = Chart(make_data(600), None, None)
+    expected = [s.value for s in tick_signals(Klondike(), chart)]
+    signals = Klondike().backtest_signals(chart)
+    assert signals.value[120:].tolist() == expected
+    assert not signals.value[:120].any()
+
+
+def test_run():
+    import numpy
+    from cointrader.backtest import run
+    from cointrader.chart import Chart
+    from cointrader.indicators import BUY, SELL, Signals
+    chart = Chart(make_data(10), None, None)
+    value = numpy.zeros(10)
+    value[[1, 2, 5]] = [BUY, BUY, SELL]
+    max_up = numpy.zeros(10, dtype=bool)
+    max_up[7] = True
+    value[8] = BUY
+    result = run(chart, Signals(value, chart.column("date"), max_up=max_up), btc=1.0)
+    assert [t.order_type for t in result.trades] == ["BUY", "SELL", "BUY"]
+    closes = chart.column("close")
+    assert result.trades[1].btc == pytest.approx(closes[5] / closes[1] * (1 - 0.0025) ** 2)
+    assert result.value == pytest.approx(result.amount * closes[-1])
+    # The spread at every datapoint.
+    spreads = numpy.linspace(0, 0.9, 10)
+    result = run(chart.view(9), Signals(value[:9], chart.column("date")[:9], max_up=max_up[:9]), spread=spreads)
+    assert result.trades[1].btc == pytest.approx(closes[5] / closes[1] * (1 - 0.001 - 0.0025) * (1 - 0.005 - 0.0025))
+
+
+def test_run_stop():
+    import numpy
+    from cointrader.backtest import run
+    from cointrader.chart import Chart
+    from cointrader.indicators import BUY, SELL, Signals
+    chart = Chart(make_data(10), None, None)
+    value = numpy.zeros(10)
+    value[[1, 3, 5, 7]] = [BUY, SELL, BUY, SELL]
+    signals = Signals(value, chart.column("date"))
+    assert len(run(chart, signals).trades) == 4
+    result = run(chart, signals, stop_loss=100.0)
+    assert [t.order_type for t in result.trades] == ["BUY", "SELL"]
+    assert result.stopped == result.trades[-1].date
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_balances
+----------------------------------
+
+Tests for `cointrader.balances` module.
+"""
+import pytest
+
+from tests.test_booktape import make_book
+
+
+class FakeApi(object):
+
+    def __init__(self):
+        self.requests = 0
+
+    def balance(self):
+        self.requests += 1
+        return {"BTC": {"quantity": 1.0, "btc_value": 1.0},
+                "ETH": {"quantity": 2.0, "btc_value": 0.14}}
+
+    def book(self, currency):
+        return make_book(1, 0.07)
+
+    def buy(self, market, amount, price, option=None):
+        return {"orderNumber": "1",
+                "resultingTrades": [{"tradeID": "1", "rate": "0.07", "amount": "10", "date": "2017-08-28 19:51:50",
+                                     "total": "0.7", "type": "buy"}]}
+
+    def sell(self, market, amount, price, option=None):
+        return {"orderNumber": "2",
+                "resultingTrades": [{"tradeID": "2", "rate": "0.0699", "amount": "4", "date": "2017-08-28 19:52:50",
+                                     "total": "0.2796", "type": "sell"}]}
+
+
+def test_apply_trades():
+    from cointrader.balances import BalanceCache, Delta
+    api = FakeApi()
+    cache = BalanceCache()
+    cache.get(api)
+    cache.apply("BTC_ETH", api.buy("BTC_ETH", 10, 0.07), 0.0025)
+    cache.apply("BTC_ETH", api.sell("BTC_ETH", 4, 0.0699), 0.0025)
+    balances = cache.get(api)
+    # The fee of buys is taken from the coins and of sells from the BTC.
+    assert balances["ETH"]["quantity"] == pytest.approx(2 + 10 * 0.9975 - 4)
+    assert balances["BTC"]["quantity"] == pytest.approx(1 - 0.7 + 0.2796 * 0.9975)
+    assert cache.deltas[0] == Delta("2017-08-28 19:51:50", "BTC_ETH", pytest.approx(9.975), -0.7)
+    assert cache.requests == 1
+    cache.refresh(api)
+    assert cache.get(api)["ETH"]["quantity"] == 2
+    assert cache.requests == 2
+
+
+def test_stale_balances():
+    from cointrader.balances import BalanceCache
+    now = [0.0]
+    api = FakeApi()
+    cache = BalanceCache(ttl=60, clock=lambda: now[0])
+    cache.get(api)
+    now[0] = 59
+    cache.get(api)
+    assert cache.requests == 1
+    now[0] = 60
+    cache.get(api)
+    assert cache.requests == 2
+    # The rest of an order which is not filled rests on the book.
+    cache.apply("BTC_ETH", api.buy("BTC_ETH", 10, 0.07), amount=10)
+    cache.get(api)
+    assert cache.requests == 2
+    cache.apply("BTC_ETH", api.buy("BTC_ETH", 20, 0.07), amount=20)
+    assert cache.get(api)["ETH"]["quantity"] == 2
+    assert cache.requests == 3
+
+
+def test_exchange_and_market():
+    from cointrader.config import Config
+    from cointrader.exchange import Exchange, Market, Poloniex
+    config = Config()
+    config.store_url = "sqlite://"
+    api = FakeApi()
+    exchange = Poloniex.__new__(Poloniex)
+    Exchange.__init__(exchange, config, api)
+    market = Market(exchange, "BTC_ETH")
+    assert exchange.get_balance("ETH")["quantity"] == 2
+    market.buy(0.7)
+    assert exchange.get_balance("ETH")["quantity"] == pytest.approx(2 + 10 * 0.9975)
+    assert exchange.get_balance()["BTC"]["quantity"] == pytest.approx(0.3)
+    assert api.requests == 1
+    assert exchange.get_balance("ETH", refresh=True)["quantity"] == 2
+    assert api.requests == 2
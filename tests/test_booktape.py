@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_booktape
+----------------------------------
+
+Tests for `cointrader.booktape` module.
+"""
+import datetime
+
+import pytest
+
+
+def make_book(seq, price):
+    return {"asks": [["{:.8f}".format(price + 0.0001 * i), 10 + i] for i in range(12)],
+            "bids": [["{:.8f}".format(price - 0.0001 * (i + 1)), 20 + i] for i in range(3)],
+            "isFrozen": "0", "seq": seq}
+
+
+def test_record_and_replay(tmpdir):
+    from cointrader.booktape import BookRecorder, BookReplayer
+    path = str(tmpdir.join("BTC_ETH.books"))
+    recorder = BookRecorder(path, "BTC_ETH", depth=10)
+    for i in range(3):
+        recorder.record(make_book(100 + i, 0.07 + 0.001 * i), 1500000000 + 60 * i)
+
+    replayer = BookReplayer(path)
+    assert len(replayer) == 3
+    assert replayer.market == "BTC_ETH"
+    assert replayer.book(1499999999) is None
+    book = replayer.book(datetime.datetime.utcfromtimestamp(1500000090))
+    assert book["seq"] == 101
+    assert len(book["asks"]) == 10 and len(book["bids"]) == 3
+    assert book["asks"][0] == [0.071, 10]
+    assert replayer.book(1600000000)["seq"] == 102
+    assert [seq["seq"] for _, seq in replayer] == [100, 101, 102]
+
+    # Appending to an existing file keeps the depth of the file.
+    BookRecorder(path, "BTC_ETH", depth=5).record(make_book(103, 0.08), 1500000180)
+    assert len(BookReplayer(path)) == 4
+    with pytest.raises(ValueError):
+        BookRecorder(path, "BTC_XMR")
+
+
+class FakeApi(object):
+
+    def __init__(self):
+        self.seq = 0
+
+    def book(self, currency):
+        self.seq += 1
+        return make_book(self.seq, 0.07)
+
+
+def test_run(tmpdir):
+    from cointrader.booktape import BookRecorder, BookReplayer
+    path = str(tmpdir.join("books"))
+    BookRecorder(path, "BTC_ETH").run(FakeApi(), interval=0, count=2)
+    assert [book["seq"] for _, book in BookReplayer(path)] == [1, 2]
+
+
+def test_market_prices_from_books(tmpdir):
+    from cointrader.booktape import BookRecorder, BookReplayer, BookTapeError
+    from cointrader.chart import Chart
+    from cointrader.exchange import Market
+    from tests.helpers import make_data
+    data = make_data(10)
+    path = str(tmpdir.join("books"))
+    BookRecorder(path, "BTC_ETH").record(make_book(1, 0.5), data[3]["date"])
+    market = Market(None, "BTC_ETH", backTrade=True)
+    market._cursor.load(Chart(data, None, None))
+    market._backtest_tick = 2
+    assert float(market.buy(1.0)["resultingTrades"][0]["rate"]) == data[1]["close"]
+    market.load_books(BookReplayer(path))
+    assert float(market.buy(1.0)["resultingTrades"][0]["rate"]) == data[1]["close"]
+    market._backtest_tick = 4
+    assert float(market.buy(1.0)["resultingTrades"][0]["rate"]) == pytest.approx(0.5)
+    assert float(market.sell(1.0)["resultingTrades"][0]["rate"]) == pytest.approx(0.4999)
+    with pytest.raises(BookTapeError):
+        Market(None, "BTC_XMR", backTrade=True).load_books(BookReplayer(path))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_bot
+----------------------------------
+
+Tests for `cointrader.bot` module.
+"""
+import contextlib
+import io
+
+import pytest
+
+
+class FakeApi(object):
+
+    def __init__(self, book):
+        self._book = book
+
+    def book(self, currency, depth=10):
+        return self._book
+
+
+class FakeExchange(object):
+    total_btc_value = 1.0
+
+    def __init__(self, book):
+        self._api = FakeApi(book)
+
+
+@pytest.fixture
+def memory_db():
+    import sqlalchemy as sa
+    from cointrader import Base, db
+    engine = sa.create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db.bind = engine
+    return db
+
+
+def make_bot(book, btc):
+    from cointrader.bot import Cointrader
+    from cointrader.exchange import Market
+    from cointrader.ledger import Ledger
+    from cointrader.strategy import NullStrategy
+    market = Market(FakeExchange(book), "BTC_ETH", dry_run=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = Cointrader(market, NullStrategy(), btc=btc)
+    bot.ledger = Ledger("BTC_ETH")
+    return bot
+
+
+def test_multi_level_fills(memory_db):
+    book = {"asks": [["0.07", "5"], ["0.071", "5"], ["0.072", "100"]],
+            "bids": [["0.069", "5"], ["0.068", "100"]]}
+    bot = make_bot(book, 0.5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert bot._buy(backtest=True)
+    buys = list(bot.tradelog)
+    assert len(buys) == 2
+    # Every trade keeps its own coins and BTC.
+    assert buys[0].btc == pytest.approx(0.35)
+    assert buys[1].btc == pytest.approx(0.15)
+    assert bot.fond.amount_btc == pytest.approx(buys[0].amount + buys[1].amount)
+    assert bot.fond.btc == pytest.approx(0.0)
+
+    amount = bot.fond.amount_btc
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert bot._sell(amount, renew=True, backtest=True)
+    sells = list(bot.tradelog)[2:]
+    assert [trade.rate for trade in sells] == [0.069, 0.068]
+    assert sum(trade.amount for trade in sells) == pytest.approx(amount)
+    assert bot.fond.btc == pytest.approx(sum(trade.btc for trade in sells))
+    assert bot.fond.rows == []
+
+
+def test_partial_and_empty_fills(memory_db):
+    from cointrader.exchange import TAKER_FEE
+    book = {"asks": [["0.07", "1"]], "bids": []}
+    bot = make_bot(book, 0.5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert bot._buy(backtest=True)
+    # The BTC which were not spent stay in the fond.
+    assert bot.fond.btc == pytest.approx(0.5 - 0.07)
+    # The taker fee of the exchange is taken from the coins.
+    assert bot.fond.amount_btc == pytest.approx(1 - TAKER_FEE)
+    rows = list(bot.fond.rows)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert not bot._sell(bot.fond.amount_btc, renew=True, backtest=True)
+    assert bot.fond.rows == rows
+    assert len(bot.tradelog) == 1
+
+
+def test_backtest_orders_on_recorded_books(tmpdir, memory_db):
+    import datetime
+    from cointrader.booktape import BookRecorder, BookReplayer
+    from cointrader.bot import create_bot
+    from cointrader.exchange import Exchange, Market
+    from cointrader.strategy import Followtrend
+    from tests.test_booktape import make_book
+    from tests.helpers import make_data
+    data = make_data(1500)
+
+    class ChartApi(object):
+        def chart(self, currency, start, end, period=1800):
+            first = (start - datetime.datetime(1970, 1, 1)).total_seconds()
+            last = (end - datetime.datetime(1970, 1, 1)).total_seconds()
+            return [d for d in data if first <= d["date"] <= last]
+
+    class BacktestExchange(Exchange):
+        total_btc_value = 1.0
+
+        def __init__(self):
+            from cointrader.store import CandleStore
+            self._api = ChartApi()
+            self._store = CandleStore(self._api)
+
+        def resolution2seconds(self, resolution):
+            return 300
+
+        def get_spread(self, currency):
+            return 0.1
+
+        def get_spread_tick(self, currency):
+            return 0.0
+
+    path = str(tmpdir.join("books"))
+    recorder = BookRecorder(path, "BTC_ETH")
+    for candle in data[200:]:
+        # One order book per candle, recorded before its close, at twice
+        # the price of the chart.
+        recorder.record(make_book(candle["date"], candle["close"] * 2), candle["date"] + 299)
+    market = Market(BacktestExchange(), "BTC_ETH", backTrade=True)
+    market.load_books(BookReplayer(path))
+    start = datetime.datetime.utcfromtimestamp(data[200]["date"])
+    end = datetime.datetime.utcfromtimestamp(data[-1]["date"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = create_bot(market, Followtrend(), "5m", start, end, False, 100, True, 1.0)
+        bot.trend_test = lambda backtest, resolution=None: [] if resolution else ["Рынок  ВНИЗ"] * 4
+        bot.start(backtest=True, automatic=True)
+    closes = {d["date"]: d["close"] for d in data}
+    trades = [trade for trade in bot.tradelog if trade.order_type != "INIT"]
+    assert trades
+    for trade in trades:
+        # The orders were filled on the order books and not at the close.
+        close = closes[int((trade.date - datetime.datetime(1970, 1, 1)).total_seconds())]
+        assert trade.rate == pytest.approx(close * 2, rel=0.01)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_chart
+----------------------------------
+
+Tests for `cointrader.chart` module.
+"""
+import datetime
+
+DATA = [{"date": 1500000000, "open": 1.0, "high": 1.2, "low": 0.9, "close": 1.1, "volume": 3.0},
+        {"date": 1500000300, "open": 1.1, "high": 1.3, "low": 1.0, "close": 1.2, "volume": 2.0},
+        {"date": 1500000600, "open": 1.2, "high": 1.2, "low": 0.8, "close": 0.9, "volume": 5.0}]
+
+
+def test_chart2arrays():
+    from cointrader.chart import chart2arrays
+    arrays = chart2arrays(DATA)
+    assert arrays["date"].dtype.kind == "i"
+    assert arrays["close"].tolist() == [1.1, 1.2, 0.9]
+    assert arrays["volume"].tolist() == [3.0, 2.0, 5.0]
+
+
+def test_last_values():
+    from cointrader.chart import Chart
+    chart = Chart(DATA, None, None)
+    assert chart.date == 1500000600
+    assert chart.close == 0.9
+    assert chart.values()[-1].tolist() == [1500000600, 0.9]
+
+
+def test_column_is_view():
+    from cointrader.chart import Chart, chart2arrays
+    arrays = chart2arrays(DATA)
+    chart = Chart.from_arrays(arrays, None, None)
+    assert chart.column("close") is arrays["close"]
+    assert chart.data[1] == DATA[1]
+
+
+def test_first_and_last_point():
+    from cointrader.chart import Chart
+    start = datetime.datetime.utcfromtimestamp(1500000300)
+    end = datetime.datetime.utcfromtimestamp(1500000599)
+    chart = Chart(DATA, start, end)
+    assert chart.get_first_point() == DATA[1]
+    assert chart.get_last_point() == DATA[1]
+    chart = Chart(DATA, datetime.datetime(2000, 1, 1), end)
+    assert chart.get_first_point() == DATA[0]
+
+
+def test_view_shares_indicators():
+    from cointrader.chart import Chart
+    chart = Chart(DATA, None, None)
+    view = chart.view(2)
+    assert len(view) == 2
+    assert view.column("close").base is not None
+    assert view.ema(3).tolist() == Chart(DATA[:2], None, None).ema(3).tolist()
+
+
+def test_backtest_cursor():
+    from cointrader.chart import Chart, BacktestCursor
+    cursor = BacktestCursor()
+    assert not cursor.advance()
+    cursor.load(Chart(DATA, None, None))
+    assert cursor.tick == 2
+    assert cursor.chart().close == 1.2
+    assert cursor.last("close") == 1.2
+    assert cursor.chart(-1).date == 1500000300
+    assert cursor.advance()
+    assert cursor.last("date") == 1500000600
+    assert not cursor.advance()
+    assert cursor.last("close") == 0.9
+
+
+def test_indicator_cache():
+    from cointrader.chart import Chart
+    chart = Chart(DATA, None, None)
+    chart.ema(3)
+    chart.view(2).ema(3)
+    chart.ema(5)
+    assert chart.cache_info() == (1, 2, 0, 2)
+
+
+def test_append_extends_indicators():
+    import numpy
+    from cointrader.chart import Chart
+    from tests.helpers import make_data
+    data = make_data(200)
+    chart = Chart(data[:150], None, None)
+    indicators = ["macdh", "ema", "rsi", "wr", "dmi"]
+    for name in indicators:
+        getattr(chart, name)()
+    for candle in data[150:]:
+        chart.append(candle)
+    assert chart.cache_info().extended == 50 * len(indicators)
+    expected = Chart(data, None, None)
+    assert chart.column("close").tolist() == expected.column("close").tolist()
+    for name in indicators:
+        numpy.testing.assert_allclose(getattr(chart, name)(), getattr(expected, name)(), rtol=1e-9, atol=1e-15)
+    assert chart.cache_info().misses == len(indicators)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cli_beta
+----------------------------------
+
+Tests for `cointrader.cli_beta` module.
+"""
+import datetime
+
+from tests.helpers import make_data
+
+DATA = make_data(1500)
+
+
+class FakeApi(object):
+
+    def __init__(self):
+        self.requests = 0
+
+    def ticker(self, currency=None):
+        return {"BTC_ETH": {"last": "0.07", "lowestAsk": "0.07001", "highestBid": "0.06999"},
+                # The spread of the market can not be calculated.
+                "BTC_XMR": {"lowestAsk": "0.07001", "highestBid": "0.06999"}}
+
+    def chart(self, currency, start, end, period=1800):
+        self.requests += 1
+        first = (start - datetime.datetime(1970, 1, 1)).total_seconds()
+        last = (end - datetime.datetime(1970, 1, 1)).total_seconds()
+        return [d for d in DATA if first <= d["date"] <= last]
+
+
+def test_evaluate_markets(tmpdir, caplog):
+    from cointrader import cli_beta
+    from cointrader.config import Config
+    from cointrader.exchange import Exchange
+    from cointrader.strategy import Followtrend
+    from cointrader.tickers import TickerCache
+    path = tmpdir.join("cointrader.ini")
+    path.write("[DEFAULT]\napi_key = KEY\napi_secret = SECRET\n")
+    config = Config()
+    config.store_url = "sqlite:///" + str(tmpdir.join("candles.db"))
+    api = FakeApi()
+    exchange = Exchange(config, api, private=False)
+    exchange.tickers = TickerCache()
+    start = datetime.datetime.utcfromtimestamp(DATA[1000]["date"])
+    end = datetime.datetime.utcfromtimestamp(DATA[-1]["date"])
+    results = list(cli_beta.evaluate_markets(exchange, ["BTC_ETH", "BTC_XMR"], Followtrend(), "5m", start, end,
+                                             100, 1.0, processes=2, config_path=str(path)))
+    # The candles were requested by this process only, the workers read
+    # them from the store.
+    assert api.requests == 2
+    assert [result["market"] for result in results] == ["BTC_ETH"]
+    assert results[0]["spread"] == 0.01
+    assert "Backtest of BTC_XMR failed" in caplog.text
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_clock
+----------------------------------
+
+Tests for `cointrader.clock` module.
+"""
+import datetime
+
+import pytest
+
+
+def test_simulated_clock_jumps():
+    from cointrader.clock import SimulatedClock
+    slept = []
+    clock = SimulatedClock(sleep=slept.append)
+    clock.sleep_until(1500000000)
+    assert clock.time() == 1500000000
+    clock.sleep(300)
+    clock.sleep_until(1500000000)
+    assert clock.time() == 1500000300
+    clock.sleep_until(1500000900)
+    assert clock.time() == 1500000900
+    assert slept == []
+
+
+def test_simulated_clock_speed():
+    from cointrader.clock import SimulatedClock
+    slept = []
+    clock = SimulatedClock(1500000000, speed=60, sleep=slept.append)
+    clock.sleep(300)
+    clock.sleep_until(1500000600)
+    assert slept == [5, 5]
+    assert clock.now() == datetime.datetime(2017, 7, 14, 2, 50)
+    with pytest.raises(ValueError):
+        SimulatedClock(speed=0)
+
+
+def test_simulated_clock_not_started():
+    from cointrader.clock import SimulatedClock
+    with pytest.raises(ValueError):
+        SimulatedClock().time()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_fills
+----------------------------------
+
+Tests for `cointrader.fills` module.
+"""
+import numpy
+import pytest
+
+from tests.test_booktape import make_book
+
+PRICES = [0.5, 0.6, 0.7]
+AMOUNTS = [10.0, 10.0, 10.0]
+
+
+def test_market_order_walks_levels():
+    from cointrader.fills import fill
+    result = fill(PRICES, AMOUNTS, "BUY", amount=15)
+    assert result.amount == 15
+    assert result.btc == pytest.approx(5 + 3)
+    assert result.price == pytest.approx(8 / 15.)
+    assert result.levels.tolist() == [[0.5, 10], [0.6, 5]]
+    assert result.resting == result.cancelled == 0
+
+
+def test_market_order_by_btc():
+    from cointrader.fills import fill
+    result = fill(PRICES, AMOUNTS, "BUY", btc=8)
+    assert result.amount == pytest.approx(15)
+    assert result.btc == pytest.approx(8)
+
+
+def test_market_order_exhausts_book():
+    from cointrader.fills import fill
+    result = fill(PRICES, AMOUNTS, "BUY", amount=40)
+    assert result.amount == 30
+    assert result.cancelled == 10
+    assert result.resting == 0
+
+
+def test_limit_order_rests():
+    from cointrader.fills import fill
+    result = fill(PRICES, AMOUNTS, "BUY", amount=25, limit=0.6)
+    assert result.amount == 20
+    assert result.resting == 5
+    result = fill([0.4, 0.3], AMOUNTS[:2], "SELL", amount=25, limit=0.35)
+    assert result.levels.tolist() == [[0.4, 10]]
+    assert result.resting == 15
+
+
+def test_options():
+    from cointrader.fills import fill
+    result = fill(PRICES, AMOUNTS, "BUY", amount=25, limit=0.6, option="immediateOrCancel")
+    assert (result.amount, result.resting, result.cancelled) == (20, 0, 5)
+    result = fill(PRICES, AMOUNTS, "BUY", amount=25, limit=0.6, option="fillOrKill")
+    assert (result.amount, result.resting, result.cancelled) == (0, 0, 25)
+    assert numpy.isnan(result.price)
+    result = fill(PRICES, AMOUNTS, "BUY", amount=20, limit=0.6, option="fillOrKill")
+    assert result.amount == 20
+    result = fill(PRICES, AMOUNTS, "BUY", amount=5, limit=0.5, option="postOnly")
+    assert (result.amount, result.resting, result.cancelled) == (0, 0, 5)
+    result = fill(PRICES, AMOUNTS, "BUY", amount=5, limit=0.4, option="postOnly")
+    assert (result.amount, result.resting, result.cancelled) == (0, 5, 0)
+    with pytest.raises(ValueError):
+        fill(PRICES, AMOUNTS, "BUY", amount=5, option="allOrNothing")
+
+
+def test_market_dry_run():
+    from cointrader.exchange import Market
+
+    class FakeApi(object):
+        def book(self, currency):
+            return make_book(1, 0.5)
+
+    class FakeExchange(object):
+        _api = FakeApi()
+
+    market = Market(FakeExchange(), "BTC_ETH", dry_run=True)
+    trades = market.buy(7.0)["resultingTrades"]
+    assert [float(trade["rate"]) for trade in trades] == [0.5, 0.5001]
+    assert sum(float(trade["total"]) for trade in trades) == pytest.approx(7.0)
+    trades = market.sell(30.0)["resultingTrades"]
+    assert [float(trade["amount"]) for trade in trades] == [20, 10]
+    assert market.buy(1.0, price=0.4)["resultingTrades"] == []
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_ledger
+----------------------------------
+
+Tests for `cointrader.ledger` module.
+"""
+import datetime
+
+import pytest
+
+
+def test_ledger():
+    from cointrader.ledger import Ledger
+    ledger = Ledger("BTC_ETH", capacity=1)
+    date = datetime.datetime(2017, 7, 14, 12, 40)
+    ledger.append(date, "INIT", 0.07, 0.0, 1.0)
+    ledger.append(date + datetime.timedelta(minutes=5), "BUY", 0.071, 14.0, 1.0)
+    ledger.append(date + datetime.timedelta(minutes=10), "SELL", 0.072, 14.0, 1.005)
+    assert len(ledger) == 3
+    assert [t.order_type for t in ledger] == ["INIT", "BUY", "SELL"]
+    assert ledger[0].date == date
+    assert ledger[-1].btc == 1.005
+    assert ledger[-1].market == "BTC_ETH"
+    assert [t.order_type for t in ledger[::-1]] == ["SELL", "BUY", "INIT"]
+    assert ledger[1:][0].order_id == 11111111
+    assert ledger.column("rate").tolist() == [0.07, 0.071, 0.072]
+    with pytest.raises(IndexError):
+        ledger[3]
+    ledger.clear()
+    assert len(ledger) == 0 and list(ledger) == []
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_orderbook
+----------------------------------
+
+Tests for `cointrader.orderbook` module.
+"""
+import json
+
+import pytest
+
+from tests.test_booktape import make_book
+
+PAIR_ID = 148
+
+
+def test_updates_in_order():
+    from cointrader.orderbook import OrderBook
+    book = OrderBook("BTC_ETH")
+    book.load(make_book(100, 0.07))
+    assert book.best_ask() == 0.07
+    assert book.best_bid() == pytest.approx(0.0699)
+    assert book.update(101, [["o", 0, "0.06995", "5"], ["o", 1, "0.06990", "0"]])
+    assert book.best_ask() == 0.06995
+    assert book.best_bid() == pytest.approx(0.0698)
+    assert book.spread() == pytest.approx(0.00015)
+    # Messages which are already in the book are ignored.
+    assert book.update(100, [["o", 0, "0.06995", "0"]])
+    assert book.best_ask() == 0.06995
+    assert book.depth("asks", 2) == [(0.06995, 5.0), (0.07, 10.0)]
+    assert len(book.depth("bids")) == 2
+    snapshot = book.book(depth=3)
+    assert snapshot["seq"] == 101
+    assert [level[0] for level in snapshot["asks"]] == [0.06995, 0.07, pytest.approx(0.0701)]
+
+
+def test_gap_resyncs():
+    from cointrader.orderbook import OrderBook
+    snapshots = []
+
+    def snapshot():
+        snapshots.append(1)
+        book = make_book(102, 0.07)
+        book["asks"][0][1] = 7
+        return book
+
+    book = OrderBook("BTC_ETH", snapshot=snapshot)
+    book.load(make_book(100, 0.07))
+    # 101 is missing. 102 is contained in the snapshot, 103 follows it.
+    assert book.update(103, [["o", 0, "0.07", "3"]])
+    assert book.update(102, [["o", 0, "0.07", "1"]])
+    assert len(snapshots) == book.resyncs == 1
+    assert book.seq == 103
+    assert book.depth("asks", 1) == [(0.07, 3.0)]
+
+
+def test_gap_without_snapshot():
+    from cointrader.orderbook import OrderBook
+    book = OrderBook("BTC_ETH")
+    assert not book.update(5, [["o", 0, "0.07", "3"]])
+    assert not book.synced
+    # The initial order book of the push API brings the book in sync.
+    book.update(4, [["i", {"currencyPair": "BTC_ETH",
+                           "orderBook": [{"0.07": "1", "0.08": "2"}, {"0.06": "4"}]}]])
+    assert book.synced
+    assert book.seq == 5
+    assert book.depth("asks") == [(0.07, 3.0), (0.08, 2.0)]
+    book.update(7, [["o", 1, "0.065", "1"]])
+    assert not book.synced
+    assert book.best_bid() == 0.06
+
+
+def test_market_from_recorded_messages():
+    from cointrader.exchange import Market
+    from cointrader.push import PushClient
+
+    class FakeApi(object):
+        def book(self, currency, depth=10):
+            raise AssertionError("No request expected")
+
+    class FakeExchange(object):
+        _api = FakeApi()
+
+    messages = [json.dumps([PAIR_ID, 10, [["i", {"currencyPair": "BTC_ETH",
+                                                  "orderBook": [{"0.0701": "2", "0.0702": "5"},
+                                                                {"0.0699": "3"}]}]]]),
+                json.dumps([PAIR_ID, 11, [["o", 1, "0.07", "1"], ["t", "1", 1, "0.0701", "1", 1500000000]]]),
+                json.dumps([PAIR_ID, 12, [["o", 0, "0.0701", "0"]]])]
+    client = PushClient({PAIR_ID: "BTC_ETH"}, ["BTC_ETH"])
+    market = Market(FakeExchange(), "BTC_ETH")
+    market.load_stream(client)
+    for message in messages:
+        client.handle(message)
+    assert market.get_spread_tick() == pytest.approx(0.0002)
+    assert market.book()["bids"] == [[0.07, 1.0], [0.0699, 3.0]]
+    assert market._best_price("asks") == 0.0702
+
+
+def test_snapshot_backoff():
+    from cointrader.orderbook import OrderBook
+    now = [0.0]
+    snapshots = []
+
+    def snapshot():
+        snapshots.append(now[0])
+        if len(snapshots) == 1:
+            raise IOError("Timeout")
+        # The second snapshot is older than the gap.
+        return make_book(99 if len(snapshots) == 2 else 103, 0.07)
+
+    book = OrderBook("BTC_ETH", snapshot=snapshot, clock=lambda: now[0])
+    book.load(make_book(100, 0.07))
+    # 101 is missing. The failed snapshot does not raise.
+    assert not book.update(102, [["o", 0, "0.07", "1"]])
+    assert not book.update(103, [["o", 0, "0.07", "2"]])
+    assert snapshots == [0]
+    now[0] = 1
+    assert not book.update(104, [["o", 0, "0.07", "3"]])
+    assert not book.update(105, [["o", 0, "0.07", "4"]])
+    assert snapshots == [0, 1]
+    now[0] = 2
+    assert not book.update(106, [["o", 0, "0.07", "5"]])
+    assert snapshots == [0, 1]
+    now[0] = 3
+    assert book.update(107, [["o", 0, "0.07", "6"]])
+    assert snapshots == [0, 1, 3]
+    assert book.seq == 107
+    assert book.depth("asks", 1) == [(0.07, 6.0)]
+
+
+def test_max_pending(monkeypatch):
+    from cointrader import orderbook
+    from cointrader.orderbook import OrderBook
+    monkeypatch.setattr(orderbook, "MAX_PENDING", 3)
+
+    def snapshot():
+        raise IOError("Timeout")
+
+    book = OrderBook("BTC_ETH", snapshot=snapshot)
+    book.load(make_book(100, 0.07))
+    for seq in range(102, 106):
+        book.update(seq, [["o", 0, "0.07", "1"]])
+    # The kept back updates are dropped with the book.
+    assert book.seq is None
+    assert not book._pending
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_poloniex
+----------------------------------
+
+Tests for `cointrader.exchanges.poloniex` module.
+"""
+import pytest
+
+from benchmarks.standin import StandinServer
+
+
+@pytest.fixture
+def server():
+    with StandinServer() as server:
+        yield server
+
+
+def make_api(server):
+    from cointrader.config import Config
+    from cointrader.exchanges.poloniex import Poloniex
+    from cointrader.ratelimit import RateLimiter
+    config = Config()
+    config.api_key, config.api_secret = "key", "secret"
+    api = Poloniex(config, 0)
+    api.url = server.url
+    api.limiter = RateLimiter(sleep=lambda seconds: None)
+    return api
+
+
+def test_session_keeps_connection(server):
+    api = make_api(server)
+    for _ in range(5):
+        assert api.ticker("USDT_BTC")["last"] == "4000.0"
+        assert len(api.book("BTC_ETH")["asks"]) == 12
+    assert api.balance()["BTC"]["quantity"] == 1.0
+    assert server.connections == 1
+
+
+def test_session_gzip(server):
+    api = make_api(server)
+    response = api._request("public", {"command": "returnTicker"})
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+def test_rate_limit(server):
+    api = make_api(server)
+    for _ in range(8):
+        api.ticker()
+    api.balance()
+    stats = api.limiter.stats()
+    assert stats["public"]["requests"] == 8
+    assert stats["public"]["queued"] >= 2
+    assert stats["trading"] == {"requests": 1, "queued": 0, "wait_mean": 0.0, "wait_max": 0.0}
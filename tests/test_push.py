@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_push
+----------------------------------
+
+Tests for `cointrader.push` and `cointrader.websocket` modules.
+"""
+import io
+import socket
+import threading
+
+import pytest
+
+from benchmarks.standin import PushStandinServer, make_push_messages
+from tests.helpers import make_data
+
+PAIR_ID = 148
+
+
+def test_websocket_messages():
+    from cointrader import websocket
+    server, client = socket.socketpair()
+    a, b = websocket.WebSocket(server, client=False), websocket.WebSocket(client, client=True)
+    b.send("x" * 70000)
+    assert a.recv() == "x" * 70000
+    a.send(b"\x00\x01")
+    b.ping(b"ping")
+    assert b.recv() == b"\x00\x01"
+    # The ping is answered by the server while it waits for a message.
+    threading.Thread(target=lambda: b.send("late")).start()
+    assert a.recv() == "late"
+    b.close()
+    assert a.recv() is None
+
+
+def test_candle_builder():
+    from cointrader.push import CandleBuilder
+    builder = CandleBuilder(300)
+    builder.add(1500000150, 1.0, 1)
+    builder.add(1500000300, 2.0, 1)
+    builder.add(1500000400, 3.0, 2)
+    builder.add(1500000350, 1.5, 1)
+    assert builder.closed == []
+    builder.add(1500000900, 2.5, 1)
+    assert builder.closed[0] == {"date": 1500000300, "open": 2.0, "high": 3.0, "low": 1.5, "close": 1.5,
+                                 "volume": 9.5, "quoteVolume": 4, "weightedAverage": 9.5 / 4}
+    assert builder.closed[1]["date"] == 1500000600
+    assert builder.closed[1]["volume"] == 0
+    builder.flush(1500001250)
+    assert [candle["date"] for candle in builder.closed] == [1500000300, 1500000600, 1500000900]
+    assert builder.candle["date"] == 1500001200
+
+
+def test_replay():
+    from cointrader.push import PushClient
+    data = make_data(10)
+    record = io.StringIO()
+    with PushStandinServer(make_push_messages(PAIR_ID, data)) as server:
+        client = PushClient({PAIR_ID: "BTC_ETH"}, ["BTC_ETH"], url=server.url, record=record,
+                            clock=lambda: data[-1]["date"] + 300)
+        updates = []
+        client.listeners.append(lambda market, seq, changes: updates.append(seq))
+        client.run()
+    assert updates == list(range(1, 41))
+    assert client.top("BTC_ETH").last == data[-1]["close"]
+    candles = client.candles("BTC_ETH", 300)
+    assert [candle["date"] for candle in candles] == [d["date"] for d in data[1:]]
+    for candle, expected in zip(candles, data[1:]):
+        for column in ("open", "high", "low", "close"):
+            assert candle[column] == expected[column]
+        assert candle["volume"] == pytest.approx(expected["volume"] / expected["close"] *
+                                                 (expected["open"] + expected["high"] +
+                                                  expected["low"] + expected["close"]) / 4)
+    assert client.candles("BTC_ETH", 7200) is None
+    assert len(record.getvalue().splitlines()) == 50
+
+
+def test_market_chart_from_stream():
+    from cointrader.exchange import Market
+    from cointrader.push import PushClient
+    data = make_data(200)
+    requests = []
+
+    class FakeStore(object):
+        def chart(self, market, start, end, period):
+            requests.append(end)
+            return [d for d in data[:150] if d["date"] <= (end - start.__class__(1970, 1, 1)).total_seconds()]
+
+    class FakeExchange(object):
+        _store = FakeStore()
+
+        def resolution2seconds(self, resolution):
+            return 300
+
+        def get_spread(self, market):
+            return 0.5
+
+    now = [data[164]["date"] + 10]
+    with PushStandinServer(make_push_messages(PAIR_ID, data[148:165])) as server:
+        client = PushClient({PAIR_ID: "BTC_ETH"}, ["BTC_ETH"], url=server.url, clock=lambda: now[0])
+        client.run()
+    market = Market(FakeExchange(), "BTC_ETH")
+    market.load_stream(client)
+    assert market.get_spread() == pytest.approx(0.1, abs=0.01)
+    chart = market.get_chart("5m")
+    assert chart.date == data[163]["date"]
+    assert len(requests) == 1
+    now[0] = data[165]["date"] + 10
+    chart = market.get_chart("5m")
+    assert chart.date == data[164]["date"]
+    assert chart.close == data[164]["close"]
+    assert len(requests) == 1
+    # The trend of the bot loads the chart of the stream too.
+    chart = market.get_chart("5m", last_numbers=-1, new_only=True)
+    assert chart.date == data[163]["date"]
+    assert len(requests) == 1
+    # A stale stream falls back to the REST API.
+    client.stale_after = 0
+    assert market.get_spread() == 0.5
+    market.get_chart("5m")
+    assert len(requests) == 2
+
+
+def test_stale_client_reconnects(monkeypatch):
+    import time
+    from cointrader import push
+    from cointrader.push import PushClient
+    monkeypatch.setattr(push, "RECONNECT_DELAY", 0.01)
+    data = make_data(10)
+    # The server stays silent after the replay, so the read timeout
+    # closes the connection.
+    with PushStandinServer(make_push_messages(PAIR_ID, data), close=False) as server:
+        client = PushClient({PAIR_ID: "BTC_ETH"}, ["BTC_ETH"], url=server.url, stale_after=0.2,
+                            clock=lambda: data[-1]["date"] + 300)
+        updates = []
+        client.listeners.append(lambda market, seq, changes: updates.append(seq))
+        assert client.stale and client.top("BTC_ETH") is None
+        client.start()
+        deadline = time.time() + 5
+        while len(updates) < 80 and time.time() < deadline:
+            time.sleep(0.01)
+        client.stop()
+    assert client.reconnects >= 1
+    # The client subscribed again and got the messages again.
+    assert updates[:80] == list(range(1, 41)) * 2
+    time.sleep(0.25)
+    assert client.stale
+    assert client.top("BTC_ETH") is None
+    assert client.candles("BTC_ETH", 300) is None
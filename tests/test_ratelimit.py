@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_ratelimit
+----------------------------------
+
+Tests for `cointrader.ratelimit` module.
+"""
+import pytest
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_bucket_queues_requests():
+    from cointrader.ratelimit import TokenBucket
+    clock = FakeClock()
+    bucket = TokenBucket(6, clock=clock, sleep=clock.sleep)
+    waits = [bucket.acquire() for _ in range(12)]
+    assert waits[:6] == [0] * 6
+    assert waits[6:] == pytest.approx([1 / 6.] * 6)
+    assert clock.now == pytest.approx(1)
+    clock.now += 10
+    assert bucket.acquire() == 0
+    stats = bucket.stats()
+    assert stats["requests"] == 13
+    assert stats["queued"] == 6
+    assert stats["wait_max"] == pytest.approx(1 / 6.)
+
+
+def test_bucket_shared_by_waiting_requests():
+    from cointrader.ratelimit import TokenBucket
+    clock = FakeClock()
+    waits = []
+    bucket = TokenBucket(2, capacity=1, clock=clock, sleep=waits.append)
+    # The requests do not advance the clock while they wait, like
+    # requests of several threads.
+    assert [bucket.acquire() for _ in range(4)] == pytest.approx([0, 0.5, 1.0, 1.5])
+
+
+def test_bucket_timeout():
+    from cointrader.ratelimit import RateLimitError, TokenBucket
+    clock = FakeClock()
+    bucket = TokenBucket(1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    with pytest.raises(RateLimitError):
+        bucket.acquire(timeout=0.5)
+    assert bucket.acquire(timeout=1) == 1
+
+
+def test_limiter_budgets():
+    from cointrader.ratelimit import RateLimiter
+    clock = FakeClock()
+    limiter = RateLimiter({"public": 1, "trading": 1}, clock=clock, sleep=clock.sleep)
+    assert limiter.acquire("public") == 0
+    assert limiter.acquire("trading") == 0
+    assert limiter.acquire("public") == 1
+    assert set(limiter.stats()) == {"public", "trading"}
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_resample
+----------------------------------
+
+Tests for `cointrader.resample` module.
+"""
+import numpy
+
+from tests.helpers import make_data
+
+PERIOD = 7200
+
+
+def arrays(data):
+    from cointrader.chart import chart2arrays
+    return chart2arrays(data)
+
+
+def grouped(data):
+    buckets = {}
+    for candle in data:
+        buckets.setdefault(candle["date"] // PERIOD * PERIOD, []).append(candle)
+    return [{"date": bucket,
+             "open": candles[0]["open"],
+             "high": max(c["high"] for c in candles),
+             "low": min(c["low"] for c in candles),
+             "close": candles[-1]["close"],
+             "volume": sum(c["volume"] for c in candles)} for bucket, candles in sorted(buckets.items())]
+
+
+def test_resample():
+    from cointrader.chart import COLUMNS
+    from cointrader.resample import resample
+    data = make_data(203)
+    resampled = resample(arrays(data), PERIOD)
+    expected = arrays(grouped(data))
+    for column in COLUMNS:
+        numpy.testing.assert_allclose(resampled[column], expected[column], rtol=1e-12)
+
+
+def test_resampler_updates_last_bucket():
+    from cointrader.chart import COLUMNS
+    from cointrader.resample import Resampler
+    data = make_data(203)
+    resampler = Resampler(PERIOD, capacity=4).seed(arrays(data[:101]))
+    for candle in data[101:]:
+        resampler.update(candle)
+    # Replacing the last base candle replaces it in the last bucket.
+    changed = dict(data[-1], close=42.0, high=100.0)
+    resampler.update(changed)
+    expected = arrays(grouped(data[:-1] + [changed]))
+    chart = resampler.chart()
+    assert len(chart) == len(expected["date"])
+    for column in COLUMNS:
+        numpy.testing.assert_allclose(chart.column(column), expected[column], rtol=1e-12)
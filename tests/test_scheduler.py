@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_scheduler
+----------------------------------
+
+Tests for `cointrader.scheduler` module.
+"""
+import pytest
+
+
+class FakeExchange(object):
+
+    def __init__(self, clock, offset):
+        self.clock = clock
+        self.offset = offset
+
+    def resolution2seconds(self, resolution):
+        return 300
+
+    def server_time(self):
+        return int(self.clock.time() + self.offset)
+
+
+class FakeMarket(object):
+    """Market which publishes a candle `lag` seconds after its start on
+    the clock of the exchange."""
+
+    def __init__(self, clock, offset, lag=0.0):
+        self._exchange = FakeExchange(clock, offset)
+        self.clock = clock
+        self.lag = lag
+        self.requests = []
+        self.appended = []
+
+    def new_candles(self, resolution, since):
+        now = self.clock.time() + self._exchange.offset
+        self.requests.append(now)
+        return [{"date": date} for date in (since, since + 300) if now >= date + self.lag]
+
+    def append_candles(self, resolution, candles):
+        self.appended.extend(candle["date"] for candle in candles)
+
+
+def test_wait_for_close():
+    from cointrader.clock import SimulatedClock
+    from cointrader.scheduler import CandleScheduler
+    clock = SimulatedClock(1500000010.25)
+    market = FakeMarket(clock, 42)
+    scheduler = CandleScheduler(market, "5m", clock)
+    assert scheduler.estimate_offset() == pytest.approx(42, abs=0.5)
+    assert scheduler.wait() == 1500000300
+    assert scheduler.wait() == 1500000600
+    assert len(market.requests) == 2
+    # The candles which closed are appended to the chart of the market.
+    assert market.appended == [1500000000, 1500000300]
+    # The new candle is requested shortly after the close on the clock
+    # of the exchange.
+    assert 1500000600 < market.requests[-1] <= 1500000600 + scheduler.delay + 0.5
+
+
+def test_wait_for_late_candle():
+    from cointrader.clock import SimulatedClock
+    from cointrader.scheduler import CandleScheduler
+    clock = SimulatedClock(1500000010)
+    market = FakeMarket(clock, 0, lag=3.5)
+    scheduler = CandleScheduler(market, "5m", clock)
+    assert scheduler.wait() == 1500000300
+    assert len(market.requests) == 3
+    market.lag = 3600
+    assert scheduler.wait() is None
+    assert len(market.requests) == 3 + scheduler.tries
+
+
+def test_live_chart_is_extended():
+    import datetime
+    from cointrader.exchange import Market
+    from tests.helpers import make_data
+    data = make_data(300)
+    requests = []
+
+    class FakeStore(object):
+        def chart(self, market, start, end, period):
+            requests.append(end)
+            last = (end - datetime.datetime(1970, 1, 1)).total_seconds()
+            return [d for d in data if d["date"] <= last]
+
+    class ChartExchange(object):
+        _store = FakeStore()
+
+        def resolution2seconds(self, resolution):
+            return 300
+
+    market = Market(ChartExchange(), "BTC_ETH")
+    now = datetime.datetime.utcfromtimestamp(data[200]["date"] + 10)
+    chart = market._get_scheduled_chart("5m", now, now)
+    # The candle which is still open is not part of the chart.
+    assert chart.date == data[199]["date"]
+    ema = chart.ema(13)
+    market.append_candles("5m", data[199:201])
+    now += datetime.timedelta(seconds=300)
+    chart = market._get_scheduled_chart("5m", now, now)
+    assert chart.date == data[200]["date"]
+    assert len(requests) == 1
+    assert chart.ema(13)[:-1].tolist() == ema.tolist()
+    assert chart.cache_info().extended == 1
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_spread
+----------------------------------
+
+Tests for `cointrader.spread` module.
+"""
+import numpy
+import pytest
+
+from tests.helpers import make_data
+
+
+def test_hl_spread():
+    from cointrader import ta
+    high = numpy.array([1.0, 1.0, 1.02, 1.02])
+    low = numpy.array([1.0, 1.0, 1.0, 1.0])
+    spread = ta.hl_spread(high, low, window=1)
+    assert spread[:2].tolist() == [0.0, 0.0]
+    # A candle with a range after a candle without range gives an alpha
+    # of zero and no spread.
+    assert spread[2] == pytest.approx(0.0, abs=1e-12)
+    # Two equal candles with a range of 2% have an alpha of ln(1.02), so
+    # the spread is 2 * (1.02 - 1) / (1 + 1.02), about the half range.
+    assert spread[3] == pytest.approx(2 * 0.02 / 2.02 * 50)
+
+
+def test_spread_models():
+    from cointrader.chart import Chart
+    from cointrader.spread import CandleSpread, FixedSpread
+    chart = Chart(make_data(300), None, None)
+    assert FixedSpread(0.2).spread(chart) == 0.2
+    model = CandleSpread(window=10, default=0.3)
+    assert model.spread(None) == 0.3
+    assert model.spread(chart.view(100)) == pytest.approx(chart.spread(10)[99])
+    assert model.spread(chart) >= 0
+
+
+def test_spread_model():
+    from cointrader.chart import Chart
+    from cointrader.spread import CandleSpread, FixedSpread, spread_model
+    chart = Chart(make_data(300), None, None)
+    model = spread_model("fixed", 0.2)
+    assert isinstance(model, FixedSpread) and model.series(chart) == 0.2
+    model = spread_model("candles", 0.2)
+    assert isinstance(model, CandleSpread) and model.spread(None) == 0.2
+    assert model.series(chart)[-1] == model.spread(chart)
+    assert len(model.series(chart)) == len(chart)
+
+
+class FakeExchange(object):
+    requests = 0
+
+    def get_spread(self, currency):
+        self.requests += 1
+        return 0.25
+
+
+def test_market_spread():
+    from cointrader.chart import Chart
+    from cointrader.exchange import Market
+    from cointrader.spread import CandleSpread
+    exchange = FakeExchange()
+    assert Market(exchange, "BTC_ETH").get_spread() == 0.25
+    market = Market(exchange, "BTC_ETH", backTrade=True)
+    assert [market.get_spread() for i in range(3)] == [0.25] * 3
+    assert exchange.requests == 2
+
+    market = Market(exchange, "BTC_ETH", backTrade=True)
+    market.spread_model = CandleSpread(window=10)
+    market._cursor.load(Chart(make_data(300), None, None))
+    market._backtest_tick = 150
+    assert market.get_spread() == pytest.approx(market._cursor.chart().spread(10)[-1])
+    assert exchange.requests == 2
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_store
+----------------------------------
+
+Tests for `cointrader.store` module.
+"""
+import datetime
+
+PERIOD = 300
+
+
+class FakeApi(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def chart(self, currency, start, end, period=1800):
+        from cointrader.exchanges.poloniex import totimestamp
+        self.requests.append((totimestamp(start), totimestamp(end)))
+        first = -(-totimestamp(start) // period) * period
+        return [{"date": d, "open": 1.0, "high": 2.0, "low": 0.5, "close": d / 1e9, "volume": 1.0,
+                 "quoteVolume": 1.0, "weightedAverage": 1.0}
+                for d in range(first, totimestamp(end) + 1, period)]
+
+
+def dt(ts):
+    return datetime.datetime.utcfromtimestamp(ts)
+
+
+def test_missing_ranges():
+    from cointrader.store import missing_ranges
+    assert missing_ranges([], 0, 900, PERIOD) == [(0, 900)]
+    assert missing_ranges([(300, 600)], 0, 1500, PERIOD) == [(0, 0), (900, 1500)]
+    assert missing_ranges([(0, 600), (900, 1500)], 0, 1500, PERIOD) == []
+
+
+def test_only_missing_ranges_are_requested(tmpdir):
+    from cointrader.store import CandleStore
+    api = FakeApi()
+    store = CandleStore(api, "sqlite:///{}".format(tmpdir.join("candles.db")))
+    now = dt(1500003000)
+    store.update("BTC_DASH", dt(1500000000), dt(1500001500), PERIOD, now=now)
+    store.update("BTC_DASH", dt(1500000900), dt(1500002400), PERIOD, now=now)
+    assert api.requests == [(1500000000, 1500001500), (1500001800, 1500002400)]
+    assert store.update("BTC_DASH", dt(1500000000), dt(1500002400), PERIOD, now=now) == 0
+
+
+def test_open_candle_is_requested_again(tmpdir):
+    from cointrader.store import CandleStore
+    api = FakeApi()
+    store = CandleStore(api, "sqlite:///{}".format(tmpdir.join("candles.db")))
+    now = dt(1500001600)
+    store.update("BTC_DASH", dt(1500000000), dt(1500001500), PERIOD, now=now)
+    store.update("BTC_DASH", dt(1500000000), dt(1500001500), PERIOD, now=now)
+    assert api.requests[-1] == (1500001500, 1500001500)
+    # The stored open candle is replaced by the requested one.
+    candle = {"date": 1500001500, "open": 1.0, "high": 3.0, "low": 0.5, "close": 2.5, "volume": 2.0}
+    api.chart = lambda currency, start, end, period: [candle]
+    store.update("BTC_DASH", dt(1500000000), dt(1500001500), PERIOD, now=now)
+    data = store.chart("BTC_DASH", dt(1500001200), dt(1500001500), PERIOD)
+    assert [(d["close"], d["volume"]) for d in data] == [(1.5000012, 1.0), (2.5, 2.0)]
+
+
+def test_chart(tmpdir):
+    from cointrader.store import CandleStore
+    store = CandleStore(FakeApi(), "sqlite:///{}".format(tmpdir.join("candles.db")))
+    data = store.chart("BTC_DASH", dt(1500000000), dt(1500000900), PERIOD)
+    assert [d["date"] for d in data] == [1500000000, 1500000300, 1500000600, 1500000900]
+    assert data[0]["close"] == 1.5
+
+
+def test_read_only(tmpdir):
+    from cointrader.store import CandleStore
+    url = "sqlite:///{}".format(tmpdir.join("candles.db"))
+    # The candle at 1500001500 is still open.
+    CandleStore(FakeApi(), url).update("BTC_DASH", dt(1500000000), dt(1500001500), PERIOD, now=dt(1500001600))
+    api = FakeApi()
+    store = CandleStore(api, url, read_only=True)
+    assert not store.in_memory
+    data = store.chart("BTC_DASH", dt(1500000000), dt(1500002100), PERIOD)
+    assert [d["date"] for d in data] == list(range(1500000000, 1500002101, PERIOD))
+    # The open candle is taken from the store, the missing candles are
+    # requested but not saved.
+    assert api.requests == [(1500001800, 1500002100)]
+    store.chart("BTC_DASH", dt(1500000000), dt(1500002100), PERIOD)
+    assert len(api.requests) == 2
+    assert CandleStore(None).in_memory
+
+
+def test_store_url(tmpdir, monkeypatch):
+    import io
+    from cointrader.config import Config
+    from cointrader.store import CandleStore
+    monkeypatch.setenv("HOME", str(tmpdir))
+    assert Config().store_url == "sqlite:///{}".format(tmpdir.join(".cointrader", "candles.db"))
+    url = "sqlite:///{}".format(tmpdir.join("data", "store.db"))
+    config = Config(io.StringIO("[DEFAULT]\napi_key = key\napi_secret = secret\nstore_url = {}\n".format(url)))
+    assert config.store_url == url
+    CandleStore(FakeApi(), config.store_url).chart("BTC_DASH", dt(1500000000), dt(1500000300), PERIOD)
+    assert tmpdir.join("data", "store.db").check()
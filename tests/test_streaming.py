@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_streaming
+----------------------------------
+
+Tests for `cointrader.streaming` module. The streaming indicators must
+produce the same values as the indicators of the chart.
+"""
+import numpy
+
+from tests.helpers import make_data
+
+
+def replay(indicator, data):
+    from cointrader.chart import Chart
+    indicator.seed(Chart(data[:150], None, None))
+    for candle in data[150:]:
+        indicator.append(candle)
+    return indicator.value
+
+
+def check(indicator, series):
+    from cointrader.chart import Chart
+    data = make_data()
+    expected = series(Chart(data, None, None))[-1]
+    assert numpy.isclose(replay(indicator, data), expected, rtol=1e-12, atol=0)
+
+
+def test_ema():
+    from cointrader.streaming import EMA
+    check(EMA(13), lambda chart: chart.ema(13))
+
+
+def test_sma():
+    from cointrader.streaming import SMA
+    check(SMA(10), lambda chart: chart.sma(10))
+
+
+def test_sma_and_wr_every_candle():
+    from cointrader.chart import Chart
+    from cointrader.streaming import SMA, WR
+    data = make_data(100)
+    chart = Chart(data, None, None)
+    for indicator, expected in ((SMA(10), chart.sma(10)), (WR(9), chart.wr())):
+        values = [indicator.append(candle) for candle in data]
+        assert numpy.allclose(values, expected, rtol=1e-12, atol=0)
+
+
+def test_macdh():
+    from cointrader.streaming import MACD
+    check(MACD(), lambda chart: chart.macdh())
+
+
+def test_rsi():
+    from cointrader.streaming import RSI
+    check(RSI(9), lambda chart: chart.rsi())
+
+
+def test_wr():
+    from cointrader.streaming import WR
+    check(WR(9), lambda chart: chart.wr())
+
+
+def test_adx():
+    from cointrader.streaming import ADX
+    check(ADX(), lambda chart: chart.dmi())
+
+
+def test_extrema():
+    from cointrader.ta import local_extrema
+    from cointrader.streaming import Extrema
+    closes = numpy.round([c["close"] for c in make_data(600)], 3)
+    dates = numpy.arange(len(closes)) * 300
+    extrema = Extrema()
+    # Growing, sliding and restarted windows.
+    windows = [(0, end) for end in range(0, 300)] + [(start, start + 200) for start in range(100, 300)] + [(50, 80)]
+    for start, end in windows:
+        extrema.update(dates[start:end], closes[start:end])
+        maxima, minima = local_extrema(closes[start:end])
+        assert extrema.maxima == len(maxima)
+        assert extrema.minima == len(minima)
+        assert extrema.highest == (closes[start:end][maxima].max() if len(maxima) else None)
+        assert extrema.lowest == (closes[start:end][minima].min() if len(minima) else None)
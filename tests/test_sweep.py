@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_sweep
+----------------------------------
+
+Tests for `cointrader.sweep` module.
+"""
+import pytest
+
+from tests.helpers import make_data
+
+
+def test_grid():
+    from cointrader import sweep
+    combinations = sweep.grid(fast=[10, 30], slow=[26], min_adx=[15, 20])
+    assert [(c["fast"], c["min_adx"]) for c in combinations] == [(10, 15), (10, 20)]
+    assert all(c["buy_rsi"] == 63 and c["stop_loss"] == -3.0 for c in combinations)
+    with pytest.raises(ValueError):
+        sweep.grid(foo=[1])
+
+
+def test_sweep():
+    from cointrader import sweep
+    from cointrader.backtest import run
+    from cointrader.chart import Chart
+    from cointrader.strategy import Followtrend
+    chart = Chart(make_data(600), None, None)
+    combinations = sweep.grid(fast=[8, 13], slow=[21, 26], buy_rsi=[55, 63])
+    scores = sweep.sweep(chart, combinations, processes=1)
+    assert len(scores) == len(combinations)
+    assert [s.profit for s in scores] == sorted((s.profit for s in scores), reverse=True)
+    # Every EMA is only calculated once for all combinations.
+    assert chart.cache_info().misses == 10
+
+    default = [s for s in scores if s.params == sweep.DEFAULTS][0]
+    result = run(chart, Followtrend().backtest_signals(chart), start=sweep.MIN_POINTS, stop_loss=-3.0, stop_drop=.5)
+    assert default.profit == result.profit
+
+    parallel = sweep.sweep(chart, combinations, processes=2)
+    assert [(s.params, s.profit) for s in parallel] == [(s.params, s.profit) for s in scores]
+    assert "PROFIT" in sweep.table(scores)
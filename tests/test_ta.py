@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_ta
+----------------------------------
+
+Tests for `cointrader.ta` module. The indicators must produce the same
+values as stockstats.
+"""
+import numpy
+import pandas
+import pytest
+
+from tests.helpers import load_chart, make_data
+
+
+def charts():
+    data = make_data(2000)
+    # A flat market where the range and the true range are zero.
+    flat = [dict(data[-1], date=data[-1]["date"] + (i + 1) * 300, open=0.07, high=0.07, low=0.07, close=0.07)
+            for i in range(30)]
+    return [load_chart(), data, data[:1], data + flat]
+
+
+def stock(data):
+    import stockstats
+    frame = pandas.DataFrame(data)[["date", "open", "high", "low", "close", "volume"]]
+    return stockstats.StockDataFrame.retype(frame)
+
+
+def assert_same(values, expected):
+    scale = numpy.nanmax(numpy.abs(expected))
+    numpy.testing.assert_allclose(values, expected, rtol=1e-9, atol=scale * 1e-12)
+
+
+@pytest.mark.parametrize("data", charts())
+def test_moving_averages(data):
+    from cointrader import ta
+    frame = stock(data)
+    close = frame["close"].to_numpy()
+    for window in (1, 10, 13, 26):
+        assert_same(ta.sma(close, window), frame["close_{}_sma".format(window)].to_numpy())
+        assert_same(ta.ema(close, window), frame["close_{}_ema".format(window)].to_numpy())
+
+
+@pytest.mark.parametrize("data", charts())
+def test_macd(data):
+    from cointrader import ta
+    frame = stock(data)
+    frame.get("macd")
+    line, signal, histogram = ta.macd(frame["close"].to_numpy())
+    assert_same(line, frame["macd"].to_numpy())
+    assert_same(signal, frame["macds"].to_numpy())
+    assert_same(histogram, frame["macdh"].to_numpy())
+
+
+@pytest.mark.parametrize("data", charts())
+def test_oscillators(data):
+    from cointrader import ta
+    frame = stock(data)
+    high, low, close = (frame[column].to_numpy() for column in ("high", "low", "close"))
+    assert_same(ta.rsi(close, 9), frame["rsi_9"].to_numpy())
+    assert_same(ta.wr(high, low, close, 9), frame["wr_9"].to_numpy())
+    assert_same(ta.adx(high, low, close), frame["adx"].to_numpy())
+
+
+def test_ewm_skips_nan():
+    from cointrader import ta
+    values = numpy.array([numpy.nan, 1.0, numpy.nan, 3.0, 2.0])
+    expected = pandas.Series(values).ewm(alpha=0.3).mean().to_numpy()
+    assert_same(ta.ewm(values, 0.3), expected)
+
+
+def find_extrema(numbers):
+    """Local extrema as found by the former loop of
+    Followtrend.FindMaximaMinima."""
+    maxima, minima = [], []
+    length = len(numbers)
+    if length >= 2:
+        (maxima if numbers[0] > numbers[1] else minima).append(0)
+        if length > 3:
+            for i in range(1, length - 1):
+                if numbers[i] > numbers[i - 1] and numbers[i] > numbers[i + 1]:
+                    maxima.append(i)
+                elif numbers[i] < numbers[i - 1] and numbers[i] < numbers[i + 1]:
+                    minima.append(i)
+        if numbers[-1] > numbers[-2]:
+            maxima.append(length - 1)
+        elif numbers[-1] < numbers[-2]:
+            minima.append(length - 1)
+    return maxima, minima
+
+
+@pytest.mark.parametrize("numbers", [[], [1], [1, 1], [1, 2, 1], [3, 2, 4, 1], [1, 1, 2, 2, 1, 1, 3],
+                                     [round(c["close"], 3) for c in make_data(300)]])
+def test_local_extrema(numbers):
+    from cointrader import ta
+    maxima, minima = ta.local_extrema(numbers)
+    assert (maxima.tolist(), minima.tolist()) == find_extrema(numbers)
+
+
+@pytest.mark.parametrize("start", [0, 1, 121])
+def test_window_extrema(start):
+    from cointrader import ta
+    closes = numpy.round([c["close"] for c in make_data(300)], 3)
+    maxima, highest, minima, lowest = ta.window_extrema(closes, start)
+    for end in range(len(closes) + 1):
+        window = closes[start:end]
+        expected_maxima, expected_minima = ta.local_extrema(window)
+        assert maxima[end] == len(expected_maxima)
+        assert minima[end] == len(expected_minima)
+        if len(expected_maxima):
+            assert highest[end] == window[expected_maxima].max()
+        if len(expected_minima):
+            assert lowest[end] == window[expected_minima].min()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_tickers
+----------------------------------
+
+Tests for `cointrader.tickers` module.
+"""
+from benchmarks.standin import make_ticker
+
+
+class FakeApi(object):
+
+    def __init__(self):
+        self.requests = 0
+
+    def ticker(self, currency=None):
+        self.requests += 1
+        return make_ticker(3)
+
+    def balance(self):
+        return {"BTC": {"quantity": 1.0, "btc_value": 1.0}}
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_ttl():
+    from cointrader.tickers import TickerCache
+    api = FakeApi()
+    clock = FakeClock()
+    cache = TickerCache(ttl=10, clock=clock)
+    cache.get(api)
+    clock.now = 9.9
+    cache.get(api)
+    assert api.requests == 1
+    clock.now = 10
+    cache.get(api)
+    assert api.requests == 2
+    cache.refresh(api)
+    assert api.requests == 3
+    cache.invalidate()
+    cache.get(api)
+    assert api.requests == 4
+
+
+def test_exchange_call_sites(monkeypatch):
+    from cointrader.config import Config
+    from cointrader.exchange import Exchange, Poloniex
+    from cointrader.tickers import TickerCache
+    monkeypatch.setattr("cointrader.exchange.TICKERS", TickerCache())
+    config = Config()
+    config.store_url = "sqlite://"
+    api = FakeApi()
+    exchange = Poloniex.__new__(Poloniex)
+    Exchange.__init__(exchange, config, api)
+    other = Poloniex.__new__(Poloniex)
+    Exchange.__init__(other, config, api)
+
+    assert len(exchange.markets) == 3
+    assert exchange.is_valid_market("BTC_C001")
+    assert not exchange.is_valid_market("USDT_BTC")
+    assert exchange.total_euro_value == 4000.0
+    assert exchange.get_spread("BTC_C002") == 0.14
+    assert other.btc2dollar(1) == 4000.0
+    assert other.dollar2btc(4000) == 1.0
+    assert api.requests == 1
+    other.ticker(refresh=True)
+    exchange.markets
+    assert api.requests == 2
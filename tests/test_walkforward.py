@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_walkforward
+----------------------------------
+
+Tests for `cointrader.walkforward` module.
+"""
+import pytest
+
+from tests.helpers import make_data
+
+
+def test_folds():
+    from cointrader.walkforward import Fold, folds
+    assert folds(100, 40, 20, offset=0) == [Fold(0, 40, 60), Fold(20, 60, 80), Fold(40, 80, 100)]
+    assert folds(100, 40, 20, step=30, offset=10) == [Fold(10, 50, 70), Fold(40, 80, 100)]
+    assert folds(50, 40, 20) == []
+    with pytest.raises(ValueError):
+        folds(100, 0, 20)
+
+
+def test_walk_forward():
+    from cointrader import sweep, walkforward
+    from cointrader.chart import Chart
+    chart = Chart(make_data(800), None, None)
+    combinations = sweep.grid(fast=[8, 13], slow=[21, 26])
+    results = walkforward.walk_forward(chart, combinations, 300, 100, processes=1)
+    assert [r.fold for r in results] == walkforward.folds(len(chart), 300, 100)
+    # The folds share the indicators of the chart. Only the local
+    # extrema are counted from the start of every part of a fold.
+    origins = {start - sweep.MIN_POINTS for r in results for start in (r.fold.start, r.fold.split)}
+    assert chart.cache_info().size == 8 + 2 * len(origins)
+
+    first = results[0]
+    scores = sweep.sweep(chart.view(first.fold.split), combinations, start=first.fold.start, processes=1)
+    assert first.params == scores[0].params
+    assert first.out_of_sample == sweep.evaluate(chart.view(first.fold.end), first.params, start=first.fold.split)
+
+    assert walkforward.walk_forward(chart, combinations, 300, 100, processes=2) == results
+    assert "OUT-OF-SAMPLE" in walkforward.table(chart, results)